@@ -1,4 +1,6 @@
 from django.contrib import admin
+
+from core.admin import SingletonModelAdmin
 from .models import AboutContent, Veterinarian, FeatureItem, AboutPageText
 
 @admin.register(AboutContent)
@@ -19,8 +21,5 @@ class FeatureItemAdmin(admin.ModelAdmin):
     list_editable = ('order',)
 
 @admin.register(AboutPageText)
-class AboutPageTextAdmin(admin.ModelAdmin):
-    def has_add_permission(self, request):
-        if self.model.objects.exists():
-            return False
-        return super().has_add_permission(request)
+class AboutPageTextAdmin(SingletonModelAdmin):
+    pass
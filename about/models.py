@@ -1,5 +1,7 @@
 from django.db import models
 
+from core.models import SingletonModel
+
 
 class AboutContent(models.Model):
     title = models.CharField(max_length=200, verbose_name="Заголовок")
@@ -50,7 +52,7 @@ class FeatureItem(models.Model):
         return self.title
 
 
-class AboutPageText(models.Model):
+class AboutPageText(SingletonModel):
     """Текстовые блоки для страницы 'О клинике'"""
     header_title = models.CharField(max_length=200, default="Почему выбирают нас?", verbose_name="Заголовок секции преимуществ")
     header_subtitle = models.TextField(default="Мы создали клинику, в которую хотели бы обратиться сами. Здесь каждый питомец получает внимание и заботу.", verbose_name="Подзаголовок секции преимуществ")
@@ -1,3 +1,31 @@
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from .models import AboutPageText, Veterinarian
+
+
+class AboutPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Veterinarian.objects.create(name="Анна Петрова", position="Терапевт", bio="Стаж 10 лет")
+
+    def test_page_is_cached_until_vet_changes(self):
+        url = reverse('about:about')
+        self.assertContains(self.client.get(url), "Анна Петрова")
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Veterinarian.objects.create(name="Иван Сидоров", position="Хирург", bio="Стаж 5 лет")
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, "Иван Сидоров")
+
+    def test_not_modified_with_matching_etag(self):
+        url = reverse('about:about')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AboutPageText.objects.create(header_title="Почему мы")
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
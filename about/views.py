@@ -1,11 +1,20 @@
 from django.shortcuts import render
+from django.db.models import Max
+from core.conditional import conditional_page
+from core.page_cache import cache_public_page
 from .models import AboutContent, Veterinarian, AboutPageText, FeatureItem
 
 
+def about_last_modified(request):
+    return AboutContent.objects.filter(is_active=True).aggregate(Max('updated_at'))['updated_at__max']
+
+
+@conditional_page(AboutContent, Veterinarian, AboutPageText, FeatureItem, last_modified=about_last_modified)
+@cache_public_page(AboutContent, Veterinarian, AboutPageText, FeatureItem)
 def about(request):
     about_content = AboutContent.objects.filter(is_active=True).first()
     veterinarians = Veterinarian.objects.filter(is_active=True).order_by('order')
-    about_text = AboutPageText.objects.first()
+    about_text = AboutPageText.load()
     features = FeatureItem.objects.all()
     
     return render(request, 'about/about.html', {
@@ -1,5 +1,12 @@
 from django.contrib import admin
-from .models import TaskLog, TaskReport
+from .models import TaskCheckpoint, TaskLog, TaskReport
+
+class TaskCheckpointInline(admin.TabularInline):
+    model = TaskCheckpoint
+    extra = 0
+    fields = ('stage', 'result', 'created_at')
+    readonly_fields = ('stage', 'result', 'created_at')
+    can_delete = False
 
 @admin.register(TaskLog)
 class TaskLogAdmin(admin.ModelAdmin):
@@ -7,6 +14,7 @@ class TaskLogAdmin(admin.ModelAdmin):
     list_filter = ('status', 'created_at')
     search_fields = ('user_request', 'result_summary', 'error_message')
     readonly_fields = ('created_at', 'updated_at')
+    inlines = [TaskCheckpointInline]
 
 @admin.register(TaskReport)
 class TaskReportAdmin(admin.ModelAdmin):
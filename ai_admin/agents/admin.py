@@ -49,6 +49,7 @@ class AdminAgent(BaseAgent):
                  raise ValueError("No messages returned from agent")
 
         except Exception as e:
+            self.raise_if_transient(e)
             self.log(f"Error during execution: {str(e)}")
             self.update_task_log(status='failed', error_message=str(e))
             return "failed"
@@ -117,10 +117,18 @@ def update_object(app_label, model_name, object_id, data):
     """
     try:
         model = apps.get_model(app_label, model_name)
-        model.objects.filter(pk=object_id).update(**data)
+        # Save through the instance (not queryset.update) so post_save
+        # signals fire and dependent caches are invalidated.
+        obj = model.objects.get(pk=object_id)
+        for field, value in data.items():
+            # attname accepts raw IDs for foreign keys, like update() did
+            setattr(obj, model._meta.get_field(field).attname, value)
+        obj.save()
         return f"Success: Updated object with ID {object_id}"
     except LookupError:
         return f"Error: Model '{app_label}.{model_name}' not found."
+    except ObjectDoesNotExist:
+        return f"Error: Object with ID {object_id} not found."
     except Exception as e:
         return f"Error updating object: {str(e)}"
 
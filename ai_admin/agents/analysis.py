@@ -39,6 +39,7 @@ class AnalysisAgent(BaseAgent):
                  raise ValueError("No messages returned from agent")
 
         except Exception as e:
+            self.raise_if_transient(e)
             self.log(f"Error during analysis: {str(e)}")
             self.update_task_log(status='failed', error_message=str(e))
             return "failed"
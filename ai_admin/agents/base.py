@@ -1,8 +1,25 @@
 from abc import ABC, abstractmethod
 import logging
 
+import httpx
+import openai
+
 logger = logging.getLogger(__name__)
 
+# OpenRouter failures that may pass on their own; the pipeline stage is retried
+TRANSIENT_ERRORS = (
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    httpx.TransportError,
+)
+
+
+class TransientAgentError(Exception):
+    """
+    Raised by an agent when its LLM call failed for a transient reason.
+    """
+
 class BaseAgent(ABC):
     """
     Abstract base class for all agents in the AI Admin workflow.
@@ -17,6 +34,13 @@ class BaseAgent(ABC):
         """
         pass
 
+    def raise_if_transient(self, error):
+        """
+        Re-raise transient API errors so that the pipeline stage can be retried.
+        """
+        if isinstance(error, TRANSIENT_ERRORS):
+            raise TransientAgentError(str(error)) from error
+
     def log(self, message):
         """
         Log a message to the task log (or standard logger).
@@ -35,6 +35,7 @@ class ControlAgent(BaseAgent):
                  raise ValueError("No messages returned from agent")
 
         except Exception as e:
+            self.raise_if_transient(e)
             self.log(f"Error during verification: {str(e)}")
             self.update_task_log(status='failed', error_message=str(e))
             return "failed"
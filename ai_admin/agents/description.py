@@ -12,38 +12,49 @@ class DescriptionAgent(BaseAgent):
     """
     def run(self):
         self.log("Generating report...")
-        
+        try:
+            response = get_llm(temperature=0.0).invoke(self.build_messages())
+            return self.save_response(response)
+        except Exception as e:
+            return self.handle_error(e)
+
+    async def agenerate(self):
+        """
+        Generate the report without saving it (for running alongside ResponseAgent).
+        """
+        self.log("Generating report...")
+        return await get_llm(temperature=0.0).ainvoke(self.build_messages())
+
+    def build_messages(self):
         system_prompt = self.read_prompt('description', 'prompt')
-        llm = get_llm(temperature=0.0)
-        
         context = f"User Request: {self.task_log.user_request}\n\nLog:\n{self.task_log.result_summary}"
         
-        messages = [
+        return [
             SystemMessage(content=system_prompt),
             HumanMessage(content=context)
         ]
+
+    def save_response(self, response):
+        report_content = response.content
         
-        try:
-            response = llm.invoke(messages)
-            report_content = response.content
-            
-            # Clean up markdown code blocks if present
-            if "```html" in report_content:
-                report_content = report_content.split("```html")[1].split("```")[0].strip()
-            elif "```" in report_content:
-                report_content = report_content.split("```")[1].split("```")[0].strip()
-            
-            slug = slugify(f"task-{self.task_log.id}-{timezone.now().strftime('%Y%m%d-%H%M%S')}")
-            
-            TaskReport.objects.create(
-                task=self.task_log,
-                slug=slug,
-                html_content=report_content
-            )
-            
-            return "reported"
+        # Clean up markdown code blocks if present
+        if "```html" in report_content:
+            report_content = report_content.split("```html")[1].split("```")[0].strip()
+        elif "```" in report_content:
+            report_content = report_content.split("```")[1].split("```")[0].strip()
+        
+        slug = slugify(f"task-{self.task_log.id}-{timezone.now().strftime('%Y%m%d-%H%M%S')}")
+        
+        TaskReport.objects.create(
+            task=self.task_log,
+            slug=slug,
+            html_content=report_content
+        )
+        
+        return "reported"
 
-        except Exception as e:
-            self.log(f"Error generating report: {str(e)}")
-            self.update_task_log(status='failed', error_message=str(e))
-            return "failed"
+    def handle_error(self, e):
+        self.raise_if_transient(e)
+        self.log(f"Error generating report: {str(e)}")
+        self.update_task_log(status='failed', error_message=str(e))
+        return "failed"
@@ -9,27 +9,37 @@ class ResponseAgent(BaseAgent):
     """
     def run(self):
         self.log("Generating user response...")
-        
+        try:
+            response = get_llm(temperature=0.7).invoke(self.build_messages())
+            return self.save_response(response)
+        except Exception as e:
+            return self.handle_error(e)
+
+    async def agenerate(self):
+        """
+        Generate the response without saving it (for running alongside DescriptionAgent).
+        """
+        self.log("Generating user response...")
+        return await get_llm(temperature=0.7).ainvoke(self.build_messages())
+
+    def build_messages(self):
         system_prompt = self.read_prompt('response', 'prompt')
-        llm = get_llm(temperature=0.7) 
-        
         context = f"User Request: {self.task_log.user_request}\n\nLog:\n{self.task_log.result_summary}"
         
-        messages = [
+        return [
             SystemMessage(content=system_prompt),
             HumanMessage(content=context)
         ]
+
+    def save_response(self, response):
+        # Replaces the execution log, so it must be saved after the report is generated
+        self.task_log.result_summary = response.content
+        self.task_log.save()
         
-        try:
-            response = llm.invoke(messages)
-            final_response = response.content
-            
-            self.task_log.result_summary = final_response
-            self.task_log.save()
-            
-            return "responded"
+        return "responded"
 
-        except Exception as e:
-            self.log(f"Error generating response: {str(e)}")
-            self.update_task_log(status='failed', error_message=str(e))
-            return "failed"
+    def handle_error(self, e):
+        self.raise_if_transient(e)
+        self.log(f"Error generating response: {str(e)}")
+        self.update_task_log(status='failed', error_message=str(e))
+        return "failed"
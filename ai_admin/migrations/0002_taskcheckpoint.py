@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_admin', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.CharField(choices=[('analysis', 'Analysis'), ('execution', 'Execution'), ('verification', 'Verification'), ('reporting', 'Reporting')], max_length=20, verbose_name='Stage')),
+                ('result', models.CharField(max_length=20, verbose_name='Result')),
+                ('result_summary', models.TextField(blank=True, verbose_name='Result Summary')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='ai_admin.tasklog', verbose_name='Task')),
+            ],
+            options={
+                'verbose_name': 'Task Checkpoint',
+                'verbose_name_plural': 'Task Checkpoints',
+                'ordering': ['created_at'],
+                'unique_together': {('task', 'stage')},
+            },
+        ),
+    ]
@@ -48,3 +48,30 @@ class TaskReport(models.Model):
 
     def __str__(self):
         return f"Report for Task {self.task.id}"
+
+
+class TaskCheckpoint(models.Model):
+    """
+    Output of a completed pipeline stage, so that a failed task can resume after it.
+    """
+    STAGE_CHOICES = [
+        ('analysis', _('Analysis')),
+        ('execution', _('Execution')),
+        ('verification', _('Verification')),
+        ('reporting', _('Reporting')),
+    ]
+
+    task = models.ForeignKey(TaskLog, on_delete=models.CASCADE, related_name='checkpoints', verbose_name=_("Task"))
+    stage = models.CharField(_("Stage"), max_length=20, choices=STAGE_CHOICES)
+    result = models.CharField(_("Result"), max_length=20)
+    result_summary = models.TextField(_("Result Summary"), blank=True)
+    created_at = models.DateTimeField(_("Created At"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Task Checkpoint")
+        verbose_name_plural = _("Task Checkpoints")
+        unique_together = ('task', 'stage')
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"Task {self.task_id}: {self.stage} ({self.result})"
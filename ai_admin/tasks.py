@@ -1,7 +1,12 @@
-from celery import shared_task
-from .models import TaskLog
+import asyncio
+from datetime import timedelta
+from celery import chain, shared_task
+from celery.utils.time import get_exponential_backoff_interval
+from django.utils import timezone
+from .models import TaskCheckpoint, TaskLog, TaskReport
 from .agents.analysis import AnalysisAgent
 from .agents.admin import AdminAgent
+from .agents.base import TransientAgentError
 from .agents.control import ControlAgent
 from .agents.description import DescriptionAgent
 from .agents.response import ResponseAgent
@@ -9,82 +14,294 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-@shared_task
-def start_admin_task(task_log_id):
+# Pipeline stages in order; each is a Celery task in the chain
+STAGES = ['analysis', 'execution', 'verification', 'reporting']
+
+# Results that complete a stage and are checkpointed. The first one passes
+# control to the next stage, the others finish the task.
+STAGE_RESULTS = {
+    'analysis': ('proceed', 'dialog_only'),
+    'execution': ('executed',),
+    'verification': ('verified',),
+    'reporting': ('responded',),
+}
+
+# Automatic retries after a transient LLM error, with exponential backoff.
+# The execution stage changes the database and is not idempotent, so it is
+# not retried automatically: the task fails and can be resumed by hand.
+STAGE_RETRIES = {
+    'analysis': 3,
+    'execution': 0,
+    'verification': 3,
+    'reporting': 3,
+}
+RETRY_BACKOFF = 10
+RETRY_BACKOFF_MAX = 300
+
+# A task whose worker died keeps its in-progress status. The other stages
+# are redelivered, but one that has not changed for this long is taken as
+# lost and can be resumed by hand.
+IN_PROGRESS_STATUSES = ('pending', 'analyzing', 'executing', 'verifying', 'reporting')
+STUCK_TASK_TIMEOUT = timedelta(hours=1)
+
+
+def run_reporting_agents(task_log):
     """
-    Entry point for the AI Admin Agent workflow.
+    Run DescriptionAgent and ResponseAgent with their LLM calls in parallel.
+
+    Both read the same user request and execution log, so the calls are
+    made concurrently and the results are saved afterwards in order: the
+    report first, then the response that replaces the log. A report saved
+    by an earlier attempt of the stage is kept. Returns the
+    (description, response) results.
     """
-    try:
-        task_log = TaskLog.objects.get(id=task_log_id)
-        logger.info(f"Starting admin task {task_log_id}")
-        
-        # 1. Analysis Agent
-        task_log.status = 'analyzing'
-        task_log.current_agent = 'AnalysisAgent'
+    agents = [ResponseAgent(task_log)]
+    if not TaskReport.objects.filter(task=task_log).exists():
+        agents.insert(0, DescriptionAgent(task_log))
+
+    async def generate():
+        return await asyncio.gather(*(agent.agenerate() for agent in agents), return_exceptions=True)
+
+    results = {}
+    for agent, response in zip(agents, asyncio.run(generate())):
+        if isinstance(response, Exception):
+            results[type(agent)] = agent.handle_error(response)
+        else:
+            results[type(agent)] = agent.save_response(response)
+    return results.get(DescriptionAgent, "reported"), results[ResponseAgent]
+
+
+# --- Stages ---
+
+
+def analyze(task_log):
+    task_log.status = 'analyzing'
+    task_log.current_agent = 'AnalysisAgent'
+    task_log.save()
+
+    result = AnalysisAgent(task_log).run()
+    if result == "dialog_only":
+        task_log.status = 'completed' # Or 'dialog_only' if we want to distinguish
+        task_log.current_agent = 'Completed'
+        task_log.save()
+    return result
+
+
+def execute(task_log):
+    # Status update is handled by AnalysisAgent, but we ensure it here (e.g. on resume)
+    if task_log.status != 'executing':
+        task_log.status = 'executing'
+        task_log.current_agent = 'AdminAgent'
         task_log.save()
-        
-        analysis_agent = AnalysisAgent(task_log)
-        result = analysis_agent.run()
-        
-        if result == "dialog_only":
-            task_log.status = 'completed' # Or 'dialog_only' if we want to distinguish
-            task_log.current_agent = 'Completed'
-            task_log.save()
-            logger.info(f"Task {task_log_id} completed as dialog only")
-            return
-        elif result != "proceed":
-            logger.info(f"Task {task_log_id} halted by AnalysisAgent: {result}")
-            return
-
-        # 2. Admin Agent
-        # Status update is handled by AnalysisAgent or previous step, but we ensure it here
-        if task_log.status != 'executing':
-             task_log.status = 'executing'
-             task_log.current_agent = 'AdminAgent'
-             task_log.save()
-        
-        admin_agent = AdminAgent(task_log)
-        result = admin_agent.run()
-        if result != "executed":
-            logger.info(f"Task {task_log_id} halted by AdminAgent: {result}")
-            return
-
-        # 3. Control Agent
-        # AdminAgent updates status to 'verifying', but we ensure it
-        if task_log.status != 'verifying':
-             task_log.status = 'verifying'
-             task_log.current_agent = 'ControlAgent'
-             task_log.save()
-        
-        control_agent = ControlAgent(task_log)
-        result = control_agent.run()
-        if result != "verified": # Assuming ControlAgent returns "verified" or "retry"
-             logger.info(f"Task {task_log_id} halted by ControlAgent: {result}")
-             return
-
-        # 4. Description Agent
-        task_log.status = 'reporting'
-        task_log.current_agent = 'DescriptionAgent'
+    return AdminAgent(task_log).run()
+
+
+def verify(task_log):
+    # AdminAgent updates status to 'verifying', but we ensure it
+    if task_log.status != 'verifying':
+        task_log.status = 'verifying'
+        task_log.current_agent = 'ControlAgent'
         task_log.save()
-        
-        description_agent = DescriptionAgent(task_log)
-        description_agent.run()
+    return ControlAgent(task_log).run()
+
+
+def report(task_log):
+    # Description Agent and Response Agent, in parallel
+    task_log.status = 'reporting'
+    task_log.current_agent = 'DescriptionAgent, ResponseAgent'
+    task_log.save()
 
-        # 5. Response Agent
+    description_result, response_result = run_reporting_agents(task_log)
+    if response_result == "responded":
+        # A failed report does not hold back the user's answer
         task_log.status = 'completed'
         task_log.current_agent = 'ResponseAgent'
         task_log.save()
-        
-        response_agent = ResponseAgent(task_log)
-        response_agent.run()
-        
-        logger.info(f"Task {task_log_id} completed successfully")
-        
+    return response_result
+
+
+STAGE_RUNNERS = {
+    'analysis': analyze,
+    'execution': execute,
+    'verification': verify,
+    'reporting': report,
+}
+
+
+def fail_task(task_log, error):
+    task_log.status = 'failed'
+    task_log.error_message = str(error)
+    task_log.save()
+
+
+def run_stage(task, stage, task_log_id):
+    """
+    Run a pipeline stage and checkpoint its output.
+
+    Returns the task log id for the next stage in the chain, or None when
+    the pipeline stops (finished, halted by an agent or failed).
+    """
+    if task_log_id is None:
+        # An earlier stage stopped the pipeline
+        return None
+    try:
+        task_log = TaskLog.objects.get(id=task_log_id)
     except TaskLog.DoesNotExist:
         logger.error(f"TaskLog {task_log_id} not found")
+        return None
+
+    checkpoint = task_log.checkpoints.filter(stage=stage).first()
+    if checkpoint is not None:
+        # Redelivered message: the stage is already done
+        return task_log_id if checkpoint.result == STAGE_RESULTS[stage][0] else None
+
+    logger.info(f"Task {task_log_id}: {stage} stage (attempt {task.request.retries + 1})")
+    try:
+        result = STAGE_RUNNERS[stage](task_log)
+    except TransientAgentError as e:
+        retries = STAGE_RETRIES[stage]
+        if task.request.retries < retries:
+            countdown = get_exponential_backoff_interval(
+                RETRY_BACKOFF, task.request.retries, RETRY_BACKOFF_MAX, full_jitter=True,
+            )
+            logger.warning(f"Task {task_log_id}: {stage} stage failed ({e}), retrying in {countdown} s")
+            raise task.retry(exc=e, countdown=countdown, max_retries=retries)
+        logger.error(f"Task {task_log_id}: {stage} stage failed after {task.request.retries} retries: {e}")
+        fail_task(task_log, e)
+        return None
     except Exception as e:
-        logger.error(f"Error in start_admin_task: {e}")
-        if 'task_log' in locals():
-            task_log.status = 'failed'
-            task_log.error_message = str(e)
-            task_log.save()
+        logger.error(f"Error in {stage} stage of task {task_log_id}: {e}")
+        fail_task(task_log, e)
+        return None
+
+    if result not in STAGE_RESULTS[stage]:
+        logger.info(f"Task {task_log_id} halted at {stage} stage: {result}")
+        return None
+
+    checkpoint, created = TaskCheckpoint.objects.get_or_create(
+        task=task_log,
+        stage=stage,
+        defaults={'result': result, 'result_summary': task_log.result_summary},
+    )
+    if not created:
+        # A redelivered copy of the message finished the stage first: its checkpoint wins
+        logger.warning(f"Task {task_log_id}: {stage} stage was already checkpointed ({checkpoint.result})")
+        result = checkpoint.result
+    if result != STAGE_RESULTS[stage][0] or stage == STAGES[-1]:
+        logger.info(f"Task {task_log_id} completed ({result})")
+        return None
+    return task_log_id
+
+
+# The message is acknowledged after the stage, so a stage lost with its
+# worker is delivered again. Execution is not idempotent: as with its
+# automatic retries (see STAGE_RETRIES), a lost execution stage is resumed
+# by hand once the task is stuck.
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def analyze_task(self, task_log_id):
+    return run_stage(self, 'analysis', task_log_id)
+
+
+@shared_task(bind=True)
+def execute_task(self, task_log_id):
+    return run_stage(self, 'execution', task_log_id)
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def verify_task(self, task_log_id):
+    return run_stage(self, 'verification', task_log_id)
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def report_task(self, task_log_id):
+    return run_stage(self, 'reporting', task_log_id)
+
+
+STAGE_TASKS = {
+    'analysis': analyze_task,
+    'execution': execute_task,
+    'verification': verify_task,
+    'reporting': report_task,
+}
+
+
+# --- Pipeline ---
+
+
+def admin_pipeline(task_log_id, from_stage=STAGES[0]):
+    """
+    Celery chain of the pipeline stages starting with from_stage.
+
+    Each stage passes the task log id on to the next one, or None to stop.
+    Use .delay() to queue it, or .apply() to run it in the current process.
+    """
+    first, *rest = STAGES[STAGES.index(from_stage):]
+    return chain(STAGE_TASKS[first].s(task_log_id), *(STAGE_TASKS[stage].s() for stage in rest))
+
+
+@shared_task
+def start_admin_task(task_log_id):
+    """
+    Entry point for the AI Admin Agent workflow.
+    """
+    logger.info(f"Starting admin task {task_log_id}")
+    admin_pipeline(task_log_id).delay()
+
+
+def last_checkpoint(task_log):
+    checkpoints = {checkpoint.stage: checkpoint for checkpoint in task_log.checkpoints.all()}
+    for stage in reversed(STAGES):
+        if stage in checkpoints:
+            return checkpoints[stage]
+    return None
+
+
+def is_stuck(task_log):
+    return (
+        task_log.status in IN_PROGRESS_STATUSES
+        and task_log.updated_at < timezone.now() - STUCK_TASK_TIMEOUT
+    )
+
+
+def next_stage(task_log):
+    """
+    The stage a failed or stuck task resumes from, or None if it has nothing left to run.
+    """
+    if task_log.status != 'failed' and not is_stuck(task_log):
+        return None
+    checkpoint = last_checkpoint(task_log)
+    if checkpoint is None:
+        return STAGES[0]
+    if checkpoint.result != STAGE_RESULTS[checkpoint.stage][0] or checkpoint.stage == STAGES[-1]:
+        return None
+    return STAGES[STAGES.index(checkpoint.stage) + 1]
+
+
+def resume_admin_task(task_log):
+    """
+    Continue a failed or stuck task from the stage after its last checkpoint.
+
+    The completed stages are not run again: the task state is restored from
+    the last checkpoint. Returns the stage the task resumes from, or None.
+    """
+    stage = next_stage(task_log)
+    if stage is None:
+        return None
+
+    checkpoint = last_checkpoint(task_log)
+    # Claim the task: of two concurrent resumes only one queues the chain
+    claimed = TaskLog.objects.filter(
+        pk=task_log.pk, status=task_log.status, updated_at=task_log.updated_at,
+    ).update(
+        status='pending',
+        current_agent='',
+        error_message='',
+        result_summary=checkpoint.result_summary if checkpoint else '',
+        updated_at=timezone.now(),
+    )
+    if claimed != 1:
+        return None
+
+    logger.info(f"Resuming admin task {task_log.id} from {stage} stage")
+    admin_pipeline(task_log.id, stage).delay()
+    return stage
@@ -0,0 +1,204 @@
+import asyncio
+from datetime import timedelta
+from unittest import mock
+
+import httpx
+from django.contrib.auth.models import User
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from langchain_core.messages import AIMessage
+
+from clinic.celery import app
+
+from .agents.base import TransientAgentError
+from .models import TaskCheckpoint, TaskLog, TaskReport
+from .tasks import (
+    STAGE_TASKS, admin_pipeline, next_stage, report, resume_admin_task, run_reporting_agents,
+)
+
+
+class FakeLLM:
+    """Answers ``content`` once every LLM of the test has been called, or raises ``error``"""
+
+    def __init__(self, content='', error=None):
+        self.content = content
+        self.error = error
+        self.started = []
+        self.expected = 1
+
+    async def ainvoke(self, messages):
+        self.started.append(self)
+        # Sequential calls would never see the other one start
+        async with asyncio.timeout(1):
+            while len(self.started) < self.expected:
+                await asyncio.sleep(0.01)
+        if self.error:
+            raise self.error
+        return AIMessage(content=self.content)
+
+
+class ReportingAgentsTests(TestCase):
+    def setUp(self):
+        self.task_log = TaskLog.objects.create(
+            user_request="Добавь услугу «Чипирование»", status='verifying', result_summary="Created service 7",
+        )
+
+    def use_llms(self, description=None, response=None):
+        started = []
+        expected = (description is not None) + (response is not None)
+        for module, llm in (('description', description), ('response', response)):
+            if llm is not None:
+                llm.started, llm.expected = started, expected
+                patcher = mock.patch(f'ai_admin.agents.{module}.get_llm', return_value=llm)
+                patcher.start()
+                self.addCleanup(patcher.stop)
+
+    def test_agents_run_concurrently_and_save_in_order(self):
+        self.use_llms(FakeLLM("```html\n<p>Report</p>\n```"), FakeLLM("Услуга добавлена."))
+
+        self.assertEqual(run_reporting_agents(self.task_log), ("reported", "responded"))
+        self.assertEqual(TaskReport.objects.get(task=self.task_log).html_content, "<p>Report</p>")
+        self.task_log.refresh_from_db()
+        self.assertEqual(self.task_log.result_summary, "Услуга добавлена.")
+
+    def test_saved_report_is_kept(self):
+        TaskReport.objects.create(task=self.task_log, slug='task-report', html_content="<p>Old</p>")
+        self.use_llms(response=FakeLLM("Услуга добавлена."))
+
+        self.assertEqual(run_reporting_agents(self.task_log), ("reported", "responded"))
+        self.assertEqual(TaskReport.objects.get().html_content, "<p>Old</p>")
+
+    def test_failed_report_does_not_hold_back_answer(self):
+        self.use_llms(FakeLLM(error=ValueError("bad report")), FakeLLM("Услуга добавлена."))
+
+        self.assertEqual(report(self.task_log), "responded")
+        self.task_log.refresh_from_db()
+        self.assertEqual(self.task_log.status, 'completed')
+        self.assertFalse(TaskReport.objects.exists())
+
+    def test_transient_error_is_raised_for_retry(self):
+        self.use_llms(FakeLLM("<p>Report</p>"), FakeLLM(error=httpx.ConnectError("down")))
+
+        with self.assertRaises(TransientAgentError):
+            run_reporting_agents(self.task_log)
+
+
+@mock.patch('ai_admin.tasks.get_exponential_backoff_interval', return_value=0)
+class PipelineTests(TestCase):
+    def setUp(self):
+        # resume_admin_task queues the chain with .delay()
+        app.conf.task_always_eager = True
+        self.addCleanup(setattr, app.conf, 'task_always_eager', False)
+        self.task_log = TaskLog.objects.create(user_request="Добавь услугу «Чипирование»")
+        self.agents = {}
+        for name, result in (
+            ('analysis.AnalysisAgent', 'proceed'),
+            ('admin.AdminAgent', 'executed'),
+            ('control.ControlAgent', 'verified'),
+        ):
+            patcher = mock.patch(f'ai_admin.agents.{name}.run', return_value=result)
+            self.agents[name.split('.')[0]] = patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch('ai_admin.tasks.run_reporting_agents', return_value=("reported", "responded"))
+        self.reporting = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_pipeline(self):
+        admin_pipeline(self.task_log.id).apply().get()
+        self.task_log.refresh_from_db()
+
+    def stages(self):
+        return list(self.task_log.checkpoints.values_list('stage', flat=True))
+
+    def test_stages_are_checkpointed(self, backoff):
+        self.run_pipeline()
+        self.assertEqual(self.task_log.status, 'completed')
+        self.assertEqual(self.stages(), ['analysis', 'execution', 'verification', 'reporting'])
+
+    def test_transient_error_is_retried(self, backoff):
+        self.agents['control'].side_effect = [TransientAgentError("timeout"), 'verified']
+        with self.assertLogs('ai_admin.tasks', 'WARNING'):
+            self.run_pipeline()
+        self.assertEqual(self.task_log.status, 'completed')
+        self.assertEqual(self.agents['control'].call_count, 2)
+
+    def test_failed_task_resumes_after_last_checkpoint(self, backoff):
+        self.agents['control'].side_effect = ValueError("bad result")
+        with self.assertLogs('ai_admin.tasks', 'ERROR'):
+            self.run_pipeline()
+        self.assertEqual(self.task_log.status, 'failed')
+        self.assertEqual(next_stage(self.task_log), 'verification')
+
+        self.agents['control'].side_effect = None
+        self.assertEqual(resume_admin_task(self.task_log), 'verification')
+        self.task_log.refresh_from_db()
+        self.assertEqual(self.task_log.status, 'completed')
+        self.assertEqual(self.agents['analysis'].call_count, 1)
+        self.assertEqual(self.agents['admin'].call_count, 1)
+        self.assertIsNone(next_stage(self.task_log))
+
+    def test_failed_task_is_resumed_once(self, backoff):
+        self.agents['control'].side_effect = ValueError("bad result")
+        with self.assertLogs('ai_admin.tasks', 'ERROR'):
+            self.run_pipeline()
+
+        # A double click: both requests loaded the failed task
+        other = TaskLog.objects.get(pk=self.task_log.pk)
+        with mock.patch('ai_admin.tasks.admin_pipeline') as pipeline:
+            self.assertEqual(resume_admin_task(self.task_log), 'verification')
+            self.assertIsNone(resume_admin_task(other))
+        pipeline.return_value.delay.assert_called_once_with()
+
+    def test_task_lost_with_its_worker_is_resumed(self, backoff):
+        # Only execution, which is not idempotent, is not redelivered
+        self.assertEqual(
+            {stage: task.acks_late and task.reject_on_worker_lost for stage, task in STAGE_TASKS.items()},
+            {'analysis': True, 'execution': False, 'verification': True, 'reporting': True},
+        )
+
+        # The worker died during verification
+        self.agents['control'].side_effect = ValueError("bad result")
+        with self.assertLogs('ai_admin.tasks', 'ERROR'):
+            self.run_pipeline()
+        TaskLog.objects.filter(pk=self.task_log.pk).update(status='verifying', updated_at=timezone.now())
+        self.task_log.refresh_from_db()
+        self.assertIsNone(next_stage(self.task_log))
+
+        TaskLog.objects.filter(pk=self.task_log.pk).update(updated_at=timezone.now() - timedelta(hours=2))
+        self.task_log.refresh_from_db()
+        self.agents['control'].side_effect = None
+        self.assertEqual(resume_admin_task(self.task_log), 'verification')
+        self.task_log.refresh_from_db()
+        self.assertEqual(self.task_log.status, 'completed')
+
+    def test_concurrent_checkpoint_stops_cleanly(self, backoff):
+        def finish_elsewhere():
+            # Another delivery of the same message finishes the stage meanwhile
+            TaskCheckpoint.objects.create(task=self.task_log, stage='analysis', result='dialog_only')
+            return 'proceed'
+
+        self.agents['analysis'].side_effect = finish_elsewhere
+        with self.assertLogs('ai_admin.tasks', 'WARNING'):
+            self.run_pipeline()
+        self.assertEqual(self.stages(), ['analysis'])
+        self.agents['admin'].assert_not_called()
+
+
+class ResumeViewTests(TestCase):
+    def setUp(self):
+        self.task_log = TaskLog.objects.create(user_request="Добавь услугу", status='failed')
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.url = reverse('ai_admin:api_resume_task', args=[self.task_log.id])
+
+    @mock.patch('ai_admin.views.resume_admin_task', return_value='analysis')
+    def test_resume_requires_csrf_token(self, resume):
+        self.assertEqual(self.client.post(self.url).status_code, 403)
+        resume.assert_not_called()
+
+        dashboard = self.client.get(reverse('ai_admin:dashboard'))
+        self.assertContains(dashboard, "'X-CSRFToken'")
+        token = dashboard.cookies['csrftoken'].value
+        response = self.client.post(self.url, HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.json()['resumed_from'], 'analysis')
@@ -5,6 +5,7 @@ app_name = 'ai_admin'
 
 urlpatterns = [
     path('task/<int:task_id>/status/', views.task_status, name='task_status'),
+    path('task/<int:task_id>/resume/', views.api_resume_task, name='api_resume_task'),
     path('report/<slug:slug>/', views.view_report, name='view_report'),
     path('dashboard/', views.admin_dashboard, name='dashboard'),
     path('api/chat/', views.api_chat, name='api_chat'),
@@ -2,7 +2,7 @@ from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import user_passes_test
 from django.http import JsonResponse
 from .models import TaskLog, TaskReport
-from .tasks import start_admin_task
+from .tasks import last_checkpoint, next_stage, resume_admin_task, start_admin_task
 import json
 from django.views.decorators.csrf import csrf_exempt
 
@@ -15,6 +15,7 @@ def task_status(request, task_id):
     API endpoint to check the status of a task.
     """
     task = get_object_or_404(TaskLog, id=task_id)
+    checkpoint = last_checkpoint(task)
     return JsonResponse({
         'id': task.id,
         'status': task.status,
@@ -22,6 +23,8 @@ def task_status(request, task_id):
         'result_summary': task.result_summary,
         'error_message': task.error_message,
         'report_slug': task.report.slug if hasattr(task, 'report') else None,
+        'completed_stage': checkpoint.stage if checkpoint else None,
+        'resumable': next_stage(task) is not None,
     })
 
 @user_passes_test(is_superuser)
@@ -79,3 +82,28 @@ def api_task_list(request):
         'id', 'user_request', 'status', 'created_at', 'current_agent', 'result_summary'
     )
     return JsonResponse({'tasks': list(tasks)})
+
+@user_passes_test(is_superuser)
+def api_resume_task(request, task_id):
+    """
+    API to continue a failed task from the stage after its last checkpoint.
+
+    Completed stages are not run again. Resuming the execution stage runs
+    AdminAgent once more, including changes it may have made before failing.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    task = get_object_or_404(TaskLog, id=task_id)
+    try:
+        stage = resume_admin_task(task)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+    if stage is None:
+        return JsonResponse({'error': 'Task cannot be resumed'}, status=409)
+
+    return JsonResponse({
+        'id': task.id,
+        'status': task.status,
+        'resumed_from': stage
+    })
@@ -1,3 +1,42 @@
 from django.contrib import admin
+from django.template.response import TemplateResponse
+from django.urls import path
 
-# Register your models here.
+from .models import ChatTurnMetric
+from .telemetry import daily_stats
+
+
+@admin.register(ChatTurnMetric)
+class ChatTurnMetricAdmin(admin.ModelAdmin):
+    list_display = (
+        'created_at', 'route', 'streamed', 'wall_ms', 'llm_calls', 'llm_ms',
+        'prompt_tokens', 'completion_tokens', 'tool_calls', 'tool_ms',
+    )
+    list_filter = ('route', 'streamed', 'created_at')
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('stats/', self.admin_site.admin_view(self.stats_view), name='chatbot_chatturnmetric_stats'),
+        ] + super().get_urls()
+
+    def stats_view(self, request):
+        """Daily p50/p95 of answer, LLM call and tool durations"""
+        try:
+            days = max(1, min(int(request.GET.get('days', 14)), 90))
+        except ValueError:
+            days = 14
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': "Статистика ответов чат-бота",
+            'days': days,
+            'stats': daily_stats(days),
+        }
+        return TemplateResponse(request, 'admin/chatbot/chatturnmetric/stats.html', context)
@@ -0,0 +1,142 @@
+"""
+Admission control for chatbot requests.
+
+* Per-client rate limits: a token bucket per session
+  (``CHATBOT_RATE_PER_MINUTE``) and per IP (``CHATBOT_IP_RATE_PER_MINUTE``,
+  since many visitors can share one address), up to ``CHATBOT_RATE_BURST``
+  messages in a row.
+* A global limit on concurrent LLM calls (``CHATBOT_MAX_CONCURRENT``) for
+  all workers: a slot is a cache key taken with ``cache.add``. With Redis
+  the limit is shared, with local memory it is per process.
+* A bounded queue: without a free slot a request waits up to
+  ``CHATBOT_QUEUE_TIMEOUT`` seconds if the queue has room
+  (``CHATBOT_QUEUE_SIZE``), otherwise it is refused at once.
+
+A refusal is ``Overloaded`` with the suggested delay for the Retry-After
+header. Slot keys expire, so a crashed worker does not hold a slot for good.
+"""
+
+import asyncio
+import math
+import random
+import secrets
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+SLOT_KEY_PREFIX = 'chatbot:llm_slot:'
+QUEUE_KEY_PREFIX = 'chatbot:llm_queue:'
+RATE_KEY_PREFIX = 'chatbot:rate:'
+
+# Longer than any agent answer (a few LLM calls with a 90 s timeout)
+SLOT_TIMEOUT = 60 * 5
+POLL_INTERVAL = 0.2
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Chat is overloaded, retry after {retry_after} s")
+        self.retry_after = retry_after
+
+
+# --- Client request rate ---
+
+
+def client_limits(request, session_id=None):
+    """Client limits: [(key, messages per minute)] for the IP and the chat session"""
+    # nginx overwrites X-Real-IP with the client address
+    ip = request.headers.get('X-Real-IP') or request.META.get('REMOTE_ADDR', '')
+    limits = [(f'ip:{ip}', settings.CHATBOT_IP_RATE_PER_MINUTE)]
+    if session_id:
+        limits.append((f'session:{session_id}', settings.CHATBOT_RATE_PER_MINUTE))
+    return limits
+
+
+async def _take_token(key, rate, burst, now):
+    """Take a token from the client bucket; returns the delay until the next one (0 if allowed)"""
+    cache_key = RATE_KEY_PREFIX + key
+    tokens, updated_at = await cache.aget(cache_key) or (burst, now)
+    tokens = min(burst, tokens + (now - updated_at) * rate)
+    if tokens < 1:
+        return math.ceil((1 - tokens) / rate)
+    # The read and the write are not atomic: a race gives the client one extra token at most
+    await cache.aset(cache_key, (tokens - 1, now), math.ceil(burst / rate) + 1)
+    return 0
+
+
+async def check_rate(limits):
+    """0 if the client is within its limits, otherwise the delay in seconds"""
+    now = time.time()
+    for key, per_minute in limits:
+        retry_after = await _take_token(key, per_minute / 60, settings.CHATBOT_RATE_BURST, now)
+        if retry_after:
+            return retry_after
+    return 0
+
+
+# --- LLM slots and the queue ---
+
+
+async def _take_key(prefix, count, token, timeout):
+    if count <= 0:
+        return None
+    start = random.randrange(count)
+    for i in range(count):
+        key = f'{prefix}{(start + i) % count}'
+        if await cache.aadd(key, token, timeout):
+            return key
+    return None
+
+
+async def _release_key(key, token):
+    # The read and the delete are not atomic: if the key expired and another
+    # client took it in between, its key is freed and one extra LLM call runs
+    if await cache.aget(key) == token:
+        await cache.adelete(key)
+
+
+class Admission:
+    """A taken LLM slot; freed with ``release()``"""
+
+    def __init__(self, key, token):
+        self.key = key
+        self.token = token
+
+    async def release(self):
+        if self.key is not None:
+            await _release_key(self.key, self.token)
+            self.key = None
+
+
+async def acquire():
+    """Take an LLM slot, waiting for it in the queue if needed"""
+    token = secrets.token_hex(8)
+    slots = settings.CHATBOT_MAX_CONCURRENT
+    key = await _take_key(SLOT_KEY_PREFIX, slots, token, SLOT_TIMEOUT)
+    if key is not None:
+        return Admission(key, token)
+
+    timeout = settings.CHATBOT_QUEUE_TIMEOUT
+    ticket = await _take_key(QUEUE_KEY_PREFIX, settings.CHATBOT_QUEUE_SIZE, token, math.ceil(timeout) + 1)
+    if ticket is None:
+        raise Overloaded(max(1, math.ceil(timeout)))
+    try:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(POLL_INTERVAL)
+            key = await _take_key(SLOT_KEY_PREFIX, slots, token, SLOT_TIMEOUT)
+            if key is not None:
+                return Admission(key, token)
+        raise Overloaded(max(1, math.ceil(timeout)))
+    finally:
+        await _release_key(ticket, token)
+
+
+async def release_after(admission, events):
+    """Yield the stream events and free the slot when the stream ends or is aborted"""
+    try:
+        async for event in events:
+            yield event
+    finally:
+        await admission.release()
@@ -3,18 +3,39 @@ LangChain agent for the veterinary clinic AI assistant.
 Uses OpenRouter with the glm-4.5-air:free model.
 """
 
+import logging
 import os
+import threading
 from typing import List, Dict, Any
 
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import create_react_agent
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk, SystemMessage, ToolMessage
 
-from .prompts import SYSTEM_PROMPT, SEARCH_RESTRICTION_PROMPT
-from .tools import get_clinic_info, get_services_list, get_veterinarians, search_veterinary_info
+from . import answer_cache
+from .telemetry import measure_turn
+from .router import route_message
+from .prompts import SYSTEM_PROMPT, SEARCH_RESTRICTION_PROMPT, SUMMARY_PROMPT
+from .tools import (
+    get_clinic_info, get_services_list, get_veterinarians, search_clinic_knowledge, search_veterinary_info,
+)
 
+logger = logging.getLogger(__name__)
 
-def get_llm():
+# Keep-alive connection pool to OpenRouter, shared by all requests of the process
+HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=120)
+HTTP_TIMEOUT = httpx.Timeout(90.0, connect=10.0)
+
+_agent = None
+_llm = None
+_http_clients = None
+_agent_lock = threading.Lock()
+
+
+def get_llm(http_client=None, http_async_client=None):
     """Initialize the LLM with OpenRouter configuration."""
     api_key = os.getenv("OPENROUTER_API_KEY")
     
@@ -27,6 +48,10 @@ def get_llm():
         openai_api_base="https://openrouter.ai/api/v1",
         temperature=0.7,
         max_tokens=1024,
+        # Token usage in streamed responses too, for chatbot.telemetry
+        stream_usage=True,
+        http_client=http_client,
+        http_async_client=http_async_client,
     )
 
 
@@ -36,13 +61,15 @@ def get_tools():
         get_clinic_info,
         get_services_list,
         get_veterinarians,
+        search_clinic_knowledge,
         search_veterinary_info,
     ]
 
 
-def create_agent():
+def create_agent(llm=None):
     """Create and return the LangChain agent with tools."""
-    llm = get_llm()
+    if llm is None:
+        llm = get_llm()
     tools = get_tools()
     
     # Create the agent using langgraph's create_react_agent
@@ -57,6 +84,59 @@ def create_agent():
     return agent
 
 
+def get_agent():
+    """
+    Return the agent shared by all requests of this worker process.
+    
+    The LLM client with its connection pool and the compiled graph are built
+    on first use. The compiled graph keeps no state between calls (there is
+    no checkpointer), so concurrent invoke() calls from several threads are safe.
+    """
+    global _agent, _llm, _http_clients
+    
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                # Clients open connections lazily, so nothing leaks if get_llm() raises
+                http_client = httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+                http_async_client = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+                llm = get_llm(http_client, http_async_client)
+                _http_clients = (http_client, http_async_client)
+                _llm = llm
+                _agent = create_agent(llm)
+    return _agent
+
+
+def get_shared_llm():
+    """The pooled LLM client of the shared agent, for calls outside the agent."""
+    get_agent()
+    return _llm
+
+
+def reset_agent():
+    """Drop the shared agent (e.g. after the API key changes); the next call rebuilds it."""
+    global _agent, _llm, _http_clients
+    
+    with _agent_lock:
+        if _http_clients is not None:
+            # The async client is left to the garbage collector: closing it
+            # needs an event loop, and there are no requests on it any more
+            _http_clients[0].close()
+        _agent = None
+        _llm = None
+        _http_clients = None
+
+
+def use_llm(llm):
+    """Run the shared agent on the given LLM instead of OpenRouter (offline replay benchmark)."""
+    global _agent, _llm
+    
+    reset_agent()
+    with _agent_lock:
+        _llm = llm
+        _agent = create_agent(llm)
+
+
 def convert_chat_history(history: List[Dict[str, str]]) -> List:
     """Convert chat history from dict format to LangChain message format."""
     messages = []
@@ -65,9 +145,89 @@ def convert_chat_history(history: List[Dict[str, str]]) -> List:
             messages.append(HumanMessage(content=msg.get("content", "")))
         elif msg.get("role") == "assistant":
             messages.append(AIMessage(content=msg.get("content", "")))
+        elif msg.get("role") == "summary":
+            # Older turns compacted by chatbot.sessions
+            messages.append(SystemMessage(content=SUMMARY_HISTORY_PREFIX + msg.get("content", "")))
     return messages
 
 
+def summarize_conversation(summary: str, history: List[Dict[str, str]]) -> str:
+    """Fold older chat messages into the running summary of the conversation."""
+    roles = {"user": "Посетитель", "assistant": "Ассистент"}
+    dialog = "\n".join(f"{roles.get(msg['role'], msg['role'])}: {msg['content']}" for msg in history)
+    result = get_shared_llm().invoke([HumanMessage(content=SUMMARY_PROMPT.format(summary=summary, dialog=dialog))])
+    return result.content.strip() if isinstance(result.content, str) else ""
+
+
+SUMMARY_HISTORY_PREFIX = "Краткое содержание начала диалога:\n"
+
+UNAVAILABLE_MESSAGE = "Ассистент временно недоступен. Пожалуйста, свяжитесь с нами по телефону."
+ERROR_MESSAGE = "Извините, произошла ошибка. Пожалуйста, попробуйте позже или свяжитесь с нами по телефону."
+NO_ANSWER_MESSAGE = "Извините, произошла ошибка при обработке запроса."
+
+# Answers that are not kept in the session history
+FAILED_ANSWERS = {UNAVAILABLE_MESSAGE, ERROR_MESSAGE, NO_ANSWER_MESSAGE}
+
+
+def build_messages(user_message: str, chat_history: List[Dict[str, str]] = None) -> List:
+    """Convert history to LangChain format and add the current message."""
+    messages = convert_chat_history(chat_history or [])
+    messages.append(HumanMessage(content=user_message))
+    return messages
+
+
+def extract_response(result: Dict[str, Any]) -> str:
+    """Return the last non-empty AI message of an agent result."""
+    if result and "messages" in result:
+        for msg in reversed(result["messages"]):
+            if isinstance(msg, AIMessage) and msg.content:
+                return msg.content
+    return NO_ANSWER_MESSAGE
+
+
+def used_tools(result: Dict[str, Any]) -> List[str]:
+    """Names of the tools called while producing an agent result."""
+    return [msg.name for msg in result.get("messages", []) if isinstance(msg, ToolMessage)]
+
+
+def is_missing_key_error(error: Exception) -> bool:
+    return isinstance(error, ValueError) and "OPENROUTER_API_KEY" in str(error)
+
+
+def error_response(error: Exception) -> str:
+    if is_missing_key_error(error):
+        return UNAVAILABLE_MESSAGE
+    # Log the error in production
+    print(f"Chat agent error: {error}")
+    return ERROR_MESSAGE
+
+
+def answer_with_tools(result: Dict[str, Any]):
+    """(answer, tools used) for the answer cache; tools are None if there is no answer."""
+    answer = extract_response(result)
+    if answer == NO_ANSWER_MESSAGE:
+        return answer, None
+    return answer, used_tools(result)
+
+
+def routed_answer(user_message: str):
+    """Answer from chatbot.router when the message needs no LLM, else None."""
+    if not settings.CHATBOT_ROUTER:
+        return None
+    try:
+        route = route_message(user_message)
+    except Exception:
+        # The agent can still answer
+        logger.exception("Chat router error")
+        return None
+    return route.answer if route else None
+
+
+def use_answer_cache(chat_history) -> bool:
+    """Only first-turn questions are cached: later answers depend on the dialog."""
+    return settings.CHATBOT_ANSWER_CACHE and not chat_history
+
+
 def chat(user_message: str, chat_history: List[Dict[str, str]] = None) -> str:
     """
     Process a user message and return the assistant's response.
@@ -79,33 +239,198 @@ def chat(user_message: str, chat_history: List[Dict[str, str]] = None) -> str:
     Returns:
         The assistant's response string
     """
-    if chat_history is None:
-        chat_history = []
-    
-    try:
-        agent = create_agent()
+    with measure_turn() as turn:
+        answer = routed_answer(user_message)
+        if answer is not None:
+            turn.route = "router"
+            return answer
+        
+        # Stays "cache" unless the answer cache calls compute()
+        turn.route = "cache"
+        
+        def compute():
+            turn.route = "agent"
+            try:
+                result = get_agent().invoke(
+                    {"messages": build_messages(user_message, chat_history)},
+                    config={"callbacks": [turn]},
+                )
+            except Exception as e:
+                turn.route = "error"
+                return error_response(e), None
+            return answer_with_tools(result)
+        
+        if not use_answer_cache(chat_history):
+            return compute()[0]
+        return answer_cache.answer_once(user_message, compute)
+
+
+async def achat(user_message: str, chat_history: List[Dict[str, str]] = None) -> str:
+    """Async version of chat(): waits on OpenRouter without holding a thread."""
+    with measure_turn() as turn:
+        answer = await sync_to_async(routed_answer)(user_message)
+        if answer is not None:
+            turn.route = "router"
+            return answer
+        
+        turn.route = "cache"
         
-        # Convert history to LangChain format and add current message
-        messages = convert_chat_history(chat_history)
-        messages.append(HumanMessage(content=user_message))
+        async def compute():
+            turn.route = "agent"
+            try:
+                result = await get_agent().ainvoke(
+                    {"messages": build_messages(user_message, chat_history)},
+                    config={"callbacks": [turn]},
+                )
+            except Exception as e:
+                turn.route = "error"
+                return error_response(e), None
+            return answer_with_tools(result)
         
-        # Run the agent
-        result = agent.invoke({"messages": messages})
+        if not use_answer_cache(chat_history):
+            return (await compute())[0]
+        return await answer_cache.aanswer_once(user_message, compute)
+
+
+class StreamEvents:
+    """
+    Turns agent.stream(stream_mode="messages") chunks into chat events.
+    
+    Events are (event, data) pairs:
+        ("token", {"text": "..."})           - next chunk of LLM text
+        ("tool", {"name": "...", "status": "start" | "end"})
+        ("done", {"response": "..."})        - final answer, always last on success
+        ("error", {"error": "..."})
+    
+    Text streamed before a tool call is the model thinking aloud; clients
+    should replace it with the text that follows the tool results.
+    """
+    
+    def __init__(self):
+        self.response = ""
+        self.started_tools = set()
+        self.tools = []
+    
+    def feed(self, chunk) -> List:
+        events = []
+        if isinstance(chunk, AIMessage):
+            # Models that do not stream deliver each step as one whole message
+            tool_calls = chunk.tool_call_chunks if isinstance(chunk, AIMessageChunk) else chunk.tool_calls
+            for tool_call in tool_calls:
+                # The name arrives in the first chunk of each tool call
+                if tool_call.get("name") and tool_call.get("id") not in self.started_tools:
+                    self.started_tools.add(tool_call.get("id"))
+                    self.tools.append(tool_call["name"])
+                    self.response = ""
+                    events.append(("tool", {"name": tool_call["name"], "status": "start"}))
+            if chunk.content and isinstance(chunk.content, str):
+                self.response += chunk.content
+                events.append(("token", {"text": chunk.content}))
+        elif isinstance(chunk, ToolMessage):
+            events.append(("tool", {"name": chunk.name, "status": "end"}))
+        return events
+    
+    def done(self):
+        return "done", {"response": self.response or NO_ANSWER_MESSAGE}
+    
+    @staticmethod
+    def error(error: Exception):
+        # The response has already started, so errors are reported as events
+        return "error", {"error": error_response(error)}
+    
+    @staticmethod
+    def cached(answer: str):
+        return [("token", {"text": answer}), ("done", {"response": answer})]
+
+
+def chat_stream(user_message: str, chat_history: List[Dict[str, str]] = None):
+    """Process a user message, yielding StreamEvents events as the answer is generated."""
+    with measure_turn(streamed=True) as turn:
+        answer = routed_answer(user_message)
+        if answer is not None:
+            turn.route = "router"
+            yield from StreamEvents.cached(answer)
+            return
+        
+        cacheable = use_answer_cache(chat_history)
+        owner = False
+        if cacheable:
+            answer = answer_cache.get_cached_answer(user_message)
+            if answer is None:
+                owner = answer_cache.claim(user_message)
+                if not owner:
+                    # The same question is being answered: replay that answer
+                    answer = answer_cache.wait_for_answer(user_message)
+            if answer is not None:
+                turn.route = "cache"
+                yield from StreamEvents.cached(answer)
+                return
+            versions = answer_cache.current_versions()
         
-        # Extract the response from the result
-        if result and "messages" in result:
-            # Get the last AI message
-            for msg in reversed(result["messages"]):
-                if isinstance(msg, AIMessage) and msg.content:
-                    return msg.content
+        try:
+            events = StreamEvents()
+            try:
+                agent = get_agent()
+                messages = build_messages(user_message, chat_history)
+                stream = agent.stream({"messages": messages}, stream_mode="messages", config={"callbacks": [turn]})
+                for chunk, metadata in stream:
+                    yield from events.feed(chunk)
+            except Exception as e:
+                turn.route = "error"
+                yield events.error(e)
+                return
+            
+            if cacheable and events.response:
+                answer_cache.store_answer(user_message, events.response, events.tools, versions)
+            yield events.done()
+        finally:
+            # Also when the client disconnects: waiters then answer themselves
+            if owner:
+                answer_cache.release(user_message)
+
+
+async def achat_stream(user_message: str, chat_history: List[Dict[str, str]] = None):
+    """Async version of chat_stream() built on agent.astream."""
+    with measure_turn(streamed=True) as turn:
+        answer = await sync_to_async(routed_answer)(user_message)
+        if answer is not None:
+            turn.route = "router"
+            for event in StreamEvents.cached(answer):
+                yield event
+            return
         
-        return "Извините, произошла ошибка при обработке запроса."
+        cacheable = use_answer_cache(chat_history)
+        owner = False
+        if cacheable:
+            answer = await sync_to_async(answer_cache.get_cached_answer)(user_message)
+            if answer is None:
+                owner = await answer_cache.aclaim(user_message)
+                if not owner:
+                    answer = await answer_cache.await_answer(user_message)
+            if answer is not None:
+                turn.route = "cache"
+                for event in StreamEvents.cached(answer):
+                    yield event
+                return
+            versions = await sync_to_async(answer_cache.current_versions)()
         
-    except ValueError as e:
-        if "OPENROUTER_API_KEY" in str(e):
-            return "Ассистент временно недоступен. Пожалуйста, свяжитесь с нами по телефону."
-        raise
-    except Exception as e:
-        # Log the error in production
-        print(f"Chat agent error: {e}")
-        return f"Извините, произошла ошибка. Пожалуйста, попробуйте позже или свяжитесь с нами по телефону."
+        try:
+            events = StreamEvents()
+            try:
+                agent = get_agent()
+                messages = build_messages(user_message, chat_history)
+                stream = agent.astream({"messages": messages}, stream_mode="messages", config={"callbacks": [turn]})
+                async for chunk, metadata in stream:
+                    for event in events.feed(chunk):
+                        yield event
+            except Exception as e:
+                turn.route = "error"
+                yield events.error(e)
+                return
+            
+            if cacheable and events.response:
+                await sync_to_async(answer_cache.store_answer)(user_message, events.response, events.tools, versions)
+            yield events.done()
+        finally:
+            if owner:
+                await answer_cache.arelease(user_message)
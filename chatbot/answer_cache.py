@@ -0,0 +1,281 @@
+"""
+Cache of chatbot answers to the first question of a dialog.
+
+The question is normalized (case, "ё", punctuation, whitespace) and keys an
+entry in ``core.cache``. The entry is tagged with the data used by the tools
+the agent called (contacts, services, vets) and becomes a miss as soon as
+that data changes.
+
+Optionally (``CHATBOT_ANSWER_SIMILARITY``) a question can match a cached one
+by the cosine similarity of their TF-IDF vectors. The question index is
+stored in the cache as one value and built in process memory.
+
+Identical questions asked at the same time wait for a single LLM call
+(``answer_once`` / ``aanswer_once``, and ``claim`` / ``wait_for_answer`` for
+the streaming paths): the first request marks the question as in flight
+with ``cache.add``, the others wait for its answer to appear in the cache.
+"""
+
+import asyncio
+import hashlib
+import math
+import re
+import time
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache import get_tag_versions, set_entry
+
+from .tools import TOOL_DEPENDENCIES
+
+ANSWER_KEY_PREFIX = 'chatbot:answer:'
+INDEX_KEY = 'chatbot:answer_index'
+INFLIGHT_KEY_PREFIX = 'chatbot:answer_inflight:'
+
+# Common tag of all answers: invalidated when the prompt or the model changes
+ANSWERS_TAG = 'chatbot.answers'
+
+ALL_TAGS = sorted({ANSWERS_TAG, *(tag for tags in TOOL_DEPENDENCIES.values() for tag in tags)})
+
+ANSWER_TIMEOUT = 60 * 60 * 24
+# Answers with web search results go stale on their own
+SEARCH_ANSWER_TIMEOUT = 60 * 60 * 6
+SEARCH_TOOLS = {'search_veterinary_info'}
+
+INDEX_SIZE = 500
+INFLIGHT_TIMEOUT = 120
+INFLIGHT_POLL_INTERVAL = 0.25
+
+TOKEN_RE = re.compile(r'\w+')
+STEM_LENGTH = 6
+
+
+def normalize_question(question):
+    text = question.lower().replace('ё', 'е')
+    return ' '.join(TOKEN_RE.findall(text))
+
+
+def _answer_key(normalized):
+    return ANSWER_KEY_PREFIX + hashlib.md5(normalized.encode()).hexdigest()
+
+
+def _tags_for_tools(tool_names):
+    tags = {ANSWERS_TAG}
+    for name in tool_names:
+        tags.update(TOOL_DEPENDENCIES.get(name, ()))
+    return sorted(tags)
+
+
+def current_versions():
+    """Tag versions before the agent runs. The answer is stored with them, so a
+    data change during generation does not cache an outdated answer."""
+    return get_tag_versions(ALL_TAGS)
+
+
+# --- Similar questions ---
+
+
+def _terms(normalized):
+    # Crude word form normalization: «прививка», «прививки» -> «привив»
+    return [token[:STEM_LENGTH] for token in normalized.split()]
+
+
+class TfidfIndex:
+    """TF-IDF vectors of questions with nearest-neighbour lookup by cosine."""
+
+    def __init__(self, questions):
+        self.questions = list(questions)
+        documents = [Counter(_terms(question)) for question in self.questions]
+        df = Counter(term for document in documents for term in document)
+        count = len(documents)
+        self.idf = {term: math.log((1 + count) / (1 + freq)) + 1 for term, freq in df.items()}
+        self.vectors = [self._vector(document) for document in documents]
+
+    def _vector(self, counts):
+        vector = {term: freq * self.idf.get(term, 0) for term, freq in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        if not norm:
+            return {}
+        return {term: weight / norm for term, weight in vector.items()}
+
+    def nearest(self, normalized):
+        """Returns ``(question, similarity)`` or ``(None, 0)``."""
+        query = self._vector(Counter(_terms(normalized)))
+        best, best_score = None, 0.0
+        for question, vector in zip(self.questions, self.vectors):
+            score = sum(weight * vector.get(term, 0) for term, weight in query.items())
+            if score > best_score:
+                best, best_score = question, score
+        return best, best_score
+
+
+# The latest index built by this process: (questions, index)
+_local_index = (None, None)
+
+
+def _get_index():
+    global _local_index
+
+    questions = tuple(cache.get(INDEX_KEY) or ())
+    if _local_index[0] != questions:
+        _local_index = (questions, TfidfIndex(questions))
+    return _local_index[1]
+
+
+def _add_to_index(normalized):
+    questions = [question for question in cache.get(INDEX_KEY) or () if question != normalized]
+    questions.append(normalized)
+    cache.set(INDEX_KEY, questions[-INDEX_SIZE:], None)
+
+
+# --- Reading and writing ---
+
+
+def get_cached_answer(question, similar=True):
+    """The cached answer to the question, or None."""
+    normalized = normalize_question(question)
+    if not normalized:
+        return None
+
+    answer = _get_exact(normalized)
+    if answer is not None or not similar:
+        return answer
+
+    threshold = settings.CHATBOT_ANSWER_SIMILARITY
+    if not threshold:
+        return None
+    nearest, score = _get_index().nearest(normalized)
+    if nearest and score >= threshold:
+        return _get_exact(nearest)
+    return None
+
+
+def _get_exact(normalized):
+    entry = cache.get(_answer_key(normalized))
+    if entry is None:
+        return None
+    # The entry tags depend on the tools called and are stored in the entry itself
+    versions, answer = entry
+    if get_tag_versions(versions) != versions:
+        return None
+    return answer
+
+
+def store_answer(question, answer, tool_names, versions):
+    """Store an answer; ``versions`` is ``current_versions()`` from before the agent ran."""
+    normalized = normalize_question(question)
+    if not normalized:
+        return
+    tool_names = set(tool_names)
+    tags = _tags_for_tools(tool_names)
+    timeout = SEARCH_ANSWER_TIMEOUT if tool_names & SEARCH_TOOLS else ANSWER_TIMEOUT
+    set_entry(_answer_key(normalized), {tag: versions[tag] for tag in tags}, answer, timeout)
+    _add_to_index(normalized)
+
+
+# --- One LLM call for identical concurrent questions ---
+
+
+def _inflight_key(question):
+    return INFLIGHT_KEY_PREFIX + _answer_key(normalize_question(question))[len(ANSWER_KEY_PREFIX):]
+
+
+def claim(question):
+    """Mark the question as being answered; False if another request already did."""
+    return cache.add(_inflight_key(question), True, INFLIGHT_TIMEOUT)
+
+
+def release(question):
+    cache.delete(_inflight_key(question))
+
+
+def wait_for_answer(question):
+    """Wait for the request that claimed the question to cache its answer.
+
+    Returns None if that request failed or did not finish in time.
+    """
+    lock = _inflight_key(question)
+    deadline = time.monotonic() + INFLIGHT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(INFLIGHT_POLL_INTERVAL)
+        answer = get_cached_answer(question, similar=False)
+        if answer is not None:
+            return answer
+        if not cache.get(lock):
+            break
+    return None
+
+
+async def aclaim(question):
+    return await cache.aadd(_inflight_key(question), True, INFLIGHT_TIMEOUT)
+
+
+async def arelease(question):
+    await cache.adelete(_inflight_key(question))
+
+
+async def await_answer(question):
+    """Async version of ``wait_for_answer``."""
+    lock = _inflight_key(question)
+    deadline = time.monotonic() + INFLIGHT_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(INFLIGHT_POLL_INTERVAL)
+        answer = await sync_to_async(get_cached_answer)(question, similar=False)
+        if answer is not None:
+            return answer
+        if not await cache.aget(lock):
+            break
+    return None
+
+
+def answer_once(question, compute):
+    """The cached answer, or one from ``compute()``, which returns ``(answer, tools)``.
+
+    If ``compute()`` returns None instead of the tool list (an error, an
+    empty answer), the answer is returned as is and not cached.
+    """
+    answer = get_cached_answer(question)
+    if answer is not None:
+        return answer
+
+    owner = claim(question)
+    if not owner:
+        answer = wait_for_answer(question)
+        if answer is not None:
+            return answer
+        # The first request failed or took too long: compute it here
+    try:
+        versions = current_versions()
+        answer, tool_names = compute()
+        if tool_names is not None:
+            store_answer(question, answer, tool_names, versions)
+        return answer
+    finally:
+        if owner:
+            release(question)
+
+
+async def aanswer_once(question, compute):
+    """Async version of ``answer_once``; ``compute`` is a coroutine function."""
+    answer = await sync_to_async(get_cached_answer)(question)
+    if answer is not None:
+        return answer
+
+    owner = await aclaim(question)
+    if not owner:
+        answer = await await_answer(question)
+        if answer is not None:
+            return answer
+        # The first request failed or took too long: compute it here
+    try:
+        versions = await sync_to_async(current_versions)()
+        answer, tool_names = await compute()
+        if tool_names is not None:
+            await sync_to_async(store_answer)(question, answer, tool_names, versions)
+        return answer
+    finally:
+        if owner:
+            await arelease(question)
@@ -5,3 +5,10 @@ class ChatbotConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'chatbot'
     verbose_name = 'AI Чат-ассистент'
+
+    def ready(self):
+        from .signals import connect_knowledge_index
+        from .tools import register_tool_warmers
+
+        register_tool_warmers()
+        connect_knowledge_index()
@@ -0,0 +1,78 @@
+"""
+Queued chatbot answers (``CHATBOT_QUEUED``).
+
+``chat_view`` does not wait for the agent: it puts the turn on the separate
+``chat`` Celery queue and returns the job id at once. The answer is fetched
+with a long-poll request to ``chatbot:job``. The job state is kept in the
+cache, so both the Celery worker and the web processes see it. A burst of
+chat traffic becomes queue length, drained by the ``chat`` workers (scaled
+separately from the web server).
+"""
+
+import asyncio
+import logging
+import secrets
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+JOB_KEY_PREFIX = 'chatbot:job:'
+POLL_INTERVAL = 0.25
+
+PENDING = 'pending'
+DONE = 'done'
+
+
+def _job_key(job_id):
+    return JOB_KEY_PREFIX + job_id
+
+
+def _set_job(job_id, data):
+    cache.set(_job_key(job_id), data, settings.CHATBOT_JOB_TIMEOUT)
+
+
+def enqueue_turn(session, user_message):
+    """Queue the answer to a message; returns the job id.
+
+    An unavailable broker is raised (``kombu.exceptions.OperationalError``).
+    """
+    from .tasks import answer_chat
+
+    job_id = secrets.token_urlsafe(16)
+    _set_job(job_id, {'status': PENDING, 'session_id': session.id})
+    answer_chat.delay(job_id, session.id, user_message)
+    return job_id
+
+
+def run_turn(job_id, session_id, user_message):
+    """Answer the message in the worker and save the job result"""
+    from .agent import ERROR_MESSAGE, FAILED_ANSWERS, chat
+    from .sessions import load_session, record_turn, schedule_compaction
+
+    session = load_session(session_id)
+    try:
+        response = chat(user_message, session.history())
+        if response not in FAILED_ANSWERS:
+            record_turn(session, user_message, response)
+    except Exception:
+        logger.exception("Queued chat turn failed")
+        response = ERROR_MESSAGE
+    _set_job(job_id, {'status': DONE, 'session_id': session.id, 'response': response})
+    schedule_compaction(session)
+
+
+def get_job(job_id):
+    return cache.get(_job_key(job_id))
+
+
+async def await_job(job_id, wait):
+    """Job state, after waiting up to ``wait`` seconds for it to finish; None if there is no such job"""
+    deadline = time.monotonic() + wait
+    while True:
+        job = await cache.aget(_job_key(job_id))
+        if job is None or job['status'] != PENDING or time.monotonic() >= deadline:
+            return job
+        await asyncio.sleep(POLL_INTERVAL)
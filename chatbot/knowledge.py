@@ -0,0 +1,302 @@
+"""
+Local search index over the site content for the chatbot.
+
+News, service descriptions, vet biographies, the "About us" texts and the
+clinic features are indexed in SQLite FTS5 and ranked by BM25. Words go
+through a Russian stemmer (``chatbot.stemmer``), so «прививки» finds
+«прививку». The index file is opened with ``mmap``; a search touches
+neither the site database nor the network.
+
+The index is updated per document: saving or deleting a model remembers
+its pk, and once the transaction commits and the model tag in
+``core.cache`` is invalidated the document is reindexed (``sync_source``).
+The index keeps the tag version each source was built from; if that
+version is stale (another process changed the data or a signal was
+missed), the source is rebuilt in full on the next search.
+"""
+
+import re
+import sqlite3
+import threading
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from django.apps import apps
+from django.conf import settings
+from django.urls import reverse
+
+from core.cache import get_tag_versions
+
+from .stemmer import stem
+
+TOKEN_RE = re.compile(r'\w+')
+
+STOP_WORDS = {
+    'а', 'в', 'во', 'вы', 'да', 'для', 'до', 'же', 'за', 'и', 'из', 'или', 'к', 'как', 'какие',
+    'какой', 'ли', 'мне', 'мой', 'моя', 'на', 'не', 'но', 'о', 'об', 'от', 'по', 'при', 'с',
+    'со', 'у', 'что', 'это', 'я', 'ваш', 'ваши', 'вас', 'есть', 'можно', 'чем', 'там',
+}
+
+MMAP_SIZE = 64 * 1024 * 1024
+# Weight of a title match relative to the text
+TITLE_WEIGHT = 3.0
+
+
+def analyze(text):
+    """Word stems of a text, for the index and for queries"""
+    return [
+        stem(token)
+        for token in TOKEN_RE.findall(text.lower())
+        if token not in STOP_WORDS and not token.isdigit()
+    ]
+
+
+# --- Document sources ---
+
+
+@dataclass(frozen=True)
+class KnowledgeSource:
+    name: str
+    model: str
+    queryset: Callable
+    # Object -> (title, text, page URL)
+    document: Callable
+    # Other models whose data ends up in the documents
+    related: tuple = ()
+
+    def get_model(self):
+        return apps.get_model(self.model)
+
+    @property
+    def tags(self):
+        return tuple(label.lower() for label in (self.model, *self.related))
+
+    def version(self, versions):
+        # Tag versions are invalidation times, so the maximum changes when any of them is invalidated
+        return max(versions[tag] for tag in self.tags)
+
+
+SOURCES = (
+    KnowledgeSource(
+        'news', 'news.News',
+        lambda model: model.objects.filter(is_published=True),
+        lambda news: (news.title, news.content, reverse('news:news_detail', args=[news.pk])),
+    ),
+    KnowledgeSource(
+        'service', 'services.Service',
+        lambda model: model.objects.filter(is_active=True, category__is_active=True).select_related('category'),
+        lambda service: (
+            f'{service.name} ({service.category.name})',
+            f'{service.description} Цена: {service.price_note} {service.price} руб. {service.duration}',
+            reverse('services:category', args=[service.category.slug]),
+        ),
+        related=('services.ServiceCategory',),
+    ),
+    KnowledgeSource(
+        'vet', 'about.Veterinarian',
+        lambda model: model.objects.filter(is_active=True),
+        lambda vet: (f'{vet.name}, {vet.position}', vet.bio, reverse('about:about')),
+    ),
+    KnowledgeSource(
+        'about', 'about.AboutContent',
+        lambda model: model.objects.filter(is_active=True),
+        lambda content: (content.title, content.description, reverse('about:about')),
+    ),
+    KnowledgeSource(
+        'feature', 'about.FeatureItem',
+        lambda model: model.objects.all(),
+        lambda feature: (feature.title, feature.description, reverse('about:about')),
+    ),
+)
+
+SOURCE_TAGS = tuple(sorted({tag for source in SOURCES for tag in source.tags}))
+
+
+def _document_key(source, pk):
+    return f'{source.name}:{pk}'
+
+
+def _document_row(source, obj):
+    title, text, url = source.document(obj)
+    text = ' '.join(text.split())
+    return (
+        _document_key(source, obj.pk), source.name, title, text, url,
+        ' '.join(analyze(title)), ' '.join(analyze(text)),
+    )
+
+
+# --- Index ---
+
+
+@dataclass(frozen=True)
+class KnowledgeHit:
+    title: str
+    text: str
+    url: str
+    score: float
+
+
+class KnowledgeIndex:
+    def __init__(self, path):
+        self.path = Path(path)
+        self._initialized = False
+
+    def _connect(self):
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=5)
+        connection.execute(f'PRAGMA mmap_size={MMAP_SIZE}')
+        if not self._initialized:
+            connection.execute('PRAGMA journal_mode=WAL')
+            # The original text is stored for the answer, only word stems are indexed
+            connection.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS documents USING fts5('
+                'key UNINDEXED, source UNINDEXED, title UNINDEXED, text UNINDEXED, url UNINDEXED, '
+                'title_terms, text_terms)'
+            )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS sources (name TEXT PRIMARY KEY, version INTEGER NOT NULL)'
+            )
+            self._initialized = True
+        return connection
+
+    def versions(self):
+        """Tag versions the sources were built from: {source: version}"""
+        with closing(self._connect()) as connection:
+            return dict(connection.execute('SELECT name, version FROM sources'))
+
+    def replace_source(self, source, rows, version):
+        with closing(self._connect()) as connection, connection:
+            connection.execute('DELETE FROM documents WHERE source = ?', (source.name,))
+            connection.executemany('INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            self._set_version(connection, source, version)
+        with closing(self._connect()) as connection:
+            # Merges the FTS5 segments into one: a smaller index and faster search
+            connection.execute("INSERT INTO documents(documents) VALUES ('optimize')")
+            connection.commit()
+
+    def update_documents(self, source, rows, deleted_keys, version):
+        with closing(self._connect()) as connection, connection:
+            keys = [row[0] for row in rows] + list(deleted_keys)
+            connection.executemany('DELETE FROM documents WHERE key = ?', [(key,) for key in keys])
+            connection.executemany('INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            self._set_version(connection, source, version)
+
+    def _set_version(self, connection, source, version):
+        connection.execute(
+            'INSERT OR REPLACE INTO sources (name, version) VALUES (?, ?)', (source.name, version)
+        )
+
+    def search(self, query, limit=3):
+        terms = sorted(set(analyze(query)))
+        if not terms:
+            return []
+        match = ' OR '.join(f'"{term}"' for term in terms)
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                'SELECT title, text, url, bm25(documents, 0, 0, 0, 0, 0, ?, 1.0) AS score '
+                'FROM documents WHERE documents MATCH ? ORDER BY score LIMIT ?',
+                (TITLE_WEIGHT, match, limit),
+            ).fetchall()
+        # FTS5 bm25() is negative: lower is better
+        return [KnowledgeHit(title, text, url, -score) for title, text, url, score in rows]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = KnowledgeIndex(settings.CHATBOT_KNOWLEDGE_INDEX_PATH)
+    return _index
+
+
+def reset_index():
+    """Reset the process index (after changing CHATBOT_KNOWLEDGE_INDEX_PATH)"""
+    global _index
+
+    with _index_lock:
+        _index = None
+
+
+# --- Updates ---
+
+
+def rebuild_source(source, version):
+    objects = source.queryset(source.get_model())
+    rows = [_document_row(source, obj) for obj in objects]
+    get_index().replace_source(source, rows, version)
+    return len(rows)
+
+
+def rebuild_index():
+    """Rebuild all sources; returns the number of documents"""
+    versions = get_tag_versions(SOURCE_TAGS)
+    return sum(rebuild_source(source, source.version(versions)) for source in SOURCES)
+
+
+def ensure_fresh():
+    """Rebuild the sources whose version is behind the ``core.cache`` tags"""
+    current = get_tag_versions(SOURCE_TAGS)
+    indexed = get_index().versions()
+    for source in SOURCES:
+        version = source.version(current)
+        if indexed.get(source.name) != version:
+            rebuild_source(source, version)
+
+
+# Documents changed but not reindexed yet:
+# {source: {pk: tag version before the change}}
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def mark_changed(source, pk):
+    """Remember a changed document until its model tag is invalidated"""
+    version = source.version(get_tag_versions(source.tags))
+    with _pending_lock:
+        _pending.setdefault(source.name, {}).setdefault(pk, version)
+
+
+def refresh_source(source):
+    """Rebuild a source in full (its related models changed)"""
+    with _pending_lock:
+        _pending.pop(source.name, None)
+    rebuild_source(source, source.version(get_tag_versions(source.tags)))
+
+
+def sync_source(source):
+    """Reindex the changed documents of a source (after its tag is invalidated).
+
+    If the index was not built from the version the changes started from,
+    the source is rebuilt in full.
+    """
+    with _pending_lock:
+        changed = _pending.pop(source.name, {})
+    version = source.version(get_tag_versions(source.tags))
+    index = get_index()
+    indexed_version = index.versions().get(source.name)
+
+    if not changed or any(before != indexed_version for before in changed.values()):
+        rebuild_source(source, version)
+        return
+
+    objects = {obj.pk: obj for obj in source.queryset(source.get_model()).filter(pk__in=list(changed))}
+    rows = [_document_row(source, obj) for obj in objects.values()]
+    deleted = [_document_key(source, pk) for pk in changed if pk not in objects]
+    index.update_documents(source, rows, deleted, version)
+
+
+# --- Search ---
+
+
+def search_knowledge(query, limit=3):
+    ensure_fresh()
+    return get_index().search(query, limit)
@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from chatbot import replay
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay recorded conversations through agent.chat and chat_view with a fake "
+        "LLM and web search (no network) and show the per-turn overhead: p50/p99 and memory"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help="Number of corpus runs (default 20)")
+        parser.add_argument('--corpus', help="JSON file with conversations (default chatbot/replay_corpus.json)")
+        parser.add_argument('--no-alloc', action='store_true', help="Do not measure memory (tracemalloc)")
+        parser.add_argument('--json', dest='output', help="Save the report to a JSON file")
+        parser.add_argument('--baseline', help="Compare with a saved report and fail on a regression")
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help="Allowed p50 growth over --baseline (default 0.25, i.e. 25%%)",
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        if iterations < 1:
+            raise CommandError("--iterations must be positive")
+        try:
+            corpus = replay.load_corpus(options['corpus'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read corpus: {e}")
+
+        turns = sum(len(conversation['turns']) for conversation in corpus)
+        self.stdout.write(f"Replaying {len(corpus)} conversations ({turns} turns) x {iterations}...")
+        samples = replay.run_benchmark(corpus, iterations, allocations=not options['no_alloc'])
+        summary = replay.summarize(samples)
+
+        descriptions = {name: description for name, unit, description in replay.COMPONENTS}
+        for name, stats in summary.items():
+            self.stdout.write(
+                f"{name:<14} p50 {stats['p50']:>9.3f} {stats['unit']:<3}  "
+                f"p99 {stats['p99']:>9.3f} {stats['unit']:<3}  n={stats['n']:<5} {descriptions[name]}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2)
+            self.stdout.write(f"Report saved to {options['output']}")
+
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read baseline: {e}")
+            regressions = replay.compare(summary, baseline, options['tolerance'])
+            for name, before, after in regressions:
+                self.stderr.write(f"Regression in {name}: p50 {before} -> {after} {summary[name]['unit']}")
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
+            self.stdout.write(self.style.SUCCESS("No regressions against baseline"))
@@ -0,0 +1,71 @@
+import os
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from langchain_core.messages import HumanMessage
+
+from chatbot import agent as chat_agent
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the chatbot agent setup cost: building it for every message "
+        "(as before) against the shared agent of the process"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help="Number of measurements (default 20)")
+        parser.add_argument(
+            '--live', action='store_true',
+            help="Also send real messages to OpenRouter (needs OPENROUTER_API_KEY)",
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        if iterations < 1:
+            raise CommandError("--iterations must be positive")
+
+        if not os.getenv('OPENROUTER_API_KEY'):
+            if options['live']:
+                raise CommandError("OPENROUTER_API_KEY is required for --live")
+            # Measuring the setup needs no network, any key will do
+            os.environ['OPENROUTER_API_KEY'] = 'benchmark'
+
+        chat_agent.reset_agent()
+        cold = self._measure(chat_agent.get_agent, 1)[0]
+        per_message = self._measure(chat_agent.create_agent, iterations)
+        shared = self._measure(chat_agent.get_agent, iterations)
+
+        self._report("Build agent per message", per_message)
+        self._report("Shared agent (warm)", shared)
+        self.stdout.write(f"Shared agent first build: {cold:.2f} ms")
+        saved = statistics.median(per_message) - statistics.median(shared)
+        self.stdout.write(self.style.SUCCESS(f"Setup time saved per message: {saved:.2f} ms (median)"))
+
+        if options['live']:
+            self._live(iterations)
+
+    def _measure(self, func, iterations):
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def _report(self, label, timings):
+        self.stdout.write(
+            f"{label}: median {statistics.median(timings):.2f} ms, "
+            f"mean {statistics.mean(timings):.2f} ms, max {max(timings):.2f} ms"
+        )
+
+    def _live(self, iterations):
+        """Full answer time, including the OpenRouter connection"""
+        messages = {"messages": [HumanMessage(content="Ответь одним словом: привет")]}
+        fresh = self._measure(lambda: chat_agent.create_agent().invoke(messages), iterations)
+        pooled = self._measure(lambda: chat_agent.get_agent().invoke(messages), iterations)
+        self._report("Live, new agent and connection", fresh)
+        self._report("Live, shared agent and pool", pooled)
+        saved = statistics.median(fresh) - statistics.median(pooled)
+        self.stdout.write(self.style.SUCCESS(f"End-to-end time saved per message: {saved:.2f} ms (median)"))
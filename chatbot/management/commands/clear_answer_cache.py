@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from chatbot.answer_cache import ANSWERS_TAG
+from core.cache import invalidate_tags
+
+
+class Command(BaseCommand):
+    help = "Invalidate cached chatbot answers (e.g. after the prompts or the model change)"
+
+    def handle(self, *args, **options):
+        invalidate_tags(ANSWERS_TAG)
+        self.stdout.write(self.style.SUCCESS("Chatbot answer cache invalidated"))
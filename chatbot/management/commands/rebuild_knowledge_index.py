@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from chatbot.knowledge import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the local chatbot search index over the site content"
+
+    def handle(self, *args, **options):
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Knowledge index rebuilt: {count} documents"))
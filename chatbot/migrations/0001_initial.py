@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatTurnMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_index=True, verbose_name='Время')),
+                ('route', models.CharField(choices=[('agent', 'Агент'), ('router', 'Без LLM (роутер)'), ('cache', 'Кэш ответов'), ('error', 'Ошибка')], max_length=10, verbose_name='Кто ответил')),
+                ('streamed', models.BooleanField(default=False, verbose_name='Потоковый ответ')),
+                ('wall_ms', models.PositiveIntegerField(verbose_name='Общее время, мс')),
+                ('llm_calls', models.PositiveSmallIntegerField(default=0, verbose_name='Вызовов LLM')),
+                ('llm_ms', models.PositiveIntegerField(default=0, verbose_name='Время LLM, мс')),
+                ('prompt_tokens', models.PositiveIntegerField(default=0, verbose_name='Токенов запроса')),
+                ('completion_tokens', models.PositiveIntegerField(default=0, verbose_name='Токенов ответа')),
+                ('tool_calls', models.PositiveSmallIntegerField(default=0, verbose_name='Вызовов инструментов')),
+                ('tool_ms', models.PositiveIntegerField(default=0, verbose_name='Время инструментов, мс')),
+                ('calls', models.JSONField(blank=True, default=list, verbose_name='Вызовы LLM')),
+                ('tools', models.JSONField(blank=True, default=list, verbose_name='Вызовы инструментов')),
+            ],
+            options={
+                'verbose_name': 'Метрика ответа чат-бота',
+                'verbose_name_plural': 'Метрики ответов чат-бота',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -1,3 +1,33 @@
 from django.db import models
 
-# Create your models here.
+
+class ChatTurnMetric(models.Model):
+    """Telemetry of one chatbot answer (see chatbot.telemetry)"""
+    ROUTE_CHOICES = [
+        ('agent', 'Агент'),
+        ('router', 'Без LLM (роутер)'),
+        ('cache', 'Кэш ответов'),
+        ('error', 'Ошибка'),
+    ]
+
+    created_at = models.DateTimeField(db_index=True, verbose_name="Время")
+    route = models.CharField(max_length=10, choices=ROUTE_CHOICES, verbose_name="Кто ответил")
+    streamed = models.BooleanField(default=False, verbose_name="Потоковый ответ")
+    wall_ms = models.PositiveIntegerField(verbose_name="Общее время, мс")
+    llm_calls = models.PositiveSmallIntegerField(default=0, verbose_name="Вызовов LLM")
+    llm_ms = models.PositiveIntegerField(default=0, verbose_name="Время LLM, мс")
+    prompt_tokens = models.PositiveIntegerField(default=0, verbose_name="Токенов запроса")
+    completion_tokens = models.PositiveIntegerField(default=0, verbose_name="Токенов ответа")
+    tool_calls = models.PositiveSmallIntegerField(default=0, verbose_name="Вызовов инструментов")
+    tool_ms = models.PositiveIntegerField(default=0, verbose_name="Время инструментов, мс")
+    # [{"model", "ms", "in", "out"}] and [{"name", "ms"}, ...] in call order
+    calls = models.JSONField(default=list, blank=True, verbose_name="Вызовы LLM")
+    tools = models.JSONField(default=list, blank=True, verbose_name="Вызовы инструментов")
+
+    class Meta:
+        verbose_name = "Метрика ответа чат-бота"
+        verbose_name_plural = "Метрики ответов чат-бота"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.created_at:%d.%m.%Y %H:%M:%S} {self.route} {self.wall_ms} мс"
@@ -0,0 +1,345 @@
+"""
+Offline replay of recorded conversations through the chatbot, to measure
+its own overhead (``manage.py benchmark_chat_replay``).
+
+Conversations from ``replay_corpus.json`` go through ``chatbot.agent.chat``
+and ``chatbot.views.chat_view``. ``ReplayChatModel`` answers instead of
+OpenRouter: it deterministically replays the recorded steps (tool calls,
+then the answer) keyed by the visitor message. Web search goes to
+``FakeSearchBackend``, and the search cache and knowledge index live in a
+temporary directory, so no network is needed. The tools run for real,
+against the database and the cache.
+
+The model time (measured by ``StepTimer``) is subtracted from the turn
+time, which leaves what depends on our code: building the agent,
+converting the history, the tools, serializing the answer, and the
+sessions and admission in the view.
+"""
+
+import asyncio
+import json
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.http import JsonResponse
+from django.test import AsyncRequestFactory, override_settings
+from django.urls import reverse
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tracers.context import register_configure_hook
+from pydantic import Field
+
+from . import agent as chat_agent
+from . import knowledge, search
+from .sessions import estimate_tokens
+from .telemetry import percentile
+
+CORPUS_PATH = Path(__file__).resolve().parent / 'replay_corpus.json'
+
+# Measurements: (name, unit, description)
+COMPONENTS = (
+    ('agent.build', 'ms', "agent build (create_agent)"),
+    ('history', 'ms', "history -> LangChain messages"),
+    ('tools', 'ms', "tools, including database queries"),
+    ('json', 'ms', "view JSON response"),
+    ('llm', 'ms', "model (fake, for reference)"),
+    ('turn', 'ms', "whole agent.chat"),
+    ('turn.overhead', 'ms', "agent.chat without the model"),
+    ('view', 'ms', "whole chat_view"),
+    ('view.overhead', 'ms', "chat_view without the model"),
+    ('turn.alloc', 'KiB', "peak allocated memory in agent.chat"),
+    ('view.alloc', 'KiB', "peak allocated memory in chat_view"),
+)
+
+DEFAULT_ANSWER = "Извините, по этому вопросу лучше проконсультироваться с врачом клиники."
+
+
+def load_corpus(path=None):
+    with open(path or CORPUS_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+# --- Fake model ---
+
+
+class ReplayChatModel(BaseChatModel):
+    """Replays the recorded answer steps for the last visitor message.
+
+    The step number is the count of model replies after that message, so
+    the model keeps no state and can serve concurrent calls.
+    """
+
+    # Visitor message -> [{"tool_calls": [...]} | {"content": "..."}, ...]
+    script: dict = Field(default_factory=dict)
+
+    @property
+    def _llm_type(self):
+        return 'replay'
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self.reply(messages))])
+
+    def reply(self, messages):
+        last = max((i for i, msg in enumerate(messages) if isinstance(msg, HumanMessage)), default=None)
+        steps = self.script.get(messages[last].content) if last is not None else None
+        if not steps:
+            # History summaries and questions that were not recorded
+            step, number = {'content': DEFAULT_ANSWER}, 0
+        else:
+            number = sum(isinstance(msg, AIMessage) for msg in messages[last + 1:])
+            step = steps[min(number, len(steps) - 1)]
+
+        content = step.get('content', '')
+        prompt_tokens = sum(estimate_tokens(str(msg.content)) for msg in messages)
+        completion_tokens = estimate_tokens(content)
+        return AIMessage(
+            content=content,
+            tool_calls=[
+                {'name': call['name'], 'args': call.get('args', {}), 'id': f'call_{number}_{i}', 'type': 'tool_call'}
+                for i, call in enumerate(step.get('tool_calls', []))
+            ],
+            usage_metadata={
+                'input_tokens': prompt_tokens,
+                'output_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+            },
+        )
+
+
+def replay_script(corpus):
+    return {turn['user']: turn['steps'] for conversation in corpus for turn in conversation['turns']}
+
+
+# --- Timing the model and the tools ---
+
+
+# The handler is attached to every LangChain run in the context, including
+# tools in langgraph and sync_to_async threads, since the context is copied
+_step_timer = ContextVar('chatbot_replay_step_timer', default=None)
+register_configure_hook(_step_timer, inheritable=True)
+
+
+class StepTimer(BaseCallbackHandler):
+    """Total time of the model and tool calls, ms"""
+
+    run_inline = True
+
+    def __init__(self):
+        self.llm_ms = 0.0
+        self.tool_ms = 0.0
+        self._starts = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id):
+        self._starts[run_id] = time.perf_counter()
+
+    def _stop(self, run_id, attr):
+        started = self._starts.pop(run_id, None)
+        if started is not None:
+            with self._lock:
+                setattr(self, attr, getattr(self, attr) + (time.perf_counter() - started) * 1000)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._stop(run_id, 'llm_ms')
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._stop(run_id, 'llm_ms')
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._stop(run_id, 'tool_ms')
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._stop(run_id, 'tool_ms')
+
+
+class Probe:
+    """Time, or peak memory with ``memory``, of one measurement"""
+
+    def __init__(self, memory=False):
+        self.memory = memory
+
+    def __enter__(self):
+        if self.memory:
+            tracemalloc.reset_peak()
+            self.base = tracemalloc.get_traced_memory()[0]
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.ms = (time.perf_counter() - self.started) * 1000
+        if self.memory:
+            self.kib = (tracemalloc.get_traced_memory()[1] - self.base) / 1024
+
+
+# --- Replay ---
+
+
+@contextmanager
+def offline_chatbot(corpus):
+    """Chatbot without network: fake model and search, temporary search and index files"""
+    model = ReplayChatModel(script=replay_script(corpus))
+    with tempfile.TemporaryDirectory() as tmp, override_settings(
+        CHATBOT_SEARCH_BACKEND='chatbot.search.FakeSearchBackend',
+        CHATBOT_SEARCH_CACHE_PATH=str(Path(tmp) / 'search_cache.sqlite3'),
+        CHATBOT_SEARCH_RATE=1e6,
+        CHATBOT_SEARCH_BURST=10 ** 6,
+        CHATBOT_KNOWLEDGE_INDEX_PATH=str(Path(tmp) / 'knowledge.sqlite3'),
+        # Every turn must reach the agent, and metrics must not be written to the database
+        CHATBOT_ANSWER_CACHE=False,
+        CHATBOT_METRICS=False,
+        CHATBOT_QUEUED=False,
+        CHATBOT_COMPACT_ASYNC=False,
+        CHATBOT_RATE_PER_MINUTE=1e9,
+        CHATBOT_IP_RATE_PER_MINUTE=1e9,
+        CHATBOT_RATE_BURST=10 ** 9,
+    ):
+        search.reset_web_search()
+        knowledge.reset_index()
+        chat_agent.use_llm(model)
+        try:
+            yield model
+        finally:
+            chat_agent.reset_agent()
+            search.reset_web_search()
+            knowledge.reset_index()
+
+
+def replay_agent(corpus, model, samples, memory=False):
+    """Replay the corpus through agent.chat, as the chat queue worker does"""
+    for conversation in corpus:
+        history = []
+        for turn in conversation['turns']:
+            user_message = turn['user']
+            if not memory:
+                with Probe() as probe:
+                    chat_agent.create_agent(model)
+                samples['agent.build'].append(probe.ms)
+                with Probe() as probe:
+                    chat_agent.build_messages(user_message, history)
+                samples['history'].append(probe.ms)
+
+            timer = StepTimer()
+            token = _step_timer.set(timer)
+            try:
+                with Probe(memory) as probe:
+                    answer = chat_agent.chat(user_message, history)
+            finally:
+                _step_timer.reset(token)
+
+            if memory:
+                samples['turn.alloc'].append(probe.kib)
+            else:
+                samples['turn'].append(probe.ms)
+                samples['llm'].append(timer.llm_ms)
+                samples['tools'].append(timer.tool_ms)
+                samples['turn.overhead'].append(probe.ms - timer.llm_ms)
+                with Probe() as probe:
+                    JsonResponse({"success": True, "response": answer, "session_id": "x" * 22})
+                samples['json'].append(probe.ms)
+            history += [{'role': 'user', 'content': user_message}, {'role': 'assistant', 'content': answer}]
+
+
+async def replay_view(corpus, samples, memory=False):
+    """Replay the corpus through chat_view with a server-side session"""
+    from .views import chat_view
+
+    factory = AsyncRequestFactory()
+    url = reverse('chatbot:chat')
+    for conversation in corpus:
+        session_id = None
+        for turn in conversation['turns']:
+            body = {'message': turn['user']}
+            if session_id:
+                body['session_id'] = session_id
+            request = factory.post(url, data=json.dumps(body), content_type='application/json')
+
+            timer = StepTimer()
+            token = _step_timer.set(timer)
+            try:
+                with Probe(memory) as probe:
+                    response = await chat_view(request)
+            finally:
+                _step_timer.reset(token)
+            if response.status_code != 200:
+                raise RuntimeError(f"chat_view returned {response.status_code}: {response.content[:200]!r}")
+            session_id = json.loads(response.content)['session_id']
+
+            if memory:
+                samples['view.alloc'].append(probe.kib)
+            else:
+                samples['view'].append(probe.ms)
+                samples['view.overhead'].append(probe.ms - timer.llm_ms)
+
+
+def run_benchmark(corpus=None, iterations=20, warmup=1, allocations=True):
+    """Measurements of all components: {name: [values]}"""
+    corpus = corpus if corpus is not None else load_corpus()
+    samples = defaultdict(list)
+    with offline_chatbot(corpus) as model:
+        # The first pass builds the knowledge index and warms up caches and imports
+        for _ in range(warmup):
+            replay_agent(corpus, model, defaultdict(list))
+            asyncio.run(replay_view(corpus, defaultdict(list)))
+
+        for _ in range(iterations):
+            replay_agent(corpus, model, samples)
+            asyncio.run(replay_view(corpus, samples))
+
+        if allocations:
+            tracemalloc.start()
+            try:
+                replay_agent(corpus, model, samples, memory=True)
+                asyncio.run(replay_view(corpus, samples, memory=True))
+            finally:
+                tracemalloc.stop()
+    return dict(samples)
+
+
+# --- Report ---
+
+
+def summarize(samples):
+    """{name: {"unit", "n", "p50", "p99"}} in COMPONENTS order"""
+    summary = {}
+    for name, unit, description in COMPONENTS:
+        values = sorted(samples.get(name, ()))
+        if values:
+            summary[name] = {
+                'unit': unit,
+                'n': len(values),
+                'p50': round(percentile(values, 0.5), 3),
+                'p99': round(percentile(values, 0.99), 3),
+            }
+    return summary
+
+
+def compare(summary, baseline, tolerance=0.25, min_delta=0.05):
+    """p50 regressions against a saved report: [(name, before, after)].
+
+    A difference below ``min_delta`` (ms or KiB) is noise.
+    """
+    regressions = []
+    for name, current in summary.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if current['p50'] > before['p50'] * (1 + tolerance) and current['p50'] - before['p50'] >= min_delta:
+            regressions.append((name, before['p50'], current['p50']))
+    return regressions
@@ -0,0 +1,197 @@
+"""
+Routing of chatbot messages without the LLM.
+
+Short unambiguous messages (greetings, questions about the opening hours,
+address, phone or the price of a particular service, clearly off-topic
+requests) are answered at once from the cached contacts
+(``ContactInfo.load``) and the service catalog (``services.catalog``).
+``route_message`` returns None for everything else, and the message goes
+to the agent.
+
+Topic keywords are joined into regular expressions compiled once, so a
+message is scanned in one pass instead of checking every word. Messages
+are normalized with ё replaced by е, so the keywords are written with е.
+"""
+
+import re
+from dataclasses import dataclass
+
+from .stemmer import stem
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Longer messages almost always hold more than a simple question
+MAX_ROUTED_WORDS = 12
+MAX_PRICE_SERVICES = 5
+
+VET_KEYWORDS = [
+    'собака', 'кошка', 'питомец', 'животн', 'ветеринар', 'лечен', 'болезн',
+    'симптом', 'вакцин', 'прививк', 'корм', 'уход', 'порода', 'щенок', 'котенок',
+    'хомяк', 'попугай', 'кролик', 'грызун', 'рептили', 'рыбк',
+    'аквариум', 'птиц', 'лошад', 'здоровь', 'dog', 'cat', 'pet', 'vet',
+    'хвост', 'лап', 'шерст', 'клещ', 'блох', 'глист', 'паразит', 'стерилиз',
+    'кастрац', 'операц', 'травм', 'перелом', 'рана', 'инфекц', 'вирус',
+    'понос', 'рвот', 'аппетит', 'температур', 'кашел', 'чихан',
+]
+
+# Topic detection, on top of VET_KEYWORDS
+TOPIC_KEYWORDS = [
+    'собак', 'кош', 'кот', 'пес', 'щен', 'кис', 'мурк', 'бобик',
+    'клиник', 'врач', 'доктор', 'прием', 'запис', 'услуг', 'анализ',
+    'узи', 'рентген', 'чип', 'стрижк', 'груминг', 'зуб', 'глаз', 'уш', 'кож',
+]
+
+VET_RE = re.compile('|'.join(re.escape(keyword) for keyword in VET_KEYWORDS))
+TOPIC_RE = re.compile('|'.join(re.escape(keyword) for keyword in VET_KEYWORDS + TOPIC_KEYWORDS))
+
+GREETING_RE = re.compile(
+    r'(привет\w*|здравствуй\w*|добр\w+ (день|утро|вечер|ночи)|доброго времени суток|'
+    r'hello|hi|хай|салют)( (всем|ассистент|бот))?'
+)
+THANKS_RE = re.compile(r'(спасибо|благодарю|спс)( \w+){0,3}')
+
+# Only phrasings that ask about the clinic itself: «номер», «работаете» or
+# «где находится» alone may be about a licence, a card or a pharmacy
+HOURS_RE = re.compile(
+    r'(часы|режим|график|время) работы|до скольки (вы )?работаете|во сколько (вы )?(открываетесь|закрываетесь)|'
+    r'когда (вы )?(открыты|работаете)|(вы )?работаете (круглосуточно|в выходн\w*|по (субботам|воскресеньям))|'
+    r'у вас выходн\w*'
+)
+ADDRESS_RE = re.compile(
+    r'^адрес$|(ваш|какой у вас|какой) адрес|адрес клиники|где (вы )?(находитесь|расположены)|'
+    r'как (к вам|до вас) (добраться|проехать|пройти)'
+)
+PHONE_RE = re.compile(
+    r'^телефон$|(ваш|какой у вас) телефон|номер (вашего )?телефона|телефон (клиники|для связи|регистратуры)|'
+    r'как (вам )?позвонить|как с вами связаться'
+)
+PRICE_RE = re.compile(r'сколько сто\w*|цен\w*|стоимост\w*|почем|прайс\w*')
+
+OFF_TOPIC_RE = re.compile(
+    r'погод|политик|выбор|анекдот|шутк|стих|программир|python|javascript|'
+    r'рецепт\w* (блюд|салат|суп|борщ|пирог|торт|выпечк|приготовлен)|как (приготовить|испечь)|'
+    r'футбол|хоккей|курс (валют|доллар|евро)|биткоин|криптовалют|фильм|сериал|'
+    r'домашн\w* задани|реши задач|математик|(взять|оформить|получить|одобр\w*) (\w+ )?кредит|ипотек|гороскоп'
+)
+
+# Words of a price question that are not part of the service name
+PRICE_STOP_WORDS = {
+    'а', 'в', 'во', 'у', 'и', 'для', 'на', 'по', 'за', 'с', 'сколько', 'стоит', 'стоят', 'стоимость',
+    'цена', 'цены', 'почем', 'какая', 'какие', 'какова', 'вас', 'ваша', 'ваши', 'подскажите',
+    'скажите', 'узнать', 'хочу', 'прайс', 'услуга', 'услуги', 'процедура', 'клинике', 'это',
+}
+
+GREETING_ANSWER = (
+    "Здравствуйте! Я виртуальный ассистент клиники «{clinic_name}». "
+    "Могу рассказать об услугах и ценах, врачах, адресе и часах работы, "
+    "а также ответить на вопросы о здоровье и уходе за питомцами. Чем могу помочь?"
+)
+THANKS_ANSWER = "Пожалуйста! Если появятся ещё вопросы о питомце или клинике — пишите."
+OFF_TOPIC_ANSWER = (
+    "Извините, я могу помочь только с вопросами о здоровье животных, уходе за "
+    "питомцами и работе нашей клиники. Спросите, например, об услугах, ценах или "
+    "о том, когда стоит показать питомца ветеринару."
+)
+
+
+@dataclass(frozen=True)
+class Route:
+    intent: str
+    answer: str
+
+
+def normalize(message):
+    return ' '.join(TOKEN_RE.findall(message.lower().replace('ё', 'е')))
+
+
+def is_vet_related(text):
+    return VET_RE.search(text.lower().replace('ё', 'е')) is not None
+
+
+def route_message(message):
+    """Answer without the LLM, or None if the agent has to handle the message"""
+    text = normalize(message)
+    if not text or len(text.split()) > MAX_ROUTED_WORDS:
+        return None
+
+    if GREETING_RE.fullmatch(text):
+        return Route('greeting', _greeting())
+    if THANKS_RE.fullmatch(text):
+        return Route('thanks', THANKS_ANSWER)
+
+    if OFF_TOPIC_RE.search(text) and not TOPIC_RE.search(text):
+        return Route('off_topic', OFF_TOPIC_ANSWER)
+
+    # A contacts question must say nothing about the pet, otherwise it is more than a lookup
+    if TOPIC_RE.search(text) is None:
+        contact = _contact_answer(text)
+        if contact is not None:
+            return contact
+
+    if PRICE_RE.search(text):
+        return _price_answer(text)
+    return None
+
+
+def _greeting():
+    from contacts.models import ContactInfo
+
+    contact = ContactInfo.load()
+    return GREETING_ANSWER.format(clinic_name=contact.clinic_name if contact else "ВетКлиника")
+
+
+def _contact_answer(text):
+    from contacts.models import ContactInfo
+
+    intents = []
+    if HOURS_RE.search(text):
+        intents.append('hours')
+    if ADDRESS_RE.search(text):
+        intents.append('address')
+    if PHONE_RE.search(text):
+        intents.append('phone')
+    if not intents:
+        return None
+
+    contact = ContactInfo.load()
+    if contact is None:
+        return None
+    parts = []
+    if 'hours' in intents:
+        parts.append(f"🕒 Часы работы: {contact.working_hours}")
+    if 'address' in intents:
+        parts.append(f"📍 Адрес: {contact.address}")
+    if 'phone' in intents:
+        parts.append(f"📞 Телефон: {contact.phone}")
+    parts.append("Будем рады видеть вас и вашего питомца!")
+    return Route('+'.join(intents), "\n".join(parts))
+
+
+def _stems(text):
+    return {stem(word) for word in TOKEN_RE.findall(text.lower().replace('ё', 'е'))}
+
+
+def _price_answer(text):
+    from services.catalog import get_catalog
+
+    query = {stem(word) for word in text.split() if word not in PRICE_STOP_WORDS}
+    if not query:
+        # «Сколько стоит?» without a service name depends on the conversation
+        return None
+
+    matches = []
+    for category in get_catalog():
+        for service in category.services:
+            if query <= _stems(f'{service.name} {category.name}'):
+                matches.append(service)
+    if not matches or len(matches) > MAX_PRICE_SERVICES:
+        return None
+
+    lines = ["Стоимость в нашей клинике:"]
+    for service in matches:
+        price = f"{service.price} руб."
+        if service.price_note:
+            price = f"{service.price_note} {price}"
+        lines.append(f"• {service.name} — {price}")
+    lines.append("Точную стоимость уточнит врач на приёме: она зависит от веса и состояния питомца.")
+    return Route('price', "\n".join(lines))
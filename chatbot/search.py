@@ -0,0 +1,297 @@
+"""
+Web search for the chatbot: caching, rate limiting and failure protection.
+
+``web_search(query)`` goes through:
+
+1. a SQLite cache of results by normalized query (with a TTL);
+2. a circuit breaker: while the search engine is failing, requests end
+   with ``SearchUnavailable`` at once instead of waiting;
+3. a token bucket for outgoing requests;
+4. the backend call with a hard timeout.
+
+The backend is set by ``CHATBOT_SEARCH_BACKEND``; ``FakeSearchBackend``
+works without network, for tests.
+"""
+
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import closing
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+class SearchUnavailable(Exception):
+    """Search failed; ``reason`` is 'ratelimit', 'circuit_open', 'timeout' or 'error'"""
+
+    def __init__(self, reason, message=''):
+        super().__init__(message or reason)
+        self.reason = reason
+
+
+def normalize_query(query):
+    return ' '.join(TOKEN_RE.findall(query.lower().replace('ё', 'е')))
+
+
+def is_rate_limit_error(error):
+    message = str(error).lower()
+    return any(marker in message for marker in ('captcha', 'ratelimit', '202', '403'))
+
+
+# --- Backends ---
+
+
+class DDGSBackend:
+    """DuckDuckGo search with the ``ddgs`` package"""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+
+    def text(self, query, max_results):
+        from ddgs import DDGS
+
+        with DDGS(timeout=self.timeout) as ddgs:
+            return list(ddgs.text(query, max_results=max_results))
+
+
+class FakeSearchBackend:
+    """Backend without network: returns the given results or raises the given error"""
+
+    def __init__(self, timeout=None, results=None, error=None, delay=0):
+        self.results = results if results is not None else [{
+            'title': 'Тестовый результат',
+            'body': 'Результат поиска из FakeSearchBackend.',
+            'href': 'https://example.com/',
+        }]
+        self.error = error
+        self.delay = delay
+        self.calls = []
+
+    def text(self, query, max_results):
+        self.calls.append(query)
+        if self.delay:
+            time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.results[:max_results]
+
+
+# --- Result cache ---
+
+
+class SearchCache:
+    """Search results in a SQLite file shared by the processes of one host"""
+
+    def __init__(self, path, ttl):
+        self.path = Path(path)
+        self.ttl = ttl
+        self._initialized = False
+
+    def _connect(self):
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=5)
+        if not self._initialized:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS search_cache ('
+                'query TEXT PRIMARY KEY, results TEXT NOT NULL, created_at REAL NOT NULL)'
+            )
+            self._initialized = True
+        return connection
+
+    def get(self, query):
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                'SELECT results FROM search_cache WHERE query = ? AND created_at > ?',
+                (query, time.time() - self.ttl),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, query, results):
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO search_cache (query, results, created_at) VALUES (?, ?, ?)',
+                (query, json.dumps(results, ensure_ascii=False), time.time()),
+            )
+
+    def prune(self):
+        """Delete expired entries; returns their number"""
+        with closing(self._connect()) as connection, connection:
+            return connection.execute(
+                'DELETE FROM search_cache WHERE created_at <= ?', (time.time() - self.ttl,)
+            ).rowcount
+
+
+# --- Rate limiting and circuit breaker ---
+
+
+class TokenBucket:
+    """At most ``capacity`` requests in a row and ``rate`` requests per second on average"""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated_at = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token; False if there are none left"""
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class CircuitBreaker:
+    """Opens for ``reset_timeout`` seconds after ``failure_threshold`` failures
+    in a row (or at once when the search engine rate limits us); then lets
+    one trial request through"""
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return self.state == self.CLOSED
+
+    def cancel(self):
+        """Give back a trial request that was allowed but not made"""
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                # opened_at is kept, so the next request is the trial
+                self.state = self.OPEN
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self, trip=False):
+        with self.lock:
+            self.failures += 1
+            if trip or self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+
+# --- Search ---
+
+
+class WebSearch:
+    def __init__(self, backend, cache, bucket, breaker, timeout, max_workers=4):
+        self.backend = backend
+        self.cache = cache
+        self.bucket = bucket
+        self.breaker = breaker
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='web-search')
+
+    def search(self, query, max_results=3):
+        """Search results (a list of title/body/href dicts) or ``SearchUnavailable``"""
+        key = f'{normalize_query(query)}|{max_results}'
+        results = self._cache_get(key)
+        if results is not None:
+            return results
+
+        if not self.breaker.allow():
+            raise SearchUnavailable('circuit_open')
+        if not self.bucket.acquire():
+            self.breaker.cancel()
+            raise SearchUnavailable('ratelimit', 'Local search rate limit reached')
+
+        # The backend runs in a thread pool so that a hung request does not hold the chat past the timeout
+        future = self.executor.submit(self.backend.text, query, max_results)
+        try:
+            results = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self.breaker.record_failure()
+            raise SearchUnavailable('timeout')
+        except Exception as e:
+            rate_limited = is_rate_limit_error(e)
+            self.breaker.record_failure(trip=rate_limited)
+            logger.warning(f"Web search failed: {e}")
+            raise SearchUnavailable('ratelimit' if rate_limited else 'error', str(e))
+
+        self.breaker.record_success()
+        if results:
+            self._cache_set(key, results)
+        return results
+
+    # An unavailable cache file must not break the search itself
+
+    def _cache_get(self, key):
+        try:
+            return self.cache.get(key)
+        except sqlite3.Error as e:
+            logger.warning(f"Search cache read failed: {e}")
+            return None
+
+    def _cache_set(self, key, results):
+        try:
+            self.cache.set(key, results)
+        except sqlite3.Error as e:
+            logger.warning(f"Search cache write failed: {e}")
+
+
+_web_search = None
+_web_search_lock = threading.Lock()
+
+
+def get_web_search():
+    """The search shared by the process (rate limiter and breaker state)"""
+    global _web_search
+
+    if _web_search is None:
+        with _web_search_lock:
+            if _web_search is None:
+                backend_class = import_string(settings.CHATBOT_SEARCH_BACKEND)
+                _web_search = WebSearch(
+                    backend=backend_class(timeout=settings.CHATBOT_SEARCH_TIMEOUT),
+                    cache=SearchCache(settings.CHATBOT_SEARCH_CACHE_PATH, settings.CHATBOT_SEARCH_CACHE_TTL),
+                    bucket=TokenBucket(settings.CHATBOT_SEARCH_RATE, settings.CHATBOT_SEARCH_BURST),
+                    breaker=CircuitBreaker(
+                        settings.CHATBOT_SEARCH_FAILURE_THRESHOLD, settings.CHATBOT_SEARCH_RESET_TIMEOUT,
+                    ),
+                    timeout=settings.CHATBOT_SEARCH_TIMEOUT,
+                )
+    return _web_search
+
+
+def reset_web_search():
+    """Reset the shared search (after changing settings, in tests)"""
+    global _web_search
+
+    with _web_search_lock:
+        _web_search = None
+
+
+def web_search(query, max_results=3):
+    return get_web_search().search(query, max_results)
@@ -0,0 +1,148 @@
+"""
+Server-side chatbot sessions.
+
+The conversation history is kept in the cache under the session id, so the
+client only sends the new message. When the history goes over the token
+budget (``CHATBOT_HISTORY_TOKEN_BUDGET``), the older messages, all but the
+last ``CHATBOT_HISTORY_KEEP_MESSAGES``, are folded by the LLM into a summary
+that the agent gets instead. Compaction runs after the agent has answered:
+in Celery (``CHATBOT_COMPACT_ASYNC``) or in the same request.
+"""
+
+import logging
+import re
+import secrets
+from dataclasses import asdict, dataclass, field
+
+from django.conf import settings
+from django.core.cache import cache
+from kombu.exceptions import OperationalError
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY_PREFIX = 'chatbot:session:'
+COMPACT_LOCK_PREFIX = 'chatbot:session_compact:'
+COMPACT_LOCK_TIMEOUT = 120
+
+SESSION_ID_RE = re.compile(r'^[A-Za-z0-9_-]{16,64}$')
+
+# A rough estimate: a BPE token is about three characters of Russian text
+CHARS_PER_TOKEN = 3
+
+# Client messages an expired session can be restored from
+CLIENT_ROLES = ('user', 'assistant')
+MAX_CLIENT_HISTORY = 20
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+@dataclass
+class ChatSession:
+    id: str
+    summary: str = ''
+    messages: list = field(default_factory=list)
+    # Number of messages already folded into summary
+    compacted: int = 0
+
+    @property
+    def is_new(self):
+        return not self.messages and not self.summary
+
+    def history(self):
+        """History for the agent (see ``chatbot.agent.convert_chat_history``)"""
+        history = [{'role': 'summary', 'content': self.summary}] if self.summary else []
+        return history + self.messages
+
+    def tokens(self):
+        return estimate_tokens(self.summary) + sum(estimate_tokens(msg['content']) for msg in self.messages)
+
+    def needs_compaction(self):
+        return (
+            len(self.messages) > settings.CHATBOT_HISTORY_KEEP_MESSAGES
+            and self.tokens() > settings.CHATBOT_HISTORY_TOKEN_BUDGET
+        )
+
+
+def _session_key(session_id):
+    return SESSION_KEY_PREFIX + session_id
+
+
+def load_session(session_id=None, client_history=None):
+    """Session by id; an unknown or empty id starts a new session.
+
+    A new session starts from the history sent by the client, so the
+    conversation survives the session expiring on the server.
+    """
+    if session_id and SESSION_ID_RE.match(session_id):
+        data = cache.get(_session_key(session_id))
+        if data is not None:
+            return ChatSession(**data)
+
+    messages = [
+        {'role': msg['role'], 'content': str(msg.get('content', ''))}
+        for msg in (client_history or [])[-MAX_CLIENT_HISTORY:]
+        if isinstance(msg, dict) and msg.get('role') in CLIENT_ROLES
+    ]
+    return ChatSession(id=secrets.token_urlsafe(16), messages=messages)
+
+
+def save_session(session):
+    cache.set(_session_key(session.id), asdict(session), settings.CHATBOT_SESSION_TIMEOUT)
+
+
+def record_turn(session, user_message, answer):
+    """Add the question and the answer to the session and save it"""
+    session.messages.append({'role': 'user', 'content': user_message})
+    session.messages.append({'role': 'assistant', 'content': answer})
+    save_session(session)
+
+
+def schedule_compaction(session):
+    """Compact the history if it went over the budget"""
+    if not session.needs_compaction():
+        return
+    if settings.CHATBOT_COMPACT_ASYNC:
+        from .tasks import compact_chat_session
+
+        try:
+            compact_chat_session.delay(session.id)
+            return
+        except OperationalError as e:
+            logger.warning(f"Could not enqueue chat session compaction: {e}")
+    compact_session(session.id)
+
+
+def compact_session(session_id):
+    """Fold the older session messages into the summary"""
+    from .agent import summarize_conversation
+
+    lock = COMPACT_LOCK_PREFIX + session_id
+    if not cache.add(lock, True, COMPACT_LOCK_TIMEOUT):
+        return
+    try:
+        session = load_session(session_id)
+        if session.id != session_id or not session.needs_compaction():
+            return
+        old = session.messages[:-settings.CHATBOT_HISTORY_KEEP_MESSAGES]
+        try:
+            summary = summarize_conversation(session.summary, old)
+        except Exception:
+            # The history stays long until the next attempt
+            logger.exception("Chat session compaction failed")
+            return
+        if not summary:
+            return
+
+        # Messages may have been added while the LLM was working: reload the
+        # session and drop only the folded ones
+        current = load_session(session_id)
+        if current.id != session_id or current.compacted != session.compacted:
+            return
+        current.summary = summary
+        current.messages = current.messages[len(old):]
+        current.compacted += len(old)
+        save_session(current)
+    finally:
+        cache.delete(lock)
@@ -0,0 +1,31 @@
+"""
+Incremental updates of the site content index (see ``chatbot.knowledge``).
+"""
+
+from django.db.models.signals import post_delete, post_save
+
+from core.cache import register_warmer
+
+from . import knowledge
+
+
+def _mark_changed(source):
+    def handler(sender, instance, raw=False, **kwargs):
+        if not raw:
+            knowledge.mark_changed(source, instance.pk)
+    return handler
+
+
+def connect_knowledge_index():
+    for source in knowledge.SOURCES:
+        model = source.get_model()
+        handler = _mark_changed(source)
+        uid = f'knowledge-index-{source.name}'
+        post_save.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+        # Documents are reindexed after the transaction commits, when
+        # core.signals invalidates the model tag; a change to the related
+        # models (service categories) affects every document of the source
+        register_warmer(source.tags[:1], lambda source=source: knowledge.sync_source(source))
+        if source.related:
+            register_warmer(source.tags[1:], lambda source=source: knowledge.refresh_source(source))
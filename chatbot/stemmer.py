@@ -0,0 +1,114 @@
+"""
+Russian stemmer after the Snowball (Porter) algorithm.
+
+https://snowballstem.org/algorithms/russian/stemmer.html
+"""
+
+VOWELS = set('аеиоуыэюя')
+
+# The group 1 endings only count after «а» or «я»
+PERFECTIVE_GERUND_1 = ('вшись', 'вши', 'в')
+PERFECTIVE_GERUND_2 = ('ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв')
+ADJECTIVE = (
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые', 'ое', 'ей', 'ий', 'ый', 'ой',
+    'ем', 'им', 'ым', 'ом', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE_1 = ('ем', 'нн', 'вш', 'ющ', 'щ')
+PARTICIPLE_2 = ('ивш', 'ывш', 'ующ')
+REFLEXIVE = ('ся', 'сь')
+VERB_1 = ('ете', 'йте', 'ешь', 'нно', 'ла', 'на', 'ли', 'ем', 'ло', 'но', 'ет', 'ют', 'ны', 'ть', 'й', 'л', 'н')
+VERB_2 = (
+    'ейте', 'уйте', 'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило', 'ыло', 'ено', 'ует', 'уют',
+    'ены', 'ить', 'ыть', 'ишь', 'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ят', 'ит', 'ыт', 'ую', 'ю',
+)
+NOUN = (
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ие', 'ье', 'еи', 'ии', 'ей', 'ой',
+    'ий', 'ям', 'ем', 'ам', 'ом', 'ах', 'ях', 'ию', 'ью', 'ия', 'ья', 'а', 'е', 'и', 'й', 'о', 'у',
+    'ы', 'ь', 'ю', 'я',
+)
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+
+def _regions(word):
+    """Start positions of the RV and R2 regions"""
+    rv = r1 = r2 = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def _strip(word, endings, preceded=False):
+    """Strip the longest of ``endings``; None if none of them matches"""
+    for ending in sorted(endings, key=len, reverse=True):
+        if word.endswith(ending):
+            stem = word[:-len(ending)]
+            if preceded and not stem.endswith(('а', 'я')):
+                continue
+            return stem
+    return None
+
+
+def _strip_any(word, *groups):
+    for endings, preceded in groups:
+        stem = _strip(word, endings, preceded)
+        if stem is not None:
+            return stem
+    return None
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    rv, r2 = _regions(word)
+    prefix, rest = word[:rv], word[rv:]
+
+    # Step 1
+    stripped = _strip_any(rest, (PERFECTIVE_GERUND_1, True), (PERFECTIVE_GERUND_2, False))
+    if stripped is None:
+        reflexive = _strip(rest, REFLEXIVE)
+        if reflexive is not None:
+            rest = reflexive
+        stripped = _strip(rest, ADJECTIVE)
+        if stripped is not None:
+            participle = _strip_any(stripped, (PARTICIPLE_1, True), (PARTICIPLE_2, False))
+            if participle is not None:
+                stripped = participle
+        else:
+            stripped = _strip_any(rest, (VERB_1, True), (VERB_2, False))
+            if stripped is None:
+                stripped = _strip(rest, NOUN)
+    if stripped is not None:
+        rest = stripped
+
+    # Step 2
+    if rest.endswith('и'):
+        rest = rest[:-1]
+
+    # Step 3: derivational suffixes only in R2
+    r2_in_rest = max(r2 - rv, 0)
+    for ending in DERIVATIONAL:
+        if rest.endswith(ending) and len(rest) - len(ending) >= r2_in_rest:
+            rest = rest[:-len(ending)]
+            break
+
+    # Step 4
+    if rest.endswith('нн'):
+        rest = rest[:-1]
+    else:
+        stripped = _strip(rest, SUPERLATIVE)
+        if stripped is not None:
+            rest = stripped[:-1] if stripped.endswith('нн') else stripped
+        elif rest.endswith('ь'):
+            rest = rest[:-1]
+
+    return prefix + rest
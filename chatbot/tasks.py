@@ -0,0 +1,16 @@
+from celery import shared_task
+
+from .jobs import run_turn
+from .sessions import compact_session
+
+
+@shared_task
+def compact_chat_session(session_id):
+    """Fold the older chat session messages into the summary"""
+    compact_session(session_id)
+
+
+@shared_task(ignore_result=True)
+def answer_chat(job_id, session_id, user_message):
+    """Answer a chat message on the chat queue (see chatbot.jobs)"""
+    run_turn(job_id, session_id, user_message)
@@ -0,0 +1,273 @@
+"""
+Chatbot answer telemetry.
+
+``TurnRecorder`` is a LangChain callback handler the agent gets in its
+``config``: it times every LLM call (model, duration, prompt and completion
+tokens) and every tool call. Router and cache answers bypass the agent and
+are recorded with the total time only.
+
+``ChatTurnMetric`` rows are not written from the request: ``submit`` puts
+them in a process buffer, saved with one ``bulk_create`` in a background
+thread once ``CHATBOT_METRICS_BATCH_SIZE`` rows have piled up or
+``CHATBOT_METRICS_FLUSH_INTERVAL`` seconds have passed. A failed write loses
+a batch of metrics, never the visitor's answer.
+
+``daily_stats`` computes the daily p50/p95 for the admin statistics page.
+"""
+
+import atexit
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger(__name__)
+
+
+def _elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000)
+
+
+class TurnRecorder(BaseCallbackHandler):
+    """Collects the LLM and tool calls of one answer"""
+
+    def __init__(self, streamed=False):
+        self.started = time.perf_counter()
+        self.created_at = timezone.now()
+        self.streamed = streamed
+        self.route = 'agent'
+        self.calls = []
+        self.tools = []
+        # run_id -> (start time, model or tool)
+        self._runs = {}
+
+    # --- LLM ---
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start_llm(run_id, metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start_llm(run_id, metadata)
+
+    def _start_llm(self, run_id, metadata):
+        self._runs[run_id] = (time.perf_counter(), (metadata or {}).get('ls_model_name', ''))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started, model = self._runs.pop(run_id, (None, ''))
+        if started is None:
+            return
+        prompt_tokens, completion_tokens = _token_usage(response)
+        llm_output = response.llm_output or {}
+        self.calls.append({
+            'model': model or llm_output.get('model_name', ''),
+            'ms': _elapsed_ms(started),
+            'in': prompt_tokens,
+            'out': completion_tokens,
+        })
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        started, model = self._runs.pop(run_id, (None, ''))
+        if started is not None:
+            self.calls.append({'model': model, 'ms': _elapsed_ms(started), 'in': 0, 'out': 0, 'error': True})
+
+    # --- Tools ---
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = (serialized or {}).get('name') or kwargs.get('name', '')
+        self._runs[run_id] = (time.perf_counter(), name)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end_tool(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end_tool(run_id, error=True)
+
+    def _end_tool(self, run_id, error=False):
+        started, name = self._runs.pop(run_id, (None, ''))
+        if started is None:
+            return
+        call = {'name': name, 'ms': _elapsed_ms(started)}
+        if error:
+            call['error'] = True
+        self.tools.append(call)
+
+    # --- Result ---
+
+    def to_metric(self):
+        from .models import ChatTurnMetric
+
+        return ChatTurnMetric(
+            created_at=self.created_at,
+            route=self.route,
+            streamed=self.streamed,
+            wall_ms=_elapsed_ms(self.started),
+            llm_calls=len(self.calls),
+            llm_ms=sum(call['ms'] for call in self.calls),
+            prompt_tokens=sum(call['in'] for call in self.calls),
+            completion_tokens=sum(call['out'] for call in self.calls),
+            tool_calls=len(self.tools),
+            tool_ms=sum(call['ms'] for call in self.tools),
+            calls=self.calls,
+            tools=self.tools,
+        )
+
+
+def _token_usage(response):
+    """(prompt tokens, completion tokens) of an LLM call result"""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, 'message', None), 'usage_metadata', None)
+            if usage:
+                return usage.get('input_tokens', 0), usage.get('output_tokens', 0)
+    usage = (response.llm_output or {}).get('token_usage') or {}
+    return usage.get('prompt_tokens') or 0, usage.get('completion_tokens') or 0
+
+
+@contextmanager
+def measure_turn(streamed=False):
+    """Time a chatbot answer; on exit the metric goes to the write buffer.
+
+    The answer must pass the recorder in ``config={"callbacks": [...]}``,
+    and set ``route`` when something other than the agent answered.
+    """
+    recorder = TurnRecorder(streamed)
+    try:
+        yield recorder
+    finally:
+        if settings.CHATBOT_METRICS:
+            try:
+                submit(recorder.to_metric())
+            except Exception:
+                logger.exception("Could not record chat turn metric")
+
+
+# --- Batched writes ---
+
+
+_buffer = []
+_buffer_lock = threading.Lock()
+_flush_lock = threading.Lock()
+
+
+def submit(metric):
+    with _buffer_lock:
+        _buffer.append(metric)
+        size = len(_buffer)
+    if size >= settings.CHATBOT_METRICS_BATCH_SIZE:
+        _flush_in_background()
+    elif size == 1:
+        # First row of a batch: with little traffic the rest wait for the timer
+        timer = threading.Timer(settings.CHATBOT_METRICS_FLUSH_INTERVAL, flush)
+        timer.daemon = True
+        timer.start()
+
+
+def _flush_in_background():
+    threading.Thread(target=flush, daemon=True).start()
+
+
+def flush():
+    """Save the buffered metrics; returns the number of rows"""
+    from .models import ChatTurnMetric
+
+    with _flush_lock:
+        with _buffer_lock:
+            batch = _buffer[:]
+            _buffer.clear()
+        if not batch:
+            return 0
+        close_old_connections()
+        try:
+            ChatTurnMetric.objects.bulk_create(batch)
+        except Exception:
+            logger.exception(f"Could not save {len(batch)} chat turn metrics")
+            return 0
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                # A background thread never returns to the Django request cycle that would close the connection
+                connection.close()
+        return len(batch)
+
+
+atexit.register(flush)
+
+
+# --- Statistics ---
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile; values must be sorted"""
+    if not values:
+        return None
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+KIND_ORDER = {'turn': 0, 'llm': 1, 'tool': 2}
+
+
+def _row_order(item):
+    (kind, name), durations = item
+    # The total goes first in its group
+    return KIND_ORDER[kind], name != 'all', name
+
+
+def _summary(durations):
+    durations = sorted(durations)
+    return {
+        'count': len(durations),
+        'p50': percentile(durations, 0.5),
+        'p95': percentile(durations, 0.95),
+    }
+
+
+def daily_stats(days=14):
+    """Daily statistics, newest first: total time by route, LLM calls by model, tools.
+
+    [{"day", "turns", "prompt_tokens", "completion_tokens",
+      "rows": [{"kind", "name", "count", "p50", "p95"}, ...]}, ...]
+    """
+    from .models import ChatTurnMetric
+
+    since = timezone.now() - timedelta(days=days)
+    metrics = ChatTurnMetric.objects.filter(created_at__gte=since).values_list(
+        'created_at', 'route', 'wall_ms', 'prompt_tokens', 'completion_tokens', 'calls', 'tools',
+    )
+
+    by_day = defaultdict(lambda: {
+        'turns': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'durations': defaultdict(list),
+    })
+    for created_at, route, wall_ms, prompt_tokens, completion_tokens, calls, tools in metrics.iterator():
+        day = by_day[timezone.localdate(created_at)]
+        day['turns'] += 1
+        day['prompt_tokens'] += prompt_tokens
+        day['completion_tokens'] += completion_tokens
+        day['durations'][('turn', 'all')].append(wall_ms)
+        day['durations'][('turn', route)].append(wall_ms)
+        for call in calls:
+            day['durations'][('llm', call['model'] or '?')].append(call['ms'])
+        for call in tools:
+            day['durations'][('tool', call['name'])].append(call['ms'])
+
+    stats = []
+    for date in sorted(by_day, reverse=True):
+        day = by_day[date]
+        rows = [
+            {'kind': kind, 'name': name, **_summary(durations)}
+            for (kind, name), durations in sorted(day['durations'].items(), key=_row_order)
+        ]
+        stats.append({
+            'day': date,
+            'turns': day['turns'],
+            'prompt_tokens': day['prompt_tokens'],
+            'completion_tokens': day['completion_tokens'],
+            'rows': rows,
+        })
+    return stats
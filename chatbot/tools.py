@@ -2,23 +2,33 @@
 Custom tools for the veterinary clinic AI assistant.
 """
 
+from asgiref.sync import sync_to_async
 from langchain.tools import tool
-from ddgs import DDGS
 
+from core.cache import get_or_build_local, register_warmer
 
-@tool
-def get_clinic_info() -> str:
-    """
-    Получить информацию о ветеринарной клинике: адрес, телефон, email, часы работы.
-    Используйте этот инструмент, когда пользователь спрашивает о контактах, 
-    местоположении или графике работы клиники.
-    """
+from .knowledge import SOURCE_TAGS, search_knowledge
+from .router import is_vet_related
+from .search import SearchUnavailable, web_search
+
+
+# Data each tool output depends on (core.cache tags)
+TOOL_DEPENDENCIES = {
+    'get_clinic_info': ('contacts.contactinfo',),
+    'get_services_list': ('services.servicecategory', 'services.service'),
+    'get_veterinarians': ('about.veterinarian',),
+    'search_clinic_knowledge': SOURCE_TAGS,
+}
+
+TOOL_OUTPUT_KEY_PREFIX = 'chatbot:tool:'
+
+
+def render_clinic_info() -> str:
     from contacts.models import ContactInfo
     
-    try:
-        contact = ContactInfo.objects.first()
-        if contact:
-            return f"""
+    contact = ContactInfo.objects.first()
+    if contact:
+        return f"""
 Информация о клинике:
 - Название: {contact.clinic_name}
 - Адрес: {contact.address}
@@ -26,7 +36,88 @@ def get_clinic_info() -> str:
 - Email: {contact.email}
 - Часы работы: {contact.working_hours}
 """
-        return "Контактная информация временно недоступна. Пожалуйста, попробуйте позже."
+    return "Контактная информация временно недоступна. Пожалуйста, попробуйте позже."
+
+
+def render_services_list() -> str:
+    from services.catalog import get_catalog
+    
+    catalog = get_catalog()
+    
+    if not catalog:
+        return "Список услуг временно недоступен."
+    
+    result = "Услуги и цены нашей клиники:\n\n"
+    
+    for category in catalog:
+        services = category.services[:5]  # Limit to 5 per category
+        if services:
+            result += f"📋 {category.name}:\n"
+            for service in services:
+                price_str = f"{service.price} руб."
+                if service.price_note:
+                    price_str = f"{service.price_note} {price_str}"
+                result += f"  • {service.name} — {price_str}\n"
+            result += "\n"
+    
+    result += "Для полного списка услуг посетите раздел 'Услуги и цены' на нашем сайте."
+    return result
+
+
+def render_veterinarians() -> str:
+    from about.models import Veterinarian
+    
+    vets = Veterinarian.objects.filter(is_active=True)
+    
+    if not vets:
+        return "Информация о врачах временно недоступна."
+    
+    result = "Наши специалисты:\n\n"
+    
+    for vet in vets:
+        result += f"👨‍⚕️ {vet.name}\n"
+        result += f"   Должность: {vet.position}\n"
+        if vet.bio:
+            # Truncate bio to 150 chars
+            bio = vet.bio[:150] + "..." if len(vet.bio) > 150 else vet.bio
+            result += f"   {bio}\n"
+        result += "\n"
+    
+    return result
+
+
+TOOL_RENDERERS = {
+    'get_clinic_info': render_clinic_info,
+    'get_services_list': render_services_list,
+    'get_veterinarians': render_veterinarians,
+}
+
+
+def get_tool_output(name: str) -> str:
+    """
+    Rendered output of a DB tool. It is kept in the shared cache and in process
+    memory until the data it depends on changes, so a call is a dictionary lookup.
+    """
+    return get_or_build_local(TOOL_OUTPUT_KEY_PREFIX + name, TOOL_DEPENDENCIES[name], TOOL_RENDERERS[name])
+
+
+def register_tool_warmers():
+    """Re-render a tool output right after the data it depends on changes."""
+    for name in TOOL_RENDERERS:
+        def warm(name=name):
+            get_tool_output(name)
+        register_warmer(TOOL_DEPENDENCIES[name], warm)
+
+
+@tool
+def get_clinic_info() -> str:
+    """
+    Получить информацию о ветеринарной клинике: адрес, телефон, email, часы работы.
+    Используйте этот инструмент, когда пользователь спрашивает о контактах, 
+    местоположении или графике работы клиники.
+    """
+    try:
+        return get_tool_output('get_clinic_info')
     except Exception as e:
         return f"Не удалось получить контактную информацию: {str(e)}"
 
@@ -38,29 +129,8 @@ def get_services_list() -> str:
     Используйте этот инструмент, когда пользователь спрашивает об услугах, 
     процедурах или ценах клиники.
     """
-    from services.models import ServiceCategory, Service
-    
     try:
-        categories = ServiceCategory.objects.filter(is_active=True).prefetch_related('services')
-        
-        if not categories.exists():
-            return "Список услуг временно недоступен."
-        
-        result = "Услуги и цены нашей клиники:\n\n"
-        
-        for category in categories:
-            services = category.services.filter(is_active=True)[:5]  # Limit to 5 per category
-            if services:
-                result += f"📋 {category.name}:\n"
-                for service in services:
-                    price_str = f"{service.price} руб."
-                    if service.price_note:
-                        price_str = f"{service.price_note} {price_str}"
-                    result += f"  • {service.name} — {price_str}\n"
-                result += "\n"
-        
-        result += "Для полного списка услуг посетите раздел 'Услуги и цены' на нашем сайте."
-        return result
+        return get_tool_output('get_services_list')
     except Exception as e:
         return f"Не удалось получить список услуг: {str(e)}"
 
@@ -72,30 +142,43 @@ def get_veterinarians() -> str:
     Используйте этот инструмент, когда пользователь спрашивает о врачах, 
     специалистах или команде клиники.
     """
-    from about.models import Veterinarian
-    
     try:
-        vets = Veterinarian.objects.filter(is_active=True)
-        
-        if not vets.exists():
-            return "Информация о врачах временно недоступна."
-        
-        result = "Наши специалисты:\n\n"
-        
-        for vet in vets:
-            result += f"👨‍⚕️ {vet.name}\n"
-            result += f"   Должность: {vet.position}\n"
-            if vet.bio:
-                # Truncate bio to 150 chars
-                bio = vet.bio[:150] + "..." if len(vet.bio) > 150 else vet.bio
-                result += f"   {bio}\n"
-            result += "\n"
-        
-        return result
+        return get_tool_output('get_veterinarians')
     except Exception as e:
         return f"Не удалось получить информацию о врачах: {str(e)}"
 
 
+@tool
+def search_clinic_knowledge(query: str) -> str:
+    """
+    Поиск по материалам сайта клиники: новости, описания услуг, биографии врачей,
+    информация о клинике и её преимуществах.
+    Используйте этот инструмент ПЕРЕД поиском в интернете для любых вопросов,
+    которые могут касаться нашей клиники (акции, процедуры, опыт врачей, оборудование).
+    
+    Args:
+        query: Поисковый запрос
+    """
+    try:
+        hits = search_knowledge(query, limit=3)
+    except Exception as e:
+        return f"Не удалось выполнить поиск по материалам клиники: {str(e)}"
+    
+    if not hits:
+        return "В материалах сайта клиники ничего не найдено по этому запросу."
+    
+    response = "📚 Материалы сайта клиники:\n\n"
+    for i, hit in enumerate(hits, 1):
+        text = hit.text
+        if len(text) > 300:
+            text = text[:300] + "..."
+        response += f"{i}. **{hit.title}**\n"
+        response += f"   {text}\n"
+        response += f"   Страница: {hit.url}\n\n"
+    
+    return response
+
+
 @tool
 def search_veterinary_info(query: str) -> str:
     """
@@ -107,21 +190,8 @@ def search_veterinary_info(query: str) -> str:
     Args:
         query: Поисковый запрос на ветеринарную тему
     """
-    # List of veterinary-related keywords to validate query
-    vet_keywords = [
-        'собака', 'кошка', 'питомец', 'животн', 'ветеринар', 'лечен', 'болезн',
-        'симптом', 'вакцин', 'прививк', 'корм', 'уход', 'порода', 'щенок', 'котёнок',
-        'котенок', 'хомяк', 'попугай', 'кролик', 'грызун', 'рептили', 'рыбк',
-        'аквариум', 'птиц', 'лошад', 'здоровь', 'dog', 'cat', 'pet', 'vet',
-        'хвост', 'лап', 'шерст', 'клещ', 'блох', 'глист', 'паразит', 'стерилиз',
-        'кастрац', 'операц', 'травм', 'перелом', 'рана', 'инфекц', 'вирус',
-        'понос', 'рвот', 'аппетит', 'температур', 'кашел', 'чихан'
-    ]
-    
-    query_lower = query.lower()
-    is_vet_related = any(keyword in query_lower for keyword in vet_keywords)
-    
-    if not is_vet_related:
+    # Veterinary keywords are compiled into one regex (see chatbot.router)
+    if not is_vet_related(query):
         return """Извините, я могу искать информацию только по ветеринарным темам. 
 Пожалуйста, задайте вопрос о здоровье животных, уходе за питомцами или ветеринарии."""
     
@@ -129,8 +199,8 @@ def search_veterinary_info(query: str) -> str:
         # Add veterinary context to the query
         search_query = f"{query} ветеринария"
         
-        with DDGS() as ddgs:
-            results = list(ddgs.text(search_query, max_results=3))
+        # Cached, rate-limited and guarded by a circuit breaker (see chatbot.search)
+        results = web_search(search_query, max_results=3)
         
         if not results:
             return """К сожалению, поиск сейчас недоступен. 
@@ -163,10 +233,9 @@ def search_veterinary_info(query: str) -> str:
         
         return response
         
-    except Exception as e:
-        error_msg = str(e).lower()
-        # Handle CAPTCHA and rate limiting
-        if 'captcha' in error_msg or 'ratelimit' in error_msg or '202' in error_msg or '403' in error_msg:
+    except SearchUnavailable as e:
+        # Handle CAPTCHA, rate limiting and a provider that keeps failing
+        if e.reason in ('ratelimit', 'circuit_open'):
             return """Поиск временно недоступен из-за ограничений поисковой системы.
 
 Я могу помочь вам другими способами:
@@ -180,3 +249,11 @@ def search_veterinary_info(query: str) -> str:
 • Ответить на вопросы о клинике и услугах
 • Дать общие советы по уходу за питомцами"""
 
+
+# Async variants used by agent.ainvoke/astream. The Django ORM is not
+# async-safe, so DB tools run in Django's thread-sensitive executor (the same
+# thread that serves sync code of the request); the web search only does
+# network I/O and runs in a separate thread so it does not block that one.
+for _db_tool in (get_clinic_info, get_services_list, get_veterinarians, search_clinic_knowledge):
+    _db_tool.coroutine = sync_to_async(_db_tool.func, thread_sensitive=True)
+search_veterinary_info.coroutine = sync_to_async(search_veterinary_info.func, thread_sensitive=False)
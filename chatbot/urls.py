@@ -9,5 +9,6 @@ app_name = 'chatbot'
 
 urlpatterns = [
     path('chat/', views.chat_view, name='chat'),
+    path('jobs/<str:job_id>/', views.job_view, name='job'),
 ]
 
@@ -3,34 +3,125 @@ API views for the veterinary clinic chatbot.
 """
 
 import json
-from django.http import JsonResponse
+import math
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+from kombu.exceptions import OperationalError
 
-from .agent import chat
+from . import admission, jobs
+from .agent import FAILED_ANSWERS, achat, achat_stream
+from .sessions import load_session, record_turn, save_session, schedule_compaction
+
+
+def sse_response(events):
+    """Wrap an async iterator of (event, data) pairs into a text/event-stream response."""
+    async def stream():
+        async for event, data in events:
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Tell nginx not to buffer the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def too_many_requests(retry_after):
+    response = JsonResponse({
+        "success": False,
+        "error": "Too many requests, please try again later",
+        "retry_after": retry_after
+    }, status=429)
+    response["Retry-After"] = str(retry_after)
+    return response
+
+
+async def record_answer(session, user_message, answer):
+    """Save a successful turn to the session."""
+    if answer not in FAILED_ANSWERS:
+        await sync_to_async(record_turn)(session, user_message, answer)
+
+
+async def session_events(session, user_message, events):
+    """Record the streamed answer in the session and report the session id with it."""
+    async for event, data in events:
+        if event == "done":
+            await record_answer(session, user_message, data["response"])
+            yield event, {**data, "session_id": session.id}
+            # The client already has the answer: compaction does not delay it
+            await sync_to_async(schedule_compaction)(session)
+        else:
+            yield event, data
+
+
+async def enqueue_chat(user_message, session_id, client_history):
+    """Queue the turn for a chat worker; None if the broker is unreachable."""
+    def enqueue():
+        session = load_session(session_id, client_history)
+        # The worker loads the session by id, so a new one must exist before it runs
+        save_session(session)
+        return session, jobs.enqueue_turn(session, user_message)
+    
+    try:
+        session, job_id = await sync_to_async(enqueue)()
+    except OperationalError as e:
+        print(f"Chat queue unavailable, answering directly: {e}")
+        return None
+    return JsonResponse({
+        "success": True,
+        "status": jobs.PENDING,
+        "job_id": job_id,
+        "poll_url": reverse("chatbot:job", args=[job_id]),
+        "session_id": session.id
+    }, status=202)
 
 
 @csrf_exempt
 @require_http_methods(["POST"])
-def chat_view(request):
+async def chat_view(request):
     """
     API endpoint for chat messages.
     
+    The view is async: under ASGI (clinic.asgi with uvicorn workers) a chat
+    waiting on OpenRouter does not hold a worker thread, so concurrent
+    chats do not starve page rendering.
+    
     Expects JSON body:
     {
         "message": "User's message",
-        "history": [
-            {"role": "user", "content": "..."},
-            {"role": "assistant", "content": "..."}
-        ]
+        "session_id": "Id from the previous response (omit for a new chat)"
     }
     
+    The conversation is kept on the server (see chatbot.sessions). A client
+    may also send "history" ([{"role": "user"/"assistant", "content": "..."}]):
+    it is used only to start a new session, e.g. after the old one expired.
+    
     Returns JSON:
     {
         "response": "Assistant's response",
+        "session_id": "Id to send with the next message",
         "success": true/false,
         "error": "Error message if any"
     }
+    
+    With "stream": true in the body (or Accept: text/event-stream) the
+    response is a Server-Sent Events stream instead: "token" and "tool"
+    events while the agent works, then "done" (with "session_id") or
+    "error" (see chatbot.agent.chat_stream).
+    
+    Clients over their rate limit, and requests that find every LLM slot and
+    the wait queue taken, get 429 with Retry-After (see chatbot.admission).
+    
+    With CHATBOT_QUEUED the turn is answered by a Celery worker on the "chat"
+    queue (see chatbot.jobs) and the request, streaming or not, gets 202 at
+    once: {"success": true, "status": "pending", "job_id": "...",
+    "poll_url": "...", "session_id": "..."}; the answer is fetched from
+    poll_url (job_view). If the broker is unreachable the turn is answered
+    in the request as usual.
     """
     try:
         # Parse request body
@@ -42,9 +133,9 @@ def chat_view(request):
                 "error": "Invalid JSON in request body"
             }, status=400)
         
-        # Get message and history
         user_message = data.get("message", "").strip()
-        chat_history = data.get("history", [])
+        session_id = data.get("session_id")
+        client_history = data.get("history")
         
         # Validate message
         if not user_message:
@@ -60,16 +151,48 @@ def chat_view(request):
                 "error": "Message is too long (max 2000 characters)"
             }, status=400)
         
-        # Limit history length to prevent abuse
-        if len(chat_history) > 20:
-            chat_history = chat_history[-20:]
+        if not isinstance(session_id, str):
+            session_id = None
+        if not isinstance(client_history, list):
+            client_history = None
+        
+        retry_after = await admission.check_rate(admission.client_limits(request, session_id))
+        if retry_after:
+            return too_many_requests(retry_after)
         
-        # Get response from agent
-        response = chat(user_message, chat_history)
+        if settings.CHATBOT_QUEUED:
+            # Chat workers bound the LLM concurrency, so no slot is taken here
+            response = await enqueue_chat(user_message, session_id, client_history)
+            if response is not None:
+                return response
+        
+        try:
+            slot = await admission.acquire()
+        except admission.Overloaded as e:
+            return too_many_requests(e.retry_after)
+        
+        try:
+            session = await sync_to_async(load_session)(session_id, client_history)
+            chat_history = session.history()
+            
+            if data.get("stream") or "text/event-stream" in request.headers.get("Accept", ""):
+                events = session_events(session, user_message, achat_stream(user_message, chat_history))
+                # The slot is held until the stream ends
+                stream, slot = admission.release_after(slot, events), None
+                return sse_response(stream)
+            
+            # Get response from agent
+            response = await achat(user_message, chat_history)
+            await record_answer(session, user_message, response)
+        finally:
+            if slot is not None:
+                await slot.release()
+        await sync_to_async(schedule_compaction)(session)
         
         return JsonResponse({
             "success": True,
-            "response": response
+            "response": response,
+            "session_id": session.id
         })
         
     except Exception as e:
@@ -79,3 +202,42 @@ def chat_view(request):
             "success": False,
             "error": "Internal server error"
         }, status=500)
+
+
+@require_http_methods(["GET"])
+async def job_view(request, job_id):
+    """
+    Long-poll endpoint for a queued chat answer (see chat_view).
+    
+    Waits up to ?wait= seconds (at most CHATBOT_LONG_POLL_TIMEOUT) for the
+    answer. Returns 200 with {"success": true, "status": "done", "response",
+    "session_id"} when it is ready, 202 with {"status": "pending"} while it
+    is still being generated, 404 for an unknown or expired job.
+    """
+    try:
+        wait = float(request.GET.get("wait", 0))
+    except ValueError:
+        wait = 0
+    # NaN passes the clamp below and would hold the request until the job ends
+    if not math.isfinite(wait):
+        wait = 0
+    wait = min(max(wait, 0), settings.CHATBOT_LONG_POLL_TIMEOUT)
+    
+    job = await jobs.await_job(job_id, wait)
+    if job is None:
+        return JsonResponse({
+            "success": False,
+            "error": "Job not found"
+        }, status=404)
+    if job["status"] == jobs.PENDING:
+        return JsonResponse({
+            "success": True,
+            "status": jobs.PENDING,
+            "job_id": job_id
+        }, status=202)
+    return JsonResponse({
+        "success": True,
+        "status": jobs.DONE,
+        "response": job["response"],
+        "session_id": job["session_id"]
+    })
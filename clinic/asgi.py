@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "clinic.settings")
 
 application = get_asgi_application()
+
+# Load page-text singletons once per worker, before the first request
+from core.singletons import warm  # noqa: E402
+
+warm()
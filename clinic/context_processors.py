@@ -1,23 +1,28 @@
 from contacts.models import ContactInfo
 
 
+from core.cache import get_or_build, model_tag
 from core.models import SiteSettings, CommonPhrase
 
 
 def contact_info(request):
     """Добавляет информацию о контактах во все шаблоны"""
     return {
-        'contact_info': ContactInfo.objects.first()
+        'contact_info': ContactInfo.load()
     }
 
 
+def _build_common_phrases():
+    return {p.key: p.text for p in CommonPhrase.objects.all()}
+
+
 def site_content(request):
     """Добавляет настройки сайта и общие фразы во все шаблоны"""
-    settings = SiteSettings.objects.first()
-    phrases = {p.key: p.text for p in CommonPhrase.objects.all()}
-    
     return {
-        'site_settings': settings,
-        'common_phrases': phrases,
+        'site_settings': SiteSettings.load(),
+        'common_phrases': get_or_build(
+            'context:common_phrases',
+            [model_tag(CommonPhrase)],
+            _build_common_phrases,
+        ),
     }
-
@@ -89,6 +89,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "clinic.wsgi.application"
+ASGI_APPLICATION = "clinic.asgi.application"
 
 
 # Database
@@ -117,6 +118,92 @@ else:
     }
 
 
+# Cache
+# Redis is shared by all gunicorn workers and Celery, so invalidation from
+# any process is visible everywhere. Local memory is enough for development.
+
+if os.getenv("CACHE_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("CACHE_URL"),
+            "KEY_PREFIX": "vetclinic",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# The home page snapshot is rebuilt by Celery (see core.home). This only works
+# with a shared cache: a worker's local memory is not visible to the web process.
+HOME_SNAPSHOT_ASYNC = os.getenv("HOME_SNAPSHOT_ASYNC", "1" if os.getenv("CACHE_URL") else "0") == "1"
+
+# Cache of chatbot answers to the first question of a conversation (see
+# chatbot.answer_cache). CHATBOT_ANSWER_SIMILARITY is the TF-IDF cosine
+# similarity threshold for similar questions; 0 means only an exact match of
+# the normalized question.
+CHATBOT_ANSWER_CACHE = os.getenv("CHATBOT_ANSWER_CACHE", "1") == "1"
+CHATBOT_ANSWER_SIMILARITY = float(os.getenv("CHATBOT_ANSWER_SIMILARITY", "0"))
+
+# Chatbot admission (see chatbot.admission): at most CHATBOT_MAX_CONCURRENT
+# agent answers at a time across all workers (with Redis), and a wait queue of
+# CHATBOT_QUEUE_SIZE requests for up to CHATBOT_QUEUE_TIMEOUT seconds. Per
+# session CHATBOT_RATE_PER_MINUTE messages a minute, per IP
+# CHATBOT_IP_RATE_PER_MINUTE, up to CHATBOT_RATE_BURST in a row.
+CHATBOT_MAX_CONCURRENT = int(os.getenv("CHATBOT_MAX_CONCURRENT", "8"))
+CHATBOT_QUEUE_SIZE = int(os.getenv("CHATBOT_QUEUE_SIZE", "16"))
+CHATBOT_QUEUE_TIMEOUT = float(os.getenv("CHATBOT_QUEUE_TIMEOUT", "10"))
+CHATBOT_RATE_PER_MINUTE = float(os.getenv("CHATBOT_RATE_PER_MINUTE", "10"))
+CHATBOT_IP_RATE_PER_MINUTE = float(os.getenv("CHATBOT_IP_RATE_PER_MINUTE", "30"))
+CHATBOT_RATE_BURST = int(os.getenv("CHATBOT_RATE_BURST", "5"))
+
+# Chatbot answers in Celery (see chatbot.jobs): a turn goes to the chat queue,
+# and the client fetches the answer with long-poll requests of up to
+# CHATBOT_LONG_POLL_TIMEOUT seconds; a job is kept for CHATBOT_JOB_TIMEOUT seconds.
+CHATBOT_QUEUED = os.getenv("CHATBOT_QUEUED", "0") == "1"
+CHATBOT_LONG_POLL_TIMEOUT = float(os.getenv("CHATBOT_LONG_POLL_TIMEOUT", "25"))
+CHATBOT_JOB_TIMEOUT = int(os.getenv("CHATBOT_JOB_TIMEOUT", "600"))
+
+# Chatbot answer telemetry (see chatbot.telemetry): metrics are written to the
+# database outside the request, in batches of CHATBOT_METRICS_BATCH_SIZE or every
+# CHATBOT_METRICS_FLUSH_INTERVAL seconds.
+CHATBOT_METRICS = os.getenv("CHATBOT_METRICS", "1") == "1"
+CHATBOT_METRICS_BATCH_SIZE = int(os.getenv("CHATBOT_METRICS_BATCH_SIZE", "50"))
+CHATBOT_METRICS_FLUSH_INTERVAL = float(os.getenv("CHATBOT_METRICS_FLUSH_INTERVAL", "10"))
+
+# Answers without the LLM to greetings and contact and price questions (see chatbot.router)
+CHATBOT_ROUTER = os.getenv("CHATBOT_ROUTER", "1") == "1"
+
+# Server-side chatbot sessions (see chatbot.sessions). When the history is
+# longer than CHATBOT_HISTORY_TOKEN_BUDGET tokens, all but the last
+# CHATBOT_HISTORY_KEEP_MESSAGES messages are folded into a summary; in Celery
+# only with a shared cache, like the home page snapshot.
+CHATBOT_SESSION_TIMEOUT = int(os.getenv("CHATBOT_SESSION_TIMEOUT", str(60 * 60 * 24)))
+CHATBOT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHATBOT_HISTORY_TOKEN_BUDGET", "1500"))
+CHATBOT_HISTORY_KEEP_MESSAGES = int(os.getenv("CHATBOT_HISTORY_KEEP_MESSAGES", "4"))
+CHATBOT_COMPACT_ASYNC = os.getenv("CHATBOT_COMPACT_ASYNC", "1" if os.getenv("CACHE_URL") else "0") == "1"
+
+# Chatbot web search (see chatbot.search): results are cached in SQLite, at
+# most CHATBOT_SEARCH_RATE requests per second (CHATBOT_SEARCH_BURST in a row)
+# per process, and after CHATBOT_SEARCH_FAILURE_THRESHOLD failures in a row the
+# search is switched off for CHATBOT_SEARCH_RESET_TIMEOUT seconds. To work
+# without network: CHATBOT_SEARCH_BACKEND=chatbot.search.FakeSearchBackend.
+CHATBOT_SEARCH_BACKEND = os.getenv("CHATBOT_SEARCH_BACKEND", "chatbot.search.DDGSBackend")
+CHATBOT_SEARCH_CACHE_PATH = os.getenv("CHATBOT_SEARCH_CACHE_PATH", str(BASE_DIR / "var" / "search_cache.sqlite3"))
+CHATBOT_SEARCH_CACHE_TTL = int(os.getenv("CHATBOT_SEARCH_CACHE_TTL", str(60 * 60 * 24)))
+CHATBOT_SEARCH_TIMEOUT = float(os.getenv("CHATBOT_SEARCH_TIMEOUT", "8"))
+CHATBOT_SEARCH_RATE = float(os.getenv("CHATBOT_SEARCH_RATE", "0.5"))
+CHATBOT_SEARCH_BURST = int(os.getenv("CHATBOT_SEARCH_BURST", "5"))
+CHATBOT_SEARCH_FAILURE_THRESHOLD = int(os.getenv("CHATBOT_SEARCH_FAILURE_THRESHOLD", "3"))
+CHATBOT_SEARCH_RESET_TIMEOUT = int(os.getenv("CHATBOT_SEARCH_RESET_TIMEOUT", "300"))
+
+# Local index of the site content for the chatbot (see chatbot.knowledge)
+CHATBOT_KNOWLEDGE_INDEX_PATH = os.getenv("CHATBOT_KNOWLEDGE_INDEX_PATH", str(BASE_DIR / "var" / "knowledge.sqlite3"))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -164,6 +251,10 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 MEDIA_URL = "media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Pre-rendered public pages served directly by nginx (core/prerender.py)
+PRERENDER_ENABLED = os.getenv("PRERENDER_ENABLED", "0") == "1"
+PRERENDER_ROOT = Path(os.getenv("PRERENDER_ROOT", BASE_DIR / "prerendered"))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -199,3 +290,7 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_TASK_ROUTES = {
+    # Chatbot answers are handled by separate workers: the celery_chat docker-compose service
+    'chatbot.tasks.answer_chat': {'queue': 'chat'},
+}
@@ -1,30 +1,16 @@
 from django.shortcuts import render
 from news.models import News
-from contacts.models import ContactInfo
 from reviews.models import Review
 
 
+from core.home import HOME_PAGE_TAG, get_home_snapshot
 from core.models import HeroSection, StatItem
+from core.page_cache import cache_public_page
 from about.models import FeatureItem, AboutPageText
 
 
+@cache_public_page(News, Review, HeroSection, StatItem, FeatureItem, AboutPageText, extra_tags=[HOME_PAGE_TAG])
 def home(request):
     """Главная страница клиники"""
-    latest_news = News.objects.filter(is_published=True).order_by('-created_at')[:3]
-    contact_info = ContactInfo.objects.first()
-    reviews = Review.objects.filter(is_published=True)[:3]
-    
-    hero_section = HeroSection.objects.first()
-    stats = StatItem.objects.all()
-    features = FeatureItem.objects.all()
-    about_text = AboutPageText.objects.first()
-    
-    return render(request, 'home.html', {
-        'latest_news': latest_news,
-        'contact_info': contact_info,
-        'reviews': reviews,
-        'hero_section': hero_section,
-        'stats': stats,
-        'features': features,
-        'about_text': about_text,
-    })
\ No newline at end of file
+    # Contacts come from the contact_info context processor
+    return render(request, 'home.html', get_home_snapshot())
\ No newline at end of file
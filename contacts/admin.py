@@ -1,4 +1,6 @@
 from django.contrib import admin
+
+from core.admin import SingletonModelAdmin
 from .models import ContactInfo, ContactSubmission, ContactsPageText
 
 @admin.register(ContactInfo)
@@ -38,8 +40,5 @@ class ContactSubmissionAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at',)
 
 @admin.register(ContactsPageText)
-class ContactsPageTextAdmin(admin.ModelAdmin):
-    def has_add_permission(self, request):
-        if self.model.objects.exists():
-            return False
-        return super().has_add_permission(request)
+class ContactsPageTextAdmin(SingletonModelAdmin):
+    pass
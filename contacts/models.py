@@ -1,5 +1,8 @@
 from django.db import models
 
+from core.cache import get_or_build, model_tag
+from core.models import SingletonModel
+
 
 class ContactInfo(models.Model):
     clinic_name = models.CharField(max_length=100, verbose_name="Название клиники")
@@ -52,6 +55,11 @@ class ContactInfo(models.Model):
         """Проверяет, заданы ли координаты"""
         return self.latitude is not None and self.longitude is not None
 
+    @classmethod
+    def load(cls):
+        """Контактная информация клиники из кэша (или None, если не заполнена)"""
+        return get_or_build('contacts:contact_info', [model_tag(cls)], cls.objects.first)
+
 
 class ContactSubmission(models.Model):
     name = models.CharField(max_length=100)
@@ -67,7 +75,7 @@ class ContactSubmission(models.Model):
     
     def __str__(self):
         return f"{self.name} - {self.subject}"
-class ContactsPageText(models.Model):
+class ContactsPageText(SingletonModel):
     """Текстовые блоки для страницы 'Контакты'"""
     header_title = models.CharField(max_length=200, default="Как нас найти", verbose_name="Заголовок страницы")
     header_subtitle = models.TextField(default="Мы всегда на связи и готовы помочь вашим питомцам", verbose_name="Подзаголовок страницы")
@@ -1,3 +1,24 @@
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from .models import ContactInfo
+
+
+class ContactInfoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.contact = ContactInfo.objects.create(
+            clinic_name="ВетКлиника", address="ул. Ленина, 1", phone="+7 900 000-00-00",
+            email='clinic@example.com', working_hours="9:00–21:00",
+        )
+
+    def test_load_is_cached_until_saved(self):
+        self.assertEqual(ContactInfo.load().address, "ул. Ленина, 1")
+        with self.assertNumQueries(0):
+            ContactInfo.load()
+
+        self.contact.address = "ул. Мира, 5"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.contact.save()
+        self.assertEqual(ContactInfo.load().address, "ул. Мира, 5")
+
@@ -6,8 +6,8 @@ from .forms import ContactForm
 
 def contacts(request):
     """Страница контактов с информацией о клинике"""
-    contact_info = ContactInfo.objects.first()
-    contacts_text = ContactsPageText.objects.first()
+    contact_info = ContactInfo.load()
+    contacts_text = ContactsPageText.load()
     
     return render(request, 'contacts/contacts.html', {
         'contact_info': contact_info,
@@ -17,8 +17,8 @@ def contacts(request):
 
 def contact_us(request):
     """Форма обратной связи / записи на приём"""
-    contact_info = ContactInfo.objects.first()
-    contacts_text = ContactsPageText.objects.first()
+    contact_info = ContactInfo.load()
+    contacts_text = ContactsPageText.load()
     
     if request.method == 'POST':
         form = ContactForm(request.POST)
@@ -1,25 +1,28 @@
 from django.contrib import admin
 from .models import SiteSettings, CommonPhrase, HeroSection, StatItem
 
-@admin.register(SiteSettings)
-class SiteSettingsAdmin(admin.ModelAdmin):
+
+class SingletonModelAdmin(admin.ModelAdmin):
+    """Admin for singleton models: only one instance can be created"""
+
     def has_add_permission(self, request):
-        # Only allow one instance of SiteSettings
         if self.model.objects.exists():
             return False
         return super().has_add_permission(request)
 
+
+@admin.register(SiteSettings)
+class SiteSettingsAdmin(SingletonModelAdmin):
+    pass
+
 @admin.register(CommonPhrase)
 class CommonPhraseAdmin(admin.ModelAdmin):
     list_display = ('key', 'text', 'description')
     search_fields = ('key', 'text')
 
 @admin.register(HeroSection)
-class HeroSectionAdmin(admin.ModelAdmin):
-    def has_add_permission(self, request):
-        if self.model.objects.exists():
-            return False
-        return super().has_add_permission(request)
+class HeroSectionAdmin(SingletonModelAdmin):
+    pass
 
 @admin.register(StatItem)
 class StatItemAdmin(admin.ModelAdmin):
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from .signals import connect_cache_invalidation, connect_home_snapshot, connect_prerender
+
+        connect_cache_invalidation()
+        connect_home_snapshot()
+        connect_prerender()
@@ -0,0 +1,169 @@
+"""
+Tag-versioned cache.
+
+Every value is stored together with the versions of the tags it depends on.
+Invalidating a tag gives it a new version, so entries built under the old
+version are treated as misses on the next read and rebuilt.
+A value and the versions of its tags are read with a single ``get_many``.
+"""
+
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 60 * 60 * 24
+TAG_KEY_PREFIX = 'tag:'
+
+# Miss marker: None is a valid cached value
+MISSING = object()
+
+# Functions that rebuild values ahead of time after a tag is invalidated (see register_warmer)
+_warmers = {}
+
+# Latest get_or_build_local values in process memory: {key: (versions, value)}
+_local_entries = {}
+
+
+def model_tag(model):
+    """Tag for data that depends on a model (e.g. ``contacts.contactinfo``)."""
+    return model._meta.label_lower
+
+
+def _tag_key(tag):
+    return f'{TAG_KEY_PREFIX}{tag}'
+
+
+def _new_version():
+    # A nanosecond timestamp does not repeat after the key is evicted,
+    # unlike a counter that would start over from one.
+    return time.time_ns()
+
+
+def _resolve_versions(tags, found):
+    """Tag versions from a ``get_many`` result; missing ones are created."""
+    versions = {}
+    missing = {}
+    for tag in tags:
+        key = _tag_key(tag)
+        if key in found:
+            versions[tag] = found[key]
+        else:
+            versions[tag] = missing[key] = _new_version()
+    if missing:
+        cache.set_many(missing, timeout=None)
+    return versions
+
+
+def get_tag_versions(tags):
+    """Current versions of the tags."""
+    tags = list(tags)
+    return _resolve_versions(tags, cache.get_many([_tag_key(tag) for tag in tags]))
+
+
+def invalidate_tags(*tags):
+    """Invalidate tags: every entry that depends on them becomes a miss."""
+    version = _new_version()
+    cache.set_many({_tag_key(tag): version for tag in tags}, timeout=None)
+    _run_warmers(tags)
+
+
+def register_warmer(tags, func):
+    """Call ``func()`` after every invalidation of any of ``tags``.
+
+    For values that should be built ahead of time rather than by the first
+    request after the data changes.
+    """
+    for tag in tags:
+        _warmers.setdefault(tag, []).append(func)
+
+
+def _run_warmers(tags):
+    funcs = []
+    for tag in tags:
+        for func in _warmers.get(tag, ()):
+            if func not in funcs:
+                funcs.append(func)
+    for func in funcs:
+        try:
+            func()
+        except Exception:
+            # The first request will build the value
+            logger.exception(f"Cache warmer {func.__qualname__} failed")
+
+
+def invalidate_tags_on_commit(*tags):
+    """Invalidate tags once the current transaction commits.
+
+    Otherwise a concurrent request could rebuild the entry from uncommitted
+    data and store it under the new version.
+    """
+    transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+def get_entry(key, tags):
+    """Read an entry and the current versions of its tags in one request.
+
+    Returns ``(value, versions)``; on a miss ``value`` is ``MISSING`` and
+    ``versions`` should be passed on to ``set_entry``.
+    """
+    tags = list(tags)
+    found = cache.get_many([key] + [_tag_key(tag) for tag in tags])
+    versions = _resolve_versions(tags, found)
+
+    entry = found.get(key)
+    if entry is not None and entry[0] == versions:
+        return entry[1], versions
+    return MISSING, versions
+
+
+def set_entry(key, versions, value, timeout=DEFAULT_TIMEOUT):
+    """Store a value built under the tag ``versions``."""
+    cache.set(key, (versions, value), timeout)
+
+
+def get_or_build(key, tags, builder, timeout=DEFAULT_TIMEOUT):
+    """Return the cached value or build it by calling ``builder()``.
+
+    The entry stays valid until any of ``tags`` is invalidated.
+    """
+    value, versions = get_entry(key, tags)
+    if value is MISSING:
+        value = builder()
+        set_entry(key, versions, value, timeout)
+    return value
+
+
+def get_or_build_stale(key, tags, builder, timeout=DEFAULT_TIMEOUT):
+    """Like ``get_or_build``, but an outdated value is returned as is.
+
+    The value is built synchronously only when there is none at all. Keeping
+    it fresh is up to the caller, e.g. a Celery task that calls
+    ``get_or_build`` with the same arguments after the data changes.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        return entry[1]
+    return get_or_build(key, tags, builder, timeout)
+
+
+def get_or_build_local(key, tags, builder, timeout=DEFAULT_TIMEOUT):
+    """Like ``get_or_build``, but the value is also kept in process memory.
+
+    While the tag versions are unchanged, a call costs one read of the
+    versions, without fetching and unpickling the value from the shared cache.
+    """
+    tags = list(tags)
+    local = _local_entries.get(key)
+    if local is not None and get_tag_versions(tags) == local[0]:
+        return local[1]
+
+    value, versions = get_entry(key, tags)
+    if value is MISSING:
+        value = builder()
+        set_entry(key, versions, value, timeout)
+    _local_entries[key] = (versions, value)
+    return value
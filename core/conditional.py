@@ -0,0 +1,67 @@
+"""
+Conditional GET (ETag / Last-Modified) for public pages.
+
+Last-Modified is the latest of the page objects' ``updated_at`` (a cheap
+aggregate computed before the template renders) and the last invalidation
+of the page's model tags, which covers deletions and singletons without
+timestamps. The ETag is built from the same versions.
+"""
+
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .cache import get_tag_versions, model_tag
+from .page_cache import GLOBAL_TAGS, is_cacheable_request
+
+
+def _state(request, tags, last_modified, args, kwargs):
+    """Compute (last_modified, etag) once per request."""
+    if not hasattr(request, '_content_state'):
+        versions = get_tag_versions(tags)
+        modified = datetime.fromtimestamp(max(versions.values()) / 1e9, tz=dt_timezone.utc)
+        updated_at = last_modified(request, *args, **kwargs)
+        if updated_at and updated_at > modified:
+            modified = updated_at
+
+        raw = '|'.join(
+            [request.get_full_path(), modified.isoformat()]
+            + [f'{tag}={versions[tag]}' for tag in tags]
+        )
+        request._content_state = (modified, hashlib.md5(raw.encode('utf-8')).hexdigest())
+    return request._content_state
+
+
+def conditional_page(*models, last_modified):
+    """Respond with 304 if the page has not changed since the last visit.
+
+    ``last_modified(request, *args, **kwargs)`` returns the latest
+    ``updated_at`` of the page objects (or None).
+    """
+    tags = list(GLOBAL_TAGS) + [model_tag(model) for model in models]
+
+    def decorator(view_func):
+        def get_last_modified(request, *args, **kwargs):
+            return _state(request, tags, last_modified, args, kwargs)[0]
+
+        def get_etag(request, *args, **kwargs):
+            return _state(request, tags, last_modified, args, kwargs)[1]
+
+        conditional_view = condition(etag_func=get_etag, last_modified_func=get_last_modified)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            # The page differs for staff and when it shows flash messages
+            if not is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+            response = conditional_view(request, *args, **kwargs)
+            # Browsers and proxies revalidate every time and get a 304
+            patch_cache_control(response, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,61 @@
+"""
+Home page data snapshot.
+
+All the home page data (except the contacts from the context processor) is
+collected into one document and cached as a single value, so the view makes
+one cache read. With a shared cache (``HOME_SNAPSHOT_ASYNC``) a change to any
+of the models queues the ``core.tasks.rebuild_home_snapshot`` Celery task,
+and until it finishes requests keep getting the previous snapshot. A request
+builds the snapshot synchronously only on a cold miss. The page cache may
+store the home page with the stale snapshot, so the task then invalidates
+``HOME_PAGE_TAG``.
+"""
+
+from django.conf import settings
+
+from about.models import AboutPageText, FeatureItem
+from news.models import News
+from reviews.models import Review, ReviewStats
+
+from .cache import get_or_build, get_or_build_stale
+from .models import HeroSection, StatItem
+
+HOME_SNAPSHOT_KEY = 'core:home_snapshot'
+
+HOME_SNAPSHOT_MODELS = [
+    'news.News',
+    'reviews.Review',
+    'core.HeroSection',
+    'core.StatItem',
+    'about.FeatureItem',
+    'about.AboutPageText',
+]
+
+HOME_SNAPSHOT_TAGS = [label.lower() for label in HOME_SNAPSHOT_MODELS]
+
+# The cached home page, as opposed to the data it is built from
+HOME_PAGE_TAG = 'core:home_page'
+
+
+def build_home_snapshot():
+    return {
+        'latest_news': list(News.objects.filter(is_published=True).order_by('-created_at')[:3]),
+        'reviews': list(Review.objects.filter(is_published=True)[:3]),
+        'review_stats': ReviewStats.get(),
+        'hero_section': HeroSection.load(),
+        'stats': list(StatItem.objects.all()),
+        'features': list(FeatureItem.objects.all()),
+        'about_text': AboutPageText.load(),
+    }
+
+
+def refresh_home_snapshot():
+    """Rebuild the snapshot if it is stale."""
+    return get_or_build(HOME_SNAPSHOT_KEY, HOME_SNAPSHOT_TAGS, build_home_snapshot, timeout=None)
+
+
+def get_home_snapshot():
+    if not settings.HOME_SNAPSHOT_ASYNC:
+        # No worker refreshes the snapshot: a stale one is rebuilt here
+        return refresh_home_snapshot()
+    return get_or_build_stale(HOME_SNAPSHOT_KEY, HOME_SNAPSHOT_TAGS, build_home_snapshot, timeout=None)
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from core.cache import invalidate_tags
+from core.page_cache import PAGES_TAG
+
+
+class Command(BaseCommand):
+    help = "Invalidate the full-page cache (e.g. after templates change)"
+
+    def handle(self, *args, **options):
+        invalidate_tags(PAGES_TAG)
+        self.stdout.write(self.style.SUCCESS("Page cache invalidated"))
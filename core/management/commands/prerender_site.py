@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core.prerender import all_urls, prerender_urls
+from core.tasks import prerender_pages
+
+
+class Command(BaseCommand):
+    help = "Pre-render public pages into HTML files served by nginx"
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='*', help="Page URLs (the whole site by default)")
+        parser.add_argument(
+            '--async', dest='use_celery', action='store_true',
+            help="Queue a Celery task instead of rendering in this process",
+        )
+
+    def handle(self, *args, **options):
+        urls = options['urls'] or all_urls()
+        if options['use_celery']:
+            prerender_pages.delay(urls)
+            self.stdout.write(f"Queued {len(urls)} pages for prerendering")
+            return
+        rendered = prerender_urls(urls)
+        self.stdout.write(self.style.SUCCESS(f"Prerendered {rendered} of {len(urls)} pages"))
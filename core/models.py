@@ -1,6 +1,20 @@
 from django.db import models
 
-class SiteSettings(models.Model):
+
+class SingletonModel(models.Model):
+    """Base model for content that exists as a single instance"""
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def load(cls):
+        """The instance from the singleton registry (or None if it has not been created)"""
+        from .singletons import get_singleton
+        return get_singleton(cls)
+
+
+class SiteSettings(SingletonModel):
     site_title = models.CharField(max_length=100, default="ВетКлиника", verbose_name="Заголовок сайта")
     meta_description = models.TextField(blank=True, verbose_name="Meta Description")
     footer_text = models.TextField(blank=True, verbose_name="Текст в подвале")
@@ -25,7 +39,7 @@ class CommonPhrase(models.Model):
     def __str__(self):
         return f"{self.key}: {self.text}"
 
-class HeroSection(models.Model):
+class HeroSection(SingletonModel):
     badge_location = models.CharField(max_length=100, default="Ветеринарная клиника в Константиновске", verbose_name="Бейдж: Локация")
     badge_work_hours = models.CharField(max_length=100, default="Работаем 24/7", verbose_name="Бейдж: Часы работы")
     badge_license = models.CharField(max_length=100, default="Лицензия", verbose_name="Бейдж: Лицензия")
@@ -0,0 +1,83 @@
+"""
+Full-page cache for anonymous GET requests.
+
+A response is stored under a key built from the path and query string and
+tagged with the models the page depends on. Saving any of these models
+invalidates only its own tag (see ``core.signals``); other pages keep being
+served from the cache.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.http import HttpResponse
+
+from .cache import MISSING, get_entry, model_tag, set_entry
+
+# The tag of all pages is invalidated on deploy, when templates may have changed
+PAGES_TAG = 'pages'
+
+# Context processor data is on every page
+GLOBAL_TAGS = (
+    PAGES_TAG,
+    'contacts.contactinfo',
+    'core.sitesettings',
+    'core.commonphrase',
+)
+
+PAGE_KEY_PREFIX = 'page:'
+
+
+def is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.user.is_authenticated:
+        return False
+    # Flash messages are rendered by base.html and must not be cached
+    return len(get_messages(request)) == 0
+
+
+def _is_cacheable_response(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+    )
+
+
+def page_cache_key(request):
+    path = request.get_full_path()
+    return PAGE_KEY_PREFIX + hashlib.md5(path.encode('utf-8')).hexdigest()
+
+
+def cache_public_page(*models, extra_tags=()):
+    """Cache the page for anonymous visitors until any of ``models`` changes.
+
+    ``extra_tags`` let code other than model saves invalidate the page.
+    """
+    tags = list(GLOBAL_TAGS) + [model_tag(model) for model in models] + list(extra_tags)
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            key = page_cache_key(request)
+            cached, versions = get_entry(key, tags)
+            if cached is not MISSING:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                response['X-Page-Cache'] = 'HIT'
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            if request.method == 'GET' and _is_cacheable_response(response):
+                set_entry(key, versions, (response.content, response['Content-Type']))
+                response['X-Page-Cache'] = 'MISS'
+            return response
+
+        return wrapper
+
+    return decorator
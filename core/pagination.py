@@ -0,0 +1,113 @@
+"""
+Keyset pagination of lists ordered from newest to oldest.
+
+A page is selected with ``(created_at, id) < (cursor)`` instead of
+``OFFSET``, so the response time does not depend on how deep the page is
+and no ``COUNT(*)`` is needed. The cursor is a
+``<microseconds since epoch>.<id>`` string of the last (or first) object of
+the page.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Largest value of a 64-bit integer column; larger ids cannot be queried
+MAX_PK = 2**63 - 1
+
+# Legacy page numbers above this are treated as "past the end"
+MAX_PAGE_NUMBER = 10_000
+
+
+def encode_cursor(obj, field='created_at'):
+    delta = getattr(obj, field) - EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 10**6 + delta.microseconds
+    return f'{micros}.{obj.pk}'
+
+
+def decode_cursor(cursor):
+    """Parse a cursor; returns None for an invalid one."""
+    try:
+        micros, pk = cursor.split('.')
+        value, pk = EPOCH + timedelta(microseconds=int(micros)), int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+    if not 0 < pk <= MAX_PK:
+        return None
+    return value, pk
+
+
+class KeysetPage:
+    """A list page with cursors of the neighbouring pages."""
+
+    def __init__(self, object_list, has_next, has_previous, field='created_at'):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = encode_cursor(object_list[-1], field) if has_next else None
+        self.previous_cursor = encode_cursor(object_list[0], field) if has_previous else None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+def keyset_page(queryset, per_page, after=None, before=None, field='created_at'):
+    """The page of ``queryset`` after the ``after`` cursor or before ``before``.
+
+    Without a cursor (or with an invalid one) the first page is returned.
+    """
+    after, before = decode_cursor(after), decode_cursor(before)
+
+    if before and not after:
+        value, pk = before
+        rows = list(
+            queryset.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk}))
+            .order_by(field, 'pk')[:per_page + 1]
+        )
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        return KeysetPage(rows, has_next=bool(rows), has_previous=has_previous, field=field)
+
+    queryset = queryset.order_by(f'-{field}', '-pk')
+    if after:
+        value, pk = after
+        queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+    rows = list(queryset[:per_page + 1])
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    return KeysetPage(rows, has_next=has_next, has_previous=bool(after and rows), field=field)
+
+
+def numbered_page(queryset, per_page, number, field='created_at'):
+    """The page by number, for legacy ``?page=N`` links.
+
+    Uses ``OFFSET``, without ``COUNT(*)`` unless the number is past the end:
+    then the last page is returned, like ``Paginator.get_page`` did. The
+    links to the neighbouring pages of the result are cursors.
+    """
+    try:
+        number = min(max(1, int(number)), MAX_PAGE_NUMBER)
+    except (TypeError, ValueError):
+        number = 1
+    queryset = queryset.order_by(f'-{field}', '-pk')
+    offset = (number - 1) * per_page
+    rows = list(queryset[offset:offset + per_page + 1])
+    if not rows and number > 1:
+        count = queryset.count()
+        number = max(1, -(-count // per_page))
+        offset = (number - 1) * per_page
+        rows = list(queryset[offset:offset + per_page + 1])
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    return KeysetPage(rows, has_next=has_next, has_previous=bool(number > 1 and rows), field=field)
@@ -0,0 +1,236 @@
+"""
+Pre-rendering of public pages into HTML files served by nginx.
+
+The ``/news/`` page is saved as ``<PRERENDER_ROOT>/news/index.html``; nginx
+finds it with ``try_files`` (see ``docker/nginx/nginx.conf``). Pages with
+query parameters (news list cursors, legacy ``?page=N``) are served by
+Django.
+
+When an object changes, only the pages that depend on it are re-rendered
+(``urls_for_change``). Pages that no longer exist (an unpublished news item,
+a deleted category) are removed from disk.
+"""
+
+import inspect
+import logging
+import os
+import tempfile
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from .home import refresh_home_snapshot
+
+logger = logging.getLogger(__name__)
+
+HOME_URL = '/'
+
+
+def file_for_url(url):
+    """Path of the HTML file for a public page URL."""
+    return Path(settings.PRERENDER_ROOT) / urlsplit(url).path.strip('/') / 'index.html'
+
+
+def render_url(url):
+    """Render the page as an anonymous visitor would see it.
+
+    Returns the HTML, or None if the page does not exist. The page is built
+    from fresh data: a file on disk is served until the next change.
+    """
+    path = urlsplit(url).path
+    if path == HOME_URL:
+        # Web requests may still be served the stale snapshot
+        refresh_home_snapshot()
+    request = RequestFactory().get(url)
+    request.user = AnonymousUser()
+    match = resolve(path)
+    # Skip the page cache decorators: the cached page may predate the change
+    view = inspect.unwrap(match.func)
+    try:
+        response = view(request, *match.args, **match.kwargs)
+    except Http404:
+        return None
+    if response.status_code != 200:
+        return None
+    return response.content
+
+
+def write_page(url, content):
+    path = file_for_url(url)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file so nginx never serves a partly written page.
+    # Its name is unique: the web process and Celery may render the same page.
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp', delete=False) as tmp:
+        tmp.write(content)
+    try:
+        # NamedTemporaryFile is private to its owner; nginx must be able to read the page
+        os.chmod(tmp.name, 0o644)
+        os.replace(tmp.name, path)
+    except OSError:
+        os.unlink(tmp.name)
+        raise
+
+
+def remove_page(url):
+    file_for_url(url).unlink(missing_ok=True)
+
+
+def prerender_urls(urls):
+    """Re-render the pages; the ones that no longer exist are removed from disk."""
+    rendered = 0
+    for url in urls:
+        content = render_url(url)
+        if content is None:
+            remove_page(url)
+        else:
+            write_page(url, content)
+            rendered += 1
+    prune_news_pages()
+    logger.info(f"Prerendered {rendered} of {len(urls)} pages")
+    return rendered
+
+
+# --- Page list ---
+
+
+def prune_news_pages():
+    """Remove the ``page-N.html`` files left by the old numbered pagination."""
+    directory = file_for_url(reverse('news:news_list')).parent
+    if not directory.exists():
+        return
+    for path in directory.glob('page-*.html'):
+        path.unlink(missing_ok=True)
+
+
+def news_urls():
+    from news.models import News
+
+    urls = [reverse('news:news_list')]
+    for pk in News.objects.filter(is_published=True).values_list('pk', flat=True):
+        urls.append(reverse('news:news_detail', args=[pk]))
+    return urls
+
+
+def services_urls():
+    from services.models import ServiceCategory
+
+    urls = [reverse('services:list'), reverse('services:prices')]
+    for slug in ServiceCategory.objects.filter(is_active=True).values_list('slug', flat=True):
+        urls.append(reverse('services:category', args=[slug]))
+    return urls
+
+
+def all_urls():
+    """All public pages of the site."""
+    return [
+        HOME_URL,
+        *services_urls(),
+        reverse('about:about'),
+        reverse('reviews:list'),
+        *news_urls(),
+    ]
+
+
+# --- Pages that depend on objects ---
+
+# Fields whose old values tell which pages a change affects
+TRACKED_FIELDS = {
+    'news.news': ('is_published',),
+    'services.service': ('category__slug',),
+    'services.servicecategory': ('slug',),
+}
+
+
+def capture_old_state(instance):
+    """Remember the tracked field values before a save."""
+    fields = TRACKED_FIELDS.get(instance._meta.label_lower)
+    if not fields or instance.pk is None:
+        return None
+    return type(instance).objects.filter(pk=instance.pk).values(*fields).first()
+
+
+def _news_urls_for_change(news, old, deleted):
+    from news.models import News
+    from news.views import NEWS_PER_PAGE
+
+    urls = {HOME_URL, reverse('news:news_detail', args=[news.pk])}
+
+    if deleted:
+        was_published, is_published = news.is_published, False
+    else:
+        was_published, is_published = bool(old and old['is_published']), news.is_published
+    if not was_published and not is_published:
+        return urls
+
+    # Only the first page of the list is pre-rendered: it changes if the
+    # news item is on it (or was, before it was unpublished)
+    newer = News.objects.filter(
+        is_published=True, created_at__gt=news.created_at,
+    )[:NEWS_PER_PAGE].count()
+    if newer < NEWS_PER_PAGE:
+        urls.add(reverse('news:news_list'))
+    return urls
+
+
+def _services_urls_for_change(slugs):
+    urls = {reverse('services:list'), reverse('services:prices')}
+    for slug in slugs:
+        if slug:
+            urls.add(reverse('services:category', args=[slug]))
+    return urls
+
+
+def urls_for_change(instance, old=None, deleted=False):
+    """Pages to re-render after ``instance`` changes."""
+    label = instance._meta.label_lower
+
+    if label == 'news.news':
+        return _news_urls_for_change(instance, old, deleted)
+    if label == 'news.newspagetext':
+        return set(news_urls())
+    if label == 'services.service':
+        try:
+            slug = instance.category.slug
+        except ObjectDoesNotExist:
+            slug = None
+        return _services_urls_for_change({slug, old and old['category__slug']})
+    if label == 'services.servicecategory':
+        return _services_urls_for_change({instance.slug, old and old['slug']})
+    if label == 'services.servicespagetext':
+        return set(services_urls())
+    if label in ('reviews.review', 'reviews.reviewspagetext'):
+        return {reverse('reviews:list'), HOME_URL}
+    if label in ('about.aboutcontent', 'about.veterinarian'):
+        return {reverse('about:about')}
+    if label in ('about.featureitem', 'about.aboutpagetext'):
+        return {reverse('about:about'), HOME_URL}
+    if label in ('core.herosection', 'core.statitem'):
+        return {HOME_URL}
+    # Contacts, site settings and common phrases are on every page
+    return set(all_urls())
+
+
+PRERENDERED_MODELS = [
+    'news.News',
+    'news.NewsPageText',
+    'services.Service',
+    'services.ServiceCategory',
+    'services.ServicesPageText',
+    'reviews.Review',
+    'reviews.ReviewsPageText',
+    'about.AboutContent',
+    'about.Veterinarian',
+    'about.FeatureItem',
+    'about.AboutPageText',
+    'core.HeroSection',
+    'core.StatItem',
+    'contacts.ContactInfo',
+    'core.SiteSettings',
+    'core.CommonPhrase',
+]
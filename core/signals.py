@@ -0,0 +1,113 @@
+import logging
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from kombu.exceptions import OperationalError
+
+from . import prerender
+from .cache import invalidate_tags_on_commit, model_tag
+from .home import HOME_SNAPSHOT_MODELS
+from .models import SingletonModel
+from .singletons import refresh_singletons
+
+logger = logging.getLogger(__name__)
+
+# Models that cached data depends on (see core.cache)
+CACHED_MODELS = [
+    'contacts.ContactInfo',
+    'core.CommonPhrase',
+    'core.StatItem',
+    'news.News',
+    'reviews.Review',
+    'services.ServiceCategory',
+    'services.Service',
+    'about.AboutContent',
+    'about.Veterinarian',
+    'about.FeatureItem',
+]
+
+
+def invalidate_model_cache(sender, **kwargs):
+    """Invalidate the cache that depends on the saved or deleted model."""
+    invalidate_tags_on_commit(model_tag(sender))
+
+
+def connect_cache_invalidation():
+    for label in CACHED_MODELS:
+        model = apps.get_model(label)
+        uid = f'cache-invalidation-{model_tag(model)}'
+        post_save.connect(invalidate_model_cache, sender=model, dispatch_uid=uid)
+        post_delete.connect(invalidate_model_cache, sender=model, dispatch_uid=uid)
+
+    # Singletons are invalidated and rebuilt in a single pass
+    for model in apps.get_models():
+        if issubclass(model, SingletonModel):
+            uid = f'singleton-refresh-{model_tag(model)}'
+            post_save.connect(refresh_singletons, sender=model, dispatch_uid=uid)
+            post_delete.connect(refresh_singletons, sender=model, dispatch_uid=uid)
+
+
+def _delay(task, *args):
+    """Queue a task; an unavailable broker does not break the save."""
+    try:
+        task.delay(*args)
+    except OperationalError as e:
+        logger.warning(f"Could not enqueue {task.name}: {e}")
+
+
+# --- Home page snapshot (see core.home) ---
+
+
+def rebuild_home_snapshot_on_change(sender, **kwargs):
+    from .tasks import rebuild_home_snapshot
+
+    transaction.on_commit(lambda: _delay(rebuild_home_snapshot))
+
+
+def connect_home_snapshot():
+    if not settings.HOME_SNAPSHOT_ASYNC:
+        return
+    for label in HOME_SNAPSHOT_MODELS:
+        model = apps.get_model(label)
+        uid = f'home-snapshot-{model_tag(model)}'
+        post_save.connect(rebuild_home_snapshot_on_change, sender=model, dispatch_uid=uid)
+        post_delete.connect(rebuild_home_snapshot_on_change, sender=model, dispatch_uid=uid)
+
+
+# --- Page pre-rendering (see core.prerender) ---
+
+
+def _schedule_prerender(urls):
+    """Queue pre-rendering of the pages once the current transaction commits."""
+    from .tasks import prerender_pages
+
+    # The page list is bound to its own callback, so a rollback discards it
+    # together with the callback and nothing leaks into the next transaction
+    urls = sorted(urls)
+    transaction.on_commit(lambda: _delay(prerender_pages, urls))
+
+
+def capture_prerender_state(sender, instance, **kwargs):
+    instance._prerender_old_state = prerender.capture_old_state(instance)
+
+
+def prerender_on_save(sender, instance, **kwargs):
+    old = getattr(instance, '_prerender_old_state', None)
+    _schedule_prerender(prerender.urls_for_change(instance, old=old))
+
+
+def prerender_on_delete(sender, instance, **kwargs):
+    _schedule_prerender(prerender.urls_for_change(instance, deleted=True))
+
+
+def connect_prerender():
+    if not settings.PRERENDER_ENABLED:
+        return
+    for label in prerender.PRERENDERED_MODELS:
+        model = apps.get_model(label)
+        uid = f'prerender-{model_tag(model)}'
+        pre_save.connect(capture_prerender_state, sender=model, dispatch_uid=uid)
+        post_save.connect(prerender_on_save, sender=model, dispatch_uid=uid)
+        post_delete.connect(prerender_on_delete, sender=model, dispatch_uid=uid)
@@ -0,0 +1,58 @@
+"""
+Registry of singleton models (page texts, hero section, site settings).
+
+All singletons are loaded in one pass and cached as a single value, so
+``Model.load()`` in views does not hit the database. The registry is warmed
+when a worker starts (see ``clinic/wsgi.py``) and rebuilt whenever a
+singleton is saved in the admin.
+"""
+
+import logging
+
+from django.apps import apps
+from django.db import DatabaseError, transaction
+
+from .cache import get_or_build, invalidate_tags, model_tag
+
+logger = logging.getLogger(__name__)
+
+SINGLETONS_CACHE_KEY = 'core:singletons'
+
+
+def get_singleton_models():
+    from .models import SingletonModel
+    return [model for model in apps.get_models() if issubclass(model, SingletonModel)]
+
+
+def _load_all():
+    return {model_tag(model): model.objects.first() for model in get_singleton_models()}
+
+
+def get_all():
+    """All singletons as a ``{model tag: instance or None}`` dict."""
+    tags = [model_tag(model) for model in get_singleton_models()]
+    return get_or_build(SINGLETONS_CACHE_KEY, tags, _load_all)
+
+
+def get_singleton(model):
+    return get_all().get(model_tag(model))
+
+
+def warm():
+    """Load the registry ahead of time so the first request does not pay for it."""
+    try:
+        get_all()
+    except DatabaseError as e:
+        # E.g. migrations have not been applied yet
+        logger.warning(f"Could not warm singleton registry: {e}")
+
+
+def refresh_singletons(sender, **kwargs):
+    """Rebuild the registry after a singleton is saved or deleted."""
+    tag = model_tag(sender)
+
+    def refresh():
+        invalidate_tags(tag)
+        warm()
+
+    transaction.on_commit(refresh)
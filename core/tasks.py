@@ -0,0 +1,19 @@
+from celery import shared_task
+
+from .cache import invalidate_tags
+from .home import HOME_PAGE_TAG, refresh_home_snapshot
+from .prerender import all_urls, prerender_urls
+
+
+@shared_task
+def prerender_pages(urls=None):
+    """Pre-render site pages; all public pages when called without arguments."""
+    return prerender_urls(urls if urls is not None else all_urls())
+
+
+@shared_task
+def rebuild_home_snapshot():
+    """Rebuild the home page snapshot if it is stale."""
+    refresh_home_snapshot()
+    # Requests made before the rebuild cached the page with the stale snapshot
+    invalidate_tags(HOME_PAGE_TAG)
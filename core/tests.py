@@ -1,3 +1,267 @@
-from django.test import TestCase
+import stat
+import tempfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.db import transaction
+from django.test import RequestFactory, TestCase, override_settings
+
+from clinic.context_processors import site_content
+from . import prerender
+from .cache import (
+    get_or_build, get_or_build_local, get_or_build_stale, invalidate_tags, invalidate_tags_on_commit, register_warmer,
+)
+from .home import get_home_snapshot, refresh_home_snapshot
+from .models import CommonPhrase, HeroSection, SiteSettings
+from .page_cache import cache_public_page
+from .signals import _schedule_prerender
+from .tasks import rebuild_home_snapshot
+
+
+class TagCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return self.builds
+
+    def test_entry_is_rebuilt_after_tag_invalidation(self):
+        self.assertEqual(get_or_build('test:key', ['test:a', 'test:b'], self.build), 1)
+        self.assertEqual(get_or_build('test:key', ['test:a', 'test:b'], self.build), 1)
+
+        invalidate_tags('test:b')
+        self.assertEqual(get_or_build('test:key', ['test:a', 'test:b'], self.build), 2)
+
+    def test_unrelated_tag_keeps_entry(self):
+        get_or_build('test:key', ['test:a'], self.build)
+        invalidate_tags('test:other')
+        self.assertEqual(get_or_build('test:key', ['test:a'], self.build), 1)
+
+    def test_none_is_cached(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+
+        self.assertIsNone(get_or_build('test:none', ['test:a'], build))
+        self.assertIsNone(get_or_build('test:none', ['test:a'], build))
+        self.assertEqual(len(calls), 1)
+
+    def test_invalidation_waits_for_commit(self):
+        get_or_build('test:key', ['test:a'], self.build)
+        with self.captureOnCommitCallbacks() as callbacks:
+            invalidate_tags_on_commit('test:a')
+            self.assertEqual(get_or_build('test:key', ['test:a'], self.build), 1)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(get_or_build('test:key', ['test:a'], self.build), 2)
+
+    def test_stale_entry_is_served_until_refreshed(self):
+        get_or_build_stale('test:key', ['test:a'], self.build)
+        invalidate_tags('test:a')
+        self.assertEqual(get_or_build_stale('test:key', ['test:a'], self.build), 1)
+
+        self.assertEqual(get_or_build('test:key', ['test:a'], self.build), 2)
+        self.assertEqual(get_or_build_stale('test:key', ['test:a'], self.build), 2)
+
+    def test_local_entry_is_reused_until_invalidated(self):
+        value = get_or_build_local('test:local', ['test:a'], lambda: [self.build()])
+        self.assertIs(get_or_build_local('test:local', ['test:a'], lambda: [self.build()]), value)
+
+        invalidate_tags('test:a')
+        self.assertEqual(get_or_build_local('test:local', ['test:a'], lambda: [self.build()]), [2])
+
+    def test_warmer_runs_after_invalidation(self):
+        register_warmer(['test:warm'], lambda: get_or_build('test:warm-key', ['test:warm'], self.build))
+        get_or_build('test:warm-key', ['test:warm'], self.build)
+
+        invalidate_tags('test:warm')
+        self.assertEqual(self.builds, 2)
+        self.assertEqual(get_or_build('test:warm-key', ['test:warm'], self.build), 2)
+
+
+class ContextProcessorCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get('/')
+        CommonPhrase.objects.create(key='call', text="Позвонить")
+
+    def test_common_phrases_are_cached_until_saved(self):
+        self.assertEqual(site_content(self.request)['common_phrases'], {'call': "Позвонить"})
+        with self.assertNumQueries(0):
+            site_content(self.request)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CommonPhrase.objects.get(key='call').delete()
+            CommonPhrase.objects.create(key='book', text="Записаться")
+        self.assertEqual(site_content(self.request)['common_phrases'], {'book': "Записаться"})
+
+
+class SingletonTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_load_is_served_from_registry(self):
+        SiteSettings.objects.create(site_title="Клиника")
+        self.assertEqual(SiteSettings.load().site_title, "Клиника")
+        with self.assertNumQueries(0):
+            SiteSettings.load()
+
+    def test_load_without_instance(self):
+        self.assertIsNone(SiteSettings.load())
+
+    def test_registry_is_rebuilt_on_save(self):
+        settings = SiteSettings.objects.create(site_title="Клиника")
+        SiteSettings.load()
+
+        settings.site_title = "ВетКлиника"
+        with self.captureOnCommitCallbacks(execute=True):
+            settings.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(SiteSettings.load().site_title, "ВетКлиника")
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.renders = 0
+
+        @cache_public_page(CommonPhrase)
+        def view(request):
+            self.renders += 1
+            return HttpResponse(f"render {self.renders}")
+
+        self.view = view
+
+    def get(self, path='/page/', user=None):
+        request = self.factory.get(path)
+        request.user = user or AnonymousUser()
+        return self.view(request)
+
+    def test_anonymous_page_is_cached(self):
+        self.assertEqual(self.get()['X-Page-Cache'], 'MISS')
+        response = self.get()
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        self.assertEqual(response.content, b"render 1")
+
+    def test_query_string_is_part_of_key(self):
+        self.get('/page/?a=1')
+        self.assertEqual(self.get('/page/?a=2')['X-Page-Cache'], 'MISS')
+
+    def test_model_change_invalidates_page(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            CommonPhrase.objects.create(key='call', text="Позвонить")
+        self.assertEqual(self.get().content, b"render 2")
+
+    def test_authenticated_user_is_not_cached(self):
+        user = User.objects.create_user('staff')
+        self.get(user=user)
+        response = self.get(user=user)
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertEqual(self.renders, 2)
+
+
+class PrerenderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        self.enterContext(override_settings(PRERENDER_ROOT=self.root))
+
+    def test_page_is_written_readable_without_temporary_files(self):
+        prerender.write_page('/news/', b'<html></html>')
+
+        path = self.root / 'news' / 'index.html'
+        self.assertEqual(path.read_bytes(), b'<html></html>')
+        self.assertEqual(stat.S_IMODE(path.stat().st_mode), 0o644)
+        self.assertEqual([p.name for p in path.parent.iterdir()], ['index.html'])
+
+    def test_missing_page_is_removed(self):
+        prerender.write_page('/news/1/', b'old')
+        self.assertEqual(prerender.prerender_urls(['/news/1/']), 0)
+        self.assertFalse((self.root / 'news' / '1' / 'index.html').exists())
+
+    @override_settings(HOME_SNAPSHOT_ASYNC=True)
+    def test_page_is_rendered_from_fresh_data(self):
+        hero = HeroSection.objects.create(title="Забота о питомцах")
+        self.assertEqual(self.client.get('/')['X-Page-Cache'], 'MISS')
+
+        hero.title = "Лечим с любовью"
+        with self.captureOnCommitCallbacks(execute=True):
+            hero.save()
+        self.assertIn("Лечим с любовью", prerender.render_url('/').decode())
+
+    def test_pages_are_queued_after_commit(self):
+        with mock.patch('core.tasks.prerender_pages.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                _schedule_prerender({'/news/', '/'})
+                delay.assert_not_called()
+        delay.assert_called_once_with(['/', '/news/'])
+
+    def test_rolled_back_pages_are_not_queued(self):
+        with mock.patch('core.tasks.prerender_pages.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        _schedule_prerender({'/news/'})
+                        raise ValueError
+                except ValueError:
+                    pass
+                _schedule_prerender({'/about/'})
+        delay.assert_called_once_with(['/about/'])
+
+
+class HomeSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hero = HeroSection.objects.create(title="Забота о питомцах")
+
+    def change_title(self, title):
+        self.hero.title = title
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hero.save()
+
+    @override_settings(HOME_SNAPSHOT_ASYNC=True)
+    def test_stale_snapshot_is_served_until_task_refreshes_it(self):
+        self.assertEqual(get_home_snapshot()['hero_section'].title, "Забота о питомцах")
+
+        self.change_title("Лечим с любовью")
+        with self.assertNumQueries(0):
+            self.assertEqual(get_home_snapshot()['hero_section'].title, "Забота о питомцах")
+
+        refresh_home_snapshot()
+        self.assertEqual(get_home_snapshot()['hero_section'].title, "Лечим с любовью")
+
+    @override_settings(HOME_SNAPSHOT_ASYNC=False)
+    def test_stale_snapshot_is_rebuilt_without_worker(self):
+        get_home_snapshot()
+        self.change_title("Лечим с любовью")
+        self.assertEqual(get_home_snapshot()['hero_section'].title, "Лечим с любовью")
+
+    @override_settings(HOME_SNAPSHOT_ASYNC=True)
+    def test_page_cached_with_stale_snapshot_is_refreshed_by_task(self):
+        self.assertContains(self.client.get('/'), "Забота о питомцах")
+
+        self.change_title("Лечим с любовью")
+        response = self.client.get('/')
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, "Забота о питомцах")
+        self.assertEqual(self.client.get('/')['X-Page-Cache'], 'HIT')
+
+        rebuild_home_snapshot()
+        response = self.client.get('/')
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, "Лечим с любовью")
+
+    def test_home_page_renders_snapshot(self):
+        response = self.client.get('/')
+        self.assertContains(response, "Забота о питомцах")
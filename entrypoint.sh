@@ -19,6 +19,26 @@ python manage.py migrate --noinput
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
+# One-off startup steps run only in the web container (RUN_STARTUP_TASKS=1
+# in docker-compose): the Celery workers start from the same image
+if [ "${RUN_STARTUP_TASKS:-0}" = "1" ]; then
+    # Templates may have changed with the deploy: drop cached pages
+    # and re-render all static pages
+    python manage.py invalidate_page_cache
+
+    # Prompts may have changed too: drop cached chatbot answers
+    python manage.py clear_answer_cache
+
+    # Index site content for the chatbot before the first question.
+    # Workers build their own index on first search.
+    python manage.py rebuild_knowledge_index
+
+    if [ "${PRERENDER_ENABLED:-0}" = "1" ]; then
+        echo "Prerendering public pages..."
+        python manage.py prerender_site
+    fi
+fi
+
 echo "Starting server..."
 exec "$@"
 
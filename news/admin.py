@@ -1,4 +1,6 @@
 from django.contrib import admin
+
+from core.admin import SingletonModelAdmin
 from .models import News, NewsPageText
 
 @admin.register(News)
@@ -10,8 +12,5 @@ class NewsAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at')
 
 @admin.register(NewsPageText)
-class NewsPageTextAdmin(admin.ModelAdmin):
-    def has_add_permission(self, request):
-        if self.model.objects.exists():
-            return False
-        return super().has_add_permission(request)
+class NewsPageTextAdmin(SingletonModelAdmin):
+    pass
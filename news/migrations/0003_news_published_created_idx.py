@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0002_newspagetext_alter_news_options_alter_news_content_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['is_published', '-created_at'], name='news_published_created_idx'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 
+from core.models import SingletonModel
+
 
 class News(models.Model):
     title = models.CharField(max_length=200, verbose_name="Заголовок")
@@ -13,12 +15,15 @@ class News(models.Model):
         verbose_name = "Новость"
         verbose_name_plural = "Новости"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_published', '-created_at'], name='news_published_created_idx'),
+        ]
         
     def __str__(self):
         return self.title
 
 
-class NewsPageText(models.Model):
+class NewsPageText(SingletonModel):
     """Текстовые блоки для страницы 'Новости'"""
     header_title = models.CharField(max_length=200, default="Новости клиники", verbose_name="Заголовок страницы")
     header_subtitle = models.TextField(default="Актуальная информация о жизни клиники и полезные советы для владельцев", verbose_name="Подзаголовок страницы")
@@ -1,3 +1,88 @@
+from datetime import timedelta
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import News
+from .views import NEWS_PER_PAGE
+
+
+class ConditionalNewsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        News.objects.create(title="Открытие", content="Клиника открылась")
+
+    def test_not_modified_with_matching_etag(self):
+        url = reverse('news:news_list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_when_news_is_added(self):
+        url = reverse('news:news_list')
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            News.objects.create(title="Вакцинация", content="Новые вакцины")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_not_modified_since_last_visit(self):
+        url = reverse('news:news_list')
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+
+class NewsPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        for i in range(12):
+            news = News.objects.create(title=f"Новость {i}", content="Текст")
+            News.objects.filter(pk=news.pk).update(created_at=now - timedelta(days=i))
+        self.url = reverse('news:news_list')
+
+    def titles(self, response):
+        return [news.title for news in response.context['news_page']]
+
+    def test_cursor_pages(self):
+        first = self.client.get(self.url).context['news_page']
+        self.assertEqual([news.title for news in first], [f"Новость {i}" for i in range(NEWS_PER_PAGE)])
+        self.assertFalse(first.has_previous)
+
+        second = self.client.get(self.url, {'after': first.next_cursor})
+        self.assertEqual(self.titles(second), [f"Новость {i}" for i in range(5, 10)])
+
+        back = self.client.get(self.url, {'before': second.context['news_page'].previous_cursor})
+        self.assertEqual(self.titles(back), [f"Новость {i}" for i in range(5)])
+
+    def test_last_cursor_page(self):
+        page = self.client.get(self.url, {'page': 2}).context['news_page']
+        last = self.client.get(self.url, {'after': page.next_cursor}).context['news_page']
+        self.assertEqual([news.title for news in last], ["Новость 10", "Новость 11"])
+        self.assertFalse(last.has_next)
+        self.assertTrue(last.has_previous)
+
+    def test_invalid_cursor_gives_first_page(self):
+        for cursor in ('junk', '1.0', '1.99999999999999999999999', '9' * 40 + '.1'):
+            response = self.client.get(self.url, {'after': cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.titles(response)[0], "Новость 0")
+
+    def test_legacy_page_number(self):
+        response = self.client.get(self.url, {'page': 2})
+        self.assertEqual(self.titles(response), [f"Новость {i}" for i in range(5, 10)])
 
-# Create your tests here.
+    def test_page_number_past_the_end_gives_last_page(self):
+        for number in ('4', '99999999999999999999999'):
+            response = self.client.get(self.url, {'page': number})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.titles(response), ["Новость 10", "Новость 11"])
+            self.assertFalse(response.context['news_page'].has_next)
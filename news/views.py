@@ -1,14 +1,35 @@
 from django.shortcuts import render, get_object_or_404
-from django.core.paginator import Paginator
+from django.db.models import Max
+from core.conditional import conditional_page
+from core.page_cache import cache_public_page
+from core.pagination import keyset_page, numbered_page
 from .models import News, NewsPageText
 
+NEWS_PER_PAGE = 5
 
+
+def news_list_last_modified(request):
+    return News.objects.filter(is_published=True).aggregate(Max('updated_at'))['updated_at__max']
+
+
+def news_detail_last_modified(request, pk):
+    return News.objects.filter(pk=pk, is_published=True).values_list('updated_at', flat=True).first()
+
+
+@conditional_page(News, NewsPageText, last_modified=news_list_last_modified)
+@cache_public_page(News, NewsPageText)
 def news_list(request):
-    news_list = News.objects.filter(is_published=True).order_by('-created_at')
-    paginator = Paginator(news_list, 5)  # Show 5 news per page
-    page_number = request.GET.get('page')
-    news_page = paginator.get_page(page_number)
-    news_text = NewsPageText.objects.first()
+    news_list = News.objects.filter(is_published=True)
+    if 'page' in request.GET:
+        # Old ?page=N links
+        news_page = numbered_page(news_list, NEWS_PER_PAGE, request.GET['page'])
+    else:
+        news_page = keyset_page(
+            news_list, NEWS_PER_PAGE,
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+    news_text = NewsPageText.load()
     
     return render(request, 'news/list.html', {
         'news_page': news_page,
@@ -16,9 +37,11 @@ def news_list(request):
     })
 
 
+@conditional_page(News, NewsPageText, last_modified=news_detail_last_modified)
+@cache_public_page(News, NewsPageText)
 def news_detail(request, pk):
     news = get_object_or_404(News, pk=pk, is_published=True)
-    news_text = NewsPageText.objects.first()
+    news_text = NewsPageText.load()
     
     return render(request, 'news/detail.html', {
         'news': news,
@@ -1,4 +1,6 @@
 from django.contrib import admin
+
+from core.admin import SingletonModelAdmin
 from .models import Review, ReviewsPageText
 
 
@@ -12,8 +14,5 @@ class ReviewAdmin(admin.ModelAdmin):
 
 
 @admin.register(ReviewsPageText)
-class ReviewsPageTextAdmin(admin.ModelAdmin):
-    def has_add_permission(self, request):
-        if self.model.objects.exists():
-            return False
-        return super().has_add_permission(request)
+class ReviewsPageTextAdmin(SingletonModelAdmin):
+    pass
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from reviews.models import ReviewStats
+
+
+class Command(BaseCommand):
+    help = "Recalculate review stats over the whole table (after bulk changes that bypass signals)"
+
+    def handle(self, *args, **options):
+        ReviewStats.recalculate()
+        stats = ReviewStats.get()
+        self.stdout.write(self.style.SUCCESS(
+            f"Review stats: {stats.average} from {stats.published_count} published of {stats.total_count}"
+        ))
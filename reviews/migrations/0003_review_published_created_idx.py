@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_reviewspagetext'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['is_published', '-created_at'], name='review_published_created_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:43
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_review_stats(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    ReviewStats = apps.get_model('reviews', 'ReviewStats')
+    published = Review.objects.filter(is_published=True)
+    stats = published.aggregate(published_count=Count('pk'), rating_sum=Sum('rating'))
+    histogram = dict(published.values_list('rating').annotate(Count('pk')).order_by())
+    ReviewStats.objects.create(
+        pk=1,
+        total_count=Review.objects.count(),
+        published_count=stats['published_count'],
+        rating_sum=stats['rating_sum'] or 0,
+        **{f'stars_{stars}': histogram.get(stars, 0) for stars in range(1, 6)},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_review_published_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_count', models.PositiveIntegerField(default=0, verbose_name='Всего отзывов')),
+                ('published_count', models.PositiveIntegerField(default=0, verbose_name='Опубликовано отзывов')),
+                ('rating_sum', models.PositiveIntegerField(default=0, verbose_name='Сумма оценок опубликованных')),
+                ('stars_1', models.PositiveIntegerField(default=0, verbose_name='Оценок ★')),
+                ('stars_2', models.PositiveIntegerField(default=0, verbose_name='Оценок ★★')),
+                ('stars_3', models.PositiveIntegerField(default=0, verbose_name='Оценок ★★★')),
+                ('stars_4', models.PositiveIntegerField(default=0, verbose_name='Оценок ★★★★')),
+                ('stars_5', models.PositiveIntegerField(default=0, verbose_name='Оценок ★★★★★')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Статистика отзывов',
+                'verbose_name_plural': 'Статистика отзывов',
+            },
+        ),
+        migrations.RunPython(fill_review_stats, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from core.cache import invalidate_tags_on_commit, model_tag
+from core.models import SingletonModel
 
 
 class Review(models.Model):
@@ -29,10 +34,13 @@ class Review(models.Model):
         verbose_name = "Отзыв"
         verbose_name_plural = "Отзывы"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_published', '-created_at'], name='review_published_created_idx'),
+        ]
 
     def __str__(self):
         return f"Отзыв от {self.author_name} - {self.rating}★"
-class ReviewsPageText(models.Model):
+class ReviewsPageText(SingletonModel):
     """Текстовые блоки для страницы 'Отзывы'"""
     header_title = models.CharField(max_length=200, default="Отзывы наших клиентов", verbose_name="Заголовок страницы")
     header_subtitle = models.TextField(default="Мы ценим доверие каждого владельца и любовь каждого питомца", verbose_name="Подзаголовок страницы")
@@ -43,3 +51,101 @@ class ReviewsPageText(models.Model):
 
     def __str__(self):
         return "Тексты страницы 'Отзывы'"
+
+
+class ReviewStats(models.Model):
+    """Сводная статистика отзывов.
+
+    Хранится одной строкой и обновляется инкрементально при каждом изменении
+    отзыва (см. ``reviews.signals``), поэтому для вывода рейтинга достаточно
+    одного запроса по первичному ключу.
+    """
+    STATS_PK = 1
+
+    total_count = models.PositiveIntegerField(default=0, verbose_name="Всего отзывов")
+    published_count = models.PositiveIntegerField(default=0, verbose_name="Опубликовано отзывов")
+    rating_sum = models.PositiveIntegerField(default=0, verbose_name="Сумма оценок опубликованных")
+    stars_1 = models.PositiveIntegerField(default=0, verbose_name="Оценок ★")
+    stars_2 = models.PositiveIntegerField(default=0, verbose_name="Оценок ★★")
+    stars_3 = models.PositiveIntegerField(default=0, verbose_name="Оценок ★★★")
+    stars_4 = models.PositiveIntegerField(default=0, verbose_name="Оценок ★★★★")
+    stars_5 = models.PositiveIntegerField(default=0, verbose_name="Оценок ★★★★★")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+
+    class Meta:
+        verbose_name = "Статистика отзывов"
+        verbose_name_plural = "Статистика отзывов"
+
+    def __str__(self):
+        return f"{self.average} ★ из {self.published_count} отзывов"
+
+    @classmethod
+    def get(cls):
+        """Текущая статистика (пустая, если отзывов ещё не было)"""
+        return cls.objects.filter(pk=cls.STATS_PK).first() or cls(pk=cls.STATS_PK)
+
+    @property
+    def average(self):
+        """Средняя оценка опубликованных отзывов, округлённая до десятых"""
+        if not self.published_count:
+            return 0
+        return round(self.rating_sum / self.published_count, 1)
+
+    @property
+    def histogram(self):
+        """Список ``(оценка, количество, процент)`` от 5 до 1 звезды"""
+        result = []
+        for stars in range(5, 0, -1):
+            count = getattr(self, f'stars_{stars}')
+            percent = round(count * 100 / self.published_count) if self.published_count else 0
+            result.append((stars, count, percent))
+        return result
+
+    @classmethod
+    def apply_change(cls, old=None, new=None):
+        """Учитывает изменение одного отзыва.
+
+        ``old`` и ``new`` — пары ``(is_published, rating)`` до и после
+        изменения; ``None`` означает, что отзыва не было (создание) или
+        больше нет (удаление).
+        """
+        if old == new:
+            return
+        with transaction.atomic():
+            cls.objects.get_or_create(pk=cls.STATS_PK)
+            changes = {}
+
+            def add(field, delta):
+                changes[field] = changes.get(field, 0) + delta
+
+            for state, sign in ((old, -1), (new, 1)):
+                if state is None:
+                    continue
+                add('total_count', sign)
+                is_published, rating = state
+                if is_published:
+                    add('published_count', sign)
+                    add('rating_sum', sign * rating)
+                    if 1 <= rating <= 5:
+                        add(f'stars_{rating}', sign)
+            # F expressions: concurrent changes do not overwrite each other
+            cls.objects.filter(pk=cls.STATS_PK).update(
+                **{field: F(field) + delta for field, delta in changes.items() if delta},
+                updated_at=timezone.now(),
+            )
+
+    @classmethod
+    def recalculate(cls):
+        """Полный пересчёт по таблице отзывов"""
+        published = Review.objects.filter(is_published=True)
+        with transaction.atomic():
+            stats = published.aggregate(published_count=Count('pk'), rating_sum=Sum('rating'))
+            histogram = dict(published.values_list('rating').annotate(Count('pk')).order_by())
+            cls.objects.update_or_create(pk=cls.STATS_PK, defaults={
+                'total_count': Review.objects.count(),
+                'published_count': stats['published_count'],
+                'rating_sum': stats['rating_sum'] or 0,
+                **{f'stars_{stars}': histogram.get(stars, 0) for stars in range(1, 6)},
+            })
+            # The stats are shown on cached pages tagged with reviews
+            invalidate_tags_on_commit(model_tag(Review))
@@ -0,0 +1,35 @@
+"""
+Incremental ``ReviewStats`` updates when reviews change.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .models import Review, ReviewStats
+
+
+def _state(review):
+    return (review.is_published, review.rating)
+
+
+def capture_review_state(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        instance._stats_old_state = None
+        return
+    old = sender.objects.filter(pk=instance.pk).values_list('is_published', 'rating').first()
+    instance._stats_old_state = old
+
+
+def update_stats_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    ReviewStats.apply_change(getattr(instance, '_stats_old_state', None), _state(instance))
+
+
+def update_stats_on_delete(sender, instance, **kwargs):
+    ReviewStats.apply_change(_state(instance), None)
+
+
+def connect_review_stats():
+    pre_save.connect(capture_review_state, sender=Review, dispatch_uid='review-stats')
+    post_save.connect(update_stats_on_save, sender=Review, dispatch_uid='review-stats')
+    post_delete.connect(update_stats_on_delete, sender=Review, dispatch_uid='review-stats')
@@ -1,3 +1,69 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.cache import get_or_build
+
+from .models import Review, ReviewStats
+from .views import REVIEWS_PER_PAGE
+
+
+class ReviewsBatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        for i in range(REVIEWS_PER_PAGE + 3):
+            review = Review.objects.create(author_name=f"Автор {i}", text="Спасибо", is_published=True)
+            Review.objects.filter(pk=review.pk).update(created_at=now - timedelta(hours=i))
+        Review.objects.create(author_name="Скрытый", text="Не опубликован")
+
+    def test_first_page_links_to_next_batch(self):
+        page = self.client.get(reverse('reviews:list')).context['reviews_page']
+        self.assertEqual(len(page), REVIEWS_PER_PAGE)
+        self.assertTrue(page.has_next)
+
+        response = self.client.get(reverse('reviews:batch'), {'after': page.next_cursor})
+        data = response.json()
+        self.assertIsNone(data['next_cursor'])
+        for i in range(REVIEWS_PER_PAGE, REVIEWS_PER_PAGE + 3):
+            self.assertIn(f"Автор {i}", data['html'])
+        self.assertNotIn("Автор 0", data['html'])
+        self.assertNotIn("Скрытый", data['html'])
+
+
+class ReviewStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_stats_follow_review_changes(self):
+        review = Review.objects.create(author_name="Анна", text="Отлично", rating=5, is_published=True)
+        Review.objects.create(author_name="Иван", text="Хорошо", rating=3, is_published=True)
+        Review.objects.create(author_name="Олег", text="Спам", rating=1)
+
+        stats = ReviewStats.get()
+        self.assertEqual((stats.total_count, stats.published_count, stats.average), (3, 2, 4.0))
+        self.assertEqual(stats.histogram[0], (5, 1, 50))
+
+        review.is_published = False
+        review.save()
+        Review.objects.get(author_name="Олег").delete()
+        stats = ReviewStats.get()
+        self.assertEqual((stats.total_count, stats.published_count, stats.average), (2, 1, 3.0))
+
+    def test_recalculate_invalidates_cached_pages(self):
+        Review.objects.create(author_name="Анна", text="Отлично", rating=5, is_published=True)
+        get_or_build('test:rating', ['reviews.review'], lambda: ReviewStats.get().average)
 
-# Create your tests here.
+        # Bulk changes bypass the signals
+        Review.objects.update(rating=4)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('recalculate_review_stats', stdout=StringIO())
+        self.assertEqual(ReviewStats.get().average, 4.0)
+        self.assertEqual(
+            get_or_build('test:rating', ['reviews.review'], lambda: ReviewStats.get().average), 4.0
+        )
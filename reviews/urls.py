@@ -5,5 +5,6 @@ app_name = 'reviews'
 
 urlpatterns = [
     path('', views.reviews_list, name='list'),
+    path('batch/', views.reviews_batch, name='batch'),
 ]
 
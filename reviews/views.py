@@ -1,13 +1,41 @@
+from django.http import JsonResponse
 from django.shortcuts import render
-from .models import Review, ReviewsPageText
+from django.template.loader import render_to_string
+from core.page_cache import cache_public_page
+from core.pagination import keyset_page
+from .models import Review, ReviewsPageText, ReviewStats
 
+REVIEWS_PER_PAGE = 12
 
+
+@cache_public_page(Review, ReviewsPageText)
 def reviews_list(request):
-    """Страница с отзывами клиентов"""
-    reviews = Review.objects.filter(is_published=True)
-    reviews_text = ReviewsPageText.objects.first()
+    """Страница с отзывами клиентов (первая порция, остальные подгружаются)"""
+    reviews_page = keyset_page(
+        Review.objects.filter(is_published=True), REVIEWS_PER_PAGE,
+        after=request.GET.get('after'),
+    )
+    reviews_text = ReviewsPageText.load()
     
     return render(request, 'reviews/list.html', {
-        'reviews': reviews,
+        'reviews_page': reviews_page,
         'reviews_text': reviews_text,
+        'review_stats': ReviewStats.get(),
+    })
+
+
+@cache_public_page(Review)
+def reviews_batch(request):
+    """Следующая порция отзывов после курсора ?after= для бесконечной прокрутки"""
+    reviews_page = keyset_page(
+        Review.objects.filter(is_published=True), REVIEWS_PER_PAGE,
+        after=request.GET.get('after'),
+    )
+    html = ''.join(
+        render_to_string('reviews/_review_card.html', {'review': review})
+        for review in reviews_page
+    )
+    return JsonResponse({
+        'html': html,
+        'next_cursor': reviews_page.next_cursor,
     })
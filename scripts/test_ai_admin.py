@@ -10,7 +10,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'clinic.settings')
 django.setup()
 
 from ai_admin.models import TaskLog, TaskReport
-from ai_admin.tasks import start_admin_task
+from ai_admin.tasks import admin_pipeline
 
 def test_admin_workflow():
     print("Creating test TaskLog...")
@@ -21,7 +21,7 @@ def test_admin_workflow():
     print(f"TaskLog created: {task_log.id}")
 
     print("Starting admin task (synchronously)...")
-    start_admin_task(task_log.id)
+    admin_pipeline(task_log.id).apply()
 
     # Refresh from DB
     task_log.refresh_from_db()
@@ -1,4 +1,6 @@
 from django.contrib import admin
+
+from core.admin import SingletonModelAdmin
 from .models import ServiceCategory, Service, ServicesPageText
 
 
@@ -21,8 +23,5 @@ class ServiceAdmin(admin.ModelAdmin):
 
 
 @admin.register(ServicesPageText)
-class ServicesPageTextAdmin(admin.ModelAdmin):
-    def has_add_permission(self, request):
-        if self.model.objects.exists():
-            return False
-        return super().has_add_permission(request)
+class ServicesPageTextAdmin(SingletonModelAdmin):
+    pass
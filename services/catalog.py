@@ -0,0 +1,107 @@
+"""
+Immutable snapshot of the service catalog.
+
+Active categories with their active services are loaded in one query (a
+LEFT JOIN with the service activity condition), ordered and grouped once,
+and stored in the shared cache under the ``ServiceCategory`` and ``Service``
+tags (see ``core.cache``). Each process also keeps the latest snapshot in
+memory: while the tag versions are unchanged, ``get_catalog()`` costs one
+read of the versions.
+
+The snapshot is used by the services pages, the price list and the
+``get_services_list`` chatbot tool.
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db.models import FilteredRelation, Q
+
+from core.cache import get_or_build_local, model_tag
+
+from .models import Service, ServiceCategory
+
+CATALOG_CACHE_KEY = 'services:catalog'
+
+SERVICE_FIELDS = ('id', 'name', 'description', 'price', 'price_note', 'duration', 'is_popular')
+CATEGORY_FIELDS = ('id', 'name', 'slug', 'description', 'icon')
+
+
+@dataclass(frozen=True)
+class CatalogService:
+    id: int
+    name: str
+    description: str
+    price: Decimal
+    price_note: str
+    duration: str
+    is_popular: bool
+
+
+@dataclass(frozen=True)
+class CatalogCategory:
+    id: int
+    name: str
+    slug: str
+    description: str
+    icon: str
+    services: tuple
+
+    @property
+    def popular_services(self):
+        return tuple(service for service in self.services if service.is_popular)
+
+
+@dataclass(frozen=True)
+class ServiceCatalog:
+    categories: tuple
+
+    def __iter__(self):
+        return iter(self.categories)
+
+    def __len__(self):
+        return len(self.categories)
+
+    def get_category(self, slug):
+        for category in self.categories:
+            if category.slug == slug:
+                return category
+        return None
+
+
+def _catalog_tags():
+    return [model_tag(ServiceCategory), model_tag(Service)]
+
+
+def build_catalog():
+    """Build the catalog with a single database query."""
+    rows = (
+        ServiceCategory.objects.filter(is_active=True)
+        .annotate(active_service=FilteredRelation('services', condition=Q(services__is_active=True)))
+        .order_by('order', 'name', 'id', 'active_service__order', 'active_service__name')
+        .values(
+            *CATEGORY_FIELDS,
+            *(f'active_service__{field}' for field in SERVICE_FIELDS),
+        )
+    )
+
+    grouped = {}
+    for row in rows:
+        category_id = row['id']
+        if category_id not in grouped:
+            grouped[category_id] = ({field: row[field] for field in CATEGORY_FIELDS}, [])
+        if row['active_service__id'] is not None:
+            grouped[category_id][1].append(
+                CatalogService(**{field: row[f'active_service__{field}'] for field in SERVICE_FIELDS})
+            )
+
+    categories = tuple(
+        CatalogCategory(**fields, services=tuple(services))
+        for fields, services in grouped.values()
+    )
+    return ServiceCatalog(categories=categories)
+
+
+def get_catalog():
+    """The current catalog snapshot."""
+    return get_or_build_local(CATALOG_CACHE_KEY, _catalog_tags(), build_catalog)
@@ -1,5 +1,7 @@
 from django.db import models
 
+from core.models import SingletonModel
+
 
 class ServiceCategory(models.Model):
     """Категория услуг (например: Терапия, Хирургия, Диагностика)"""
@@ -59,7 +61,7 @@ class Service(models.Model):
 
     def __str__(self):
         return f"{self.name} - {self.price} руб."
-class ServicesPageText(models.Model):
+class ServicesPageText(SingletonModel):
     """Текстовые блоки для страницы 'Услуги и цены'"""
     header_title = models.CharField(max_length=200, default="Наши услуги", verbose_name="Заголовок страницы")
     header_subtitle = models.TextField(default="Полный спектр ветеринарных услуг для здоровья и благополучия ваших питомцев", verbose_name="Подзаголовок страницы")
@@ -1,3 +1,38 @@
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from .catalog import get_catalog
+from .models import Service, ServiceCategory
+
+
+class CatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.therapy = ServiceCategory.objects.create(name="Терапия", slug='therapy', order=1)
+        self.surgery = ServiceCategory.objects.create(name="Хирургия", slug='surgery', order=2)
+        ServiceCategory.objects.create(name="Архив", slug='archive', is_active=False)
+        Service.objects.create(category=self.therapy, name="Осмотр", price=800, order=1, is_popular=True)
+        Service.objects.create(category=self.therapy, name="Вакцинация", price=1500, order=2)
+        Service.objects.create(category=self.therapy, name="Снято", price=100, is_active=False)
+
+    def test_catalog_groups_active_services(self):
+        catalog = get_catalog()
+        self.assertEqual([category.slug for category in catalog], ['therapy', 'surgery'])
+        therapy = catalog.get_category('therapy')
+        self.assertEqual([service.name for service in therapy.services], ["Осмотр", "Вакцинация"])
+        self.assertEqual([service.name for service in therapy.popular_services], ["Осмотр"])
+        self.assertEqual(catalog.get_category('surgery').services, ())
+        self.assertIsNone(catalog.get_category('archive'))
+
+    def test_catalog_is_kept_in_memory_until_changed(self):
+        catalog = get_catalog()
+        with self.assertNumQueries(0):
+            self.assertIs(get_catalog(), catalog)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Service.objects.create(category=self.surgery, name="Стерилизация", price=5000)
+        self.assertEqual([service.name for service in get_catalog().get_category('surgery').services], ["Стерилизация"])
+
+    def test_category_page(self):
+        self.assertContains(self.client.get('/services/therapy/'), "Вакцинация")
+        self.assertEqual(self.client.get('/services/archive/').status_code, 404)
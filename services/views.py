@@ -1,13 +1,24 @@
-from django.shortcuts import render, get_object_or_404
+from django.http import Http404
+from django.shortcuts import render
+from django.db.models import Max
+from core.conditional import conditional_page
+from core.page_cache import cache_public_page
+from .catalog import get_catalog
 from .models import ServiceCategory, Service, ServicesPageText
 
 
+def services_last_modified(request):
+    return Service.objects.filter(
+        is_active=True, category__is_active=True
+    ).aggregate(Max('updated_at'))['updated_at__max']
+
+
+@conditional_page(ServiceCategory, Service, ServicesPageText, last_modified=services_last_modified)
+@cache_public_page(ServiceCategory, Service, ServicesPageText)
 def services_list(request):
     """Страница со всеми услугами по категориям"""
-    categories = ServiceCategory.objects.filter(is_active=True).prefetch_related(
-        'services'
-    )
-    services_text = ServicesPageText.objects.first()
+    categories = get_catalog()
+    services_text = ServicesPageText.load()
     
     return render(request, 'services/list.html', {
         'categories': categories,
@@ -15,11 +26,14 @@ def services_list(request):
     })
 
 
+@cache_public_page(ServiceCategory, Service, ServicesPageText)
 def service_category(request, slug):
     """Услуги в конкретной категории"""
-    category = get_object_or_404(ServiceCategory, slug=slug, is_active=True)
-    services = category.services.filter(is_active=True)
-    services_text = ServicesPageText.objects.first()
+    category = get_catalog().get_category(slug)
+    if category is None:
+        raise Http404("Категория не найдена")
+    services = category.services
+    services_text = ServicesPageText.load()
     
     return render(request, 'services/category.html', {
         'category': category,
@@ -28,12 +42,12 @@ def service_category(request, slug):
     })
 
 
+@conditional_page(ServiceCategory, Service, ServicesPageText, last_modified=services_last_modified)
+@cache_public_page(ServiceCategory, Service, ServicesPageText)
 def prices(request):
     """Прайс-лист - все услуги с ценами"""
-    categories = ServiceCategory.objects.filter(is_active=True).prefetch_related(
-        'services'
-    )
-    services_text = ServicesPageText.objects.first()
+    categories = get_catalog()
+    services_text = ServicesPageText.load()
     
     return render(request, 'services/prices.html', {
         'categories': categories,
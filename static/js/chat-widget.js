@@ -8,6 +8,7 @@ class VetChatWidget {
         this.isOpen = false;
         this.isLoading = false;
         this.messages = [];
+        this.sessionId = null;
         this.apiUrl = '/api/chatbot/chat/';
         
         this.init();
@@ -177,11 +178,19 @@ class VetChatWidget {
         // Show typing indicator
         this.showTyping();
         
-        // Prepare history for API
-        const history = this.messages.slice(0, -1).map(msg => ({
-            role: msg.type === 'user' ? 'user' : 'assistant',
-            content: msg.text
-        }));
+        // The server keeps the conversation; history is sent only to start
+        // a new session from messages restored in this tab
+        const payload = { message: text, stream: true };
+        if (this.sessionId) {
+            payload.session_id = this.sessionId;
+        } else {
+            payload.history = this.messages.slice(0, -1)
+                .filter(msg => msg.type !== 'error')
+                .map(msg => ({
+                    role: msg.type === 'user' ? 'user' : 'assistant',
+                    content: msg.text
+                }));
+        }
         
         try {
             this.isLoading = true;
@@ -191,21 +200,32 @@ class VetChatWidget {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
+                    'Accept': 'text/event-stream, application/json',
                 },
-                body: JSON.stringify({
-                    message: text,
-                    history: history
-                })
+                body: JSON.stringify(payload)
             });
             
-            const data = await response.json();
-            
-            this.hideTyping();
-            
-            if (data.success) {
-                this.addMessage(data.response, 'assistant');
+            const contentType = response.headers.get('Content-Type') || '';
+            if (contentType.includes('text/event-stream') && response.body) {
+                await this.readStream(response);
             } else {
-                this.addMessage(data.error || 'Произошла ошибка. Попробуйте позже.', 'error');
+                let data = await response.json();
+                if (response.status === 202 && data.job_id) {
+                    // Queued on the server: wait for the answer
+                    data = await this.pollJob(data);
+                }
+                
+                this.hideTyping();
+                
+                if (data.success) {
+                    this.setSession(data.session_id);
+                    this.addMessage(data.response, 'assistant');
+                } else if (response.status === 429) {
+                    const wait = data.retry_after ? ` через ${data.retry_after} с` : ' чуть позже';
+                    this.addMessage(`Сейчас слишком много обращений. Пожалуйста, повторите вопрос${wait}.`, 'error');
+                } else {
+                    this.addMessage(data.error || 'Произошла ошибка. Попробуйте позже.', 'error');
+                }
             }
             
         } catch (error) {
@@ -222,6 +242,155 @@ class VetChatWidget {
         this.saveToSession();
     }
     
+    async pollJob(job) {
+        // Long-poll the job until the answer is ready
+        const deadline = Date.now() + 5 * 60 * 1000;
+        this.setSession(job.session_id);
+        while (Date.now() < deadline) {
+            const response = await fetch(`${job.poll_url}?wait=25`, {
+                headers: { 'Accept': 'application/json' }
+            });
+            const data = await response.json();
+            if (response.status !== 202) {
+                return data;
+            }
+        }
+        return { success: false, error: 'Ассистент не успел ответить. Попробуйте позже.' };
+    }
+    
+    async readStream(response) {
+        // Parse Server-Sent Events from the fetch body (EventSource cannot POST)
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let finished = false;
+        this.streamEl = null;
+        this.streamText = '';
+        
+        while (!finished) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                finished = this.handleStreamEvent(rawEvent) || finished;
+            }
+        }
+        
+        if (!finished) {
+            // Connection closed without a final event
+            this.finishStream(this.streamText);
+            if (!this.streamText) {
+                this.addMessage('Ответ прервался. Попробуйте ещё раз.', 'error');
+            }
+        }
+    }
+    
+    handleStreamEvent(rawEvent) {
+        let event = 'message';
+        let data = '';
+        for (const line of rawEvent.split('\n')) {
+            if (line.startsWith('event:')) {
+                event = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                data += line.slice(5).trim();
+            }
+        }
+        const payload = data ? JSON.parse(data) : {};
+        
+        switch (event) {
+            case 'token':
+                this.streamText += payload.text;
+                this.renderStream(this.streamText);
+                return false;
+            case 'tool':
+                if (payload.status === 'start') {
+                    // Text before a tool call is intermediate; the answer follows the tool
+                    this.streamText = '';
+                    this.showToolStatus(payload.name);
+                }
+                return false;
+            case 'done':
+                this.setSession(payload.session_id);
+                this.finishStream(payload.response);
+                return true;
+            case 'error':
+                this.finishStream('');
+                this.addMessage(payload.error || 'Произошла ошибка. Попробуйте позже.', 'error');
+                return true;
+            default:
+                return false;
+        }
+    }
+    
+    renderStream(text) {
+        this.hideTyping();
+        if (!this.streamEl) {
+            this.streamEl = this.createMessageElement('', 'assistant', '');
+            this.messagesContainer.appendChild(this.streamEl);
+        }
+        this.streamEl.querySelector('.chat-message-text').innerHTML = this.formatMessage(text);
+        this.scrollToBottom();
+    }
+    
+    showToolStatus(toolName) {
+        const labels = {
+            get_clinic_info: 'Смотрю контакты клиники…',
+            get_services_list: 'Смотрю услуги и цены…',
+            get_veterinarians: 'Смотрю информацию о врачах…',
+            search_clinic_knowledge: 'Ищу в материалах клиники…',
+            search_veterinary_info: 'Ищу информацию…',
+        };
+        if (this.streamEl) {
+            this.streamEl.remove();
+            this.streamEl = null;
+        }
+        if (!document.getElementById('chatTyping')) {
+            this.showTyping();
+        }
+        const typingEl = document.getElementById('chatTyping');
+        if (typingEl && !typingEl.querySelector('.chat-tool-status')) {
+            const status = document.createElement('span');
+            status.className = 'chat-tool-status';
+            typingEl.appendChild(status);
+        }
+        if (typingEl) {
+            typingEl.querySelector('.chat-tool-status').textContent = labels[toolName] || 'Думаю…';
+        }
+    }
+    
+    finishStream(text) {
+        this.hideTyping();
+        if (this.streamEl) {
+            this.streamEl.remove();
+            this.streamEl = null;
+        }
+        if (text) {
+            this.addMessage(text, 'assistant');
+        }
+    }
+    
+    createMessageElement(text, type, time) {
+        const messageEl = document.createElement('div');
+        messageEl.className = `chat-message ${type}`;
+        
+        const avatarIcon = type === 'user' ? 'bi-person-fill' : 'bi-heart-pulse';
+        
+        messageEl.innerHTML = `
+            <div class="chat-message-avatar">
+                <i class="bi ${avatarIcon}"></i>
+            </div>
+            <div class="chat-message-content">
+                <p class="chat-message-text">${this.formatMessage(text)}</p>
+                <span class="chat-message-time">${time}</span>
+            </div>
+        `;
+        return messageEl;
+    }
+    
     addMessage(text, type) {
         const time = new Date().toLocaleTimeString('ru-RU', { 
             hour: '2-digit', 
@@ -236,22 +405,7 @@ class VetChatWidget {
             errorEl.textContent = text;
             this.messagesContainer.appendChild(errorEl);
         } else {
-            const messageEl = document.createElement('div');
-            messageEl.className = `chat-message ${type}`;
-            
-            const avatarIcon = type === 'user' ? 'bi-person-fill' : 'bi-heart-pulse';
-            
-            messageEl.innerHTML = `
-                <div class="chat-message-avatar">
-                    <i class="bi ${avatarIcon}"></i>
-                </div>
-                <div class="chat-message-content">
-                    <p class="chat-message-text">${this.formatMessage(text)}</p>
-                    <span class="chat-message-time">${time}</span>
-                </div>
-            `;
-            
-            this.messagesContainer.appendChild(messageEl);
+            this.messagesContainer.appendChild(this.createMessageElement(text, type, time));
         }
         
         // Scroll to bottom
@@ -308,11 +462,20 @@ class VetChatWidget {
         this.messagesContainer.scrollTop = this.messagesContainer.scrollHeight;
     }
     
+    setSession(sessionId) {
+        if (sessionId) {
+            this.sessionId = sessionId;
+        }
+    }
+    
     saveToSession() {
         try {
             // Keep only last 20 messages
             const toSave = this.messages.slice(-20);
             sessionStorage.setItem('vetchat_messages', JSON.stringify(toSave));
+            if (this.sessionId) {
+                sessionStorage.setItem('vetchat_session', this.sessionId);
+            }
         } catch (e) {
             console.warn('Could not save chat to session:', e);
         }
@@ -320,6 +483,7 @@ class VetChatWidget {
     
     loadFromSession() {
         try {
+            this.sessionId = sessionStorage.getItem('vetchat_session');
             const saved = sessionStorage.getItem('vetchat_messages');
             if (saved) {
                 const messages = JSON.parse(saved);
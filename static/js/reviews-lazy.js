@@ -0,0 +1,80 @@
+/**
+ * Reviews lazy loading
+ * Fetches the next batch of reviews when the "show more" button scrolls into view
+ */
+
+class ReviewsLazyLoader {
+    constructor(container, button) {
+        this.container = container;
+        this.button = button;
+        this.wrapper = button.parentElement;
+        this.batchUrl = button.dataset.batchUrl;
+        this.cursor = button.dataset.cursor;
+        this.isLoading = false;
+
+        this.init();
+    }
+
+    init() {
+        this.button.addEventListener('click', (e) => {
+            e.preventDefault();
+            this.loadMore();
+        });
+
+        if ('IntersectionObserver' in window) {
+            this.observer = new IntersectionObserver((entries) => {
+                if (entries.some(entry => entry.isIntersecting)) {
+                    this.loadMore();
+                }
+            }, { rootMargin: '400px' });
+            this.observer.observe(this.wrapper);
+        }
+    }
+
+    async loadMore() {
+        if (this.isLoading || !this.cursor) return;
+        this.isLoading = true;
+        this.button.classList.add('disabled');
+
+        try {
+            const url = `${this.batchUrl}?after=${encodeURIComponent(this.cursor)}`;
+            const response = await fetch(url, { headers: { 'Accept': 'application/json' } });
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            const data = await response.json();
+
+            this.container.insertAdjacentHTML('beforeend', data.html);
+            this.cursor = data.next_cursor;
+            this.button.href = `?after=${encodeURIComponent(this.cursor || '')}`;
+
+            if (!this.cursor) {
+                this.finish();
+            }
+        } catch (error) {
+            // The button still works as a plain link to the next page
+            console.warn('Could not load more reviews:', error);
+            if (this.observer) {
+                this.observer.disconnect();
+            }
+        } finally {
+            this.isLoading = false;
+            this.button.classList.remove('disabled');
+        }
+    }
+
+    finish() {
+        if (this.observer) {
+            this.observer.disconnect();
+        }
+        this.wrapper.remove();
+    }
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    const container = document.getElementById('reviews-list');
+    const button = document.querySelector('#reviews-more [data-batch-url]');
+    if (container && button) {
+        window.reviewsLazyLoader = new ReviewsLazyLoader(container, button);
+    }
+});